@@ -0,0 +1,23 @@
+"""
+Gunicorn configuration of the ASGI serving profile
+
+    gunicorn config.asgi:application -c config/gunicorn_asgi.py
+
+Needs gunicorn and uvicorn, which are not dependencies of the app.
+"""
+import multiprocessing
+import os
+
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+
+# One event loop per worker, each holding many connections
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+
+# Exam takers keep their connection between loading and submitting a quiz
+keepalive = 75
+timeout = 60
+graceful_timeout = 30
+
+raw_env = ['DJANGO_SETTINGS_MODULE=config.settings_asgi']
@@ -48,12 +48,18 @@ CUSTOM_APPS = [
     'results',
     'quizes',
     'questions',
+    'instrumentation',
 ]
 
 INSTALLED_APPS = DEFAULT_APPS + THIRD_APPS + CUSTOM_APPS
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # The static files, see STATICFILES_STORAGE
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # gzip, or brotli with the Brotli package, of the JSON responses only
+    'quizes.middleware.JSONCompressionMiddleware',
+    'instrumentation.middleware.SQLInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -62,6 +68,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# SQL instrumentation
+# Query count and time of every request in a Server-Timing header, and
+# rolling per-view aggregates at /admin/sql-statistics/
+
+SQL_INSTRUMENTATION_SERVER_TIMING = True
+
+SQL_INSTRUMENTATION_REPEAT_THRESHOLD = 3
+
+SQL_INSTRUMENTATION_WINDOW = 500
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -82,6 +98,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+ASGI_APPLICATION = 'config.asgi.application'
+
+# Serve the quiz data and save endpoints with their async views. Enabled by
+# the ASGI serving profile, config.settings_asgi
+QUIZ_ASYNC_VIEWS = False
+
 
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
@@ -93,6 +115,42 @@ DATABASES = {
     }
 }
 
+# SQLite pragmas set on every connection (see instrumentation.sqlite), but
+# the journal mode, stored in the file by the sqlite_maintenance command.
+# In WAL mode the students keep reading while a submission is written, and
+# concurrent submissions wait up to busy_timeout ms for the write lock
+# instead of failing with "database is locked"
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+}
+
+DATABASE_ROUTERS = ['results.sharding.ResultShardRouter']
+
+
+# Results
+# With write-behind enabled the results are queued in a local SQLite file
+# and written to the database in batches by a worker thread
+
+RESULTS_WRITE_BEHIND = False
+
+RESULTS_QUEUE_PATH = BASE_DIR / 'results_queue.sqlite3'
+
+RESULTS_BATCH_SIZE = 500
+
+RESULTS_FLUSH_INTERVAL = 1.0
+
+# The databases the results are spread over, by a hash of their quiz (or
+# user), see results.sharding and config/settings_sharded.py
+
+RESULT_SHARDS = ['default']
+
+RESULT_SHARD_KEY = 'quiz'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -132,6 +190,11 @@ STATIC_URL = '/static/'
 
 STATIC_ROOT = BASE_DIR / 'staticfiles/'
 
+# Hashed names and precompressed variants built by collectstatic, served by
+# WhiteNoiseMiddleware, the hashed files with immutable caching headers
+
+STATICFILES_STORAGE = 'instrumentation.storage.StaticFilesStorage'
+
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
     BASE_DIR / 'quizes' /  'static'
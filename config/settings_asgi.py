@@ -0,0 +1,21 @@
+"""
+ASGI serving profile
+
+The settings of config.settings, with the quiz data and save endpoints
+served by their async views, so a worker waiting on exam takers holds no
+thread for them. Serve it with an ASGI server, for example:
+
+    gunicorn config.asgi:application -c config/gunicorn_asgi.py
+
+or, with a single process:
+
+    uvicorn config.asgi:application
+"""
+from .settings import *  # noqa: F401,F403
+
+
+QUIZ_ASYNC_VIEWS = True
+
+# Connections are opened in the threads running the ORM calls of the async
+# views, which are not reused across requests: keep them per request.
+CONN_MAX_AGE = 0
@@ -0,0 +1,28 @@
+"""
+Sharded results profile
+
+The settings of config.settings, with the results spread over four SQLite
+files besides the main database, each taking its share of the write lock.
+Create the shards, then move the existing results to them:
+
+    manage.py migrate --settings=config.settings_sharded
+    manage.py migrate --database=results_0 --settings=config.settings_sharded
+    ...
+    manage.py rebalance_results --from default --settings=config.settings_sharded
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+
+RESULT_SHARDS = [f'results_{i}' for i in range(4)]
+
+DATABASES = {
+    **DATABASES,
+    **{
+        alias: {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / f'{alias}.sqlite3',
+        }
+        for alias in RESULT_SHARDS
+    },
+}
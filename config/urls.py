@@ -16,12 +16,16 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from instrumentation.views import sql_statistics_view
+
 # Static
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
+    path('admin/sql-statistics/', sql_statistics_view, name='sql_statistics'),
     path('admin/', admin.site.urls),
+    path('results/', include('results.urls', namespace='results')),
     path('', include('quizes.urls', namespace='quizes'))
 ]
 
@@ -0,0 +1,7 @@
+"""
+SQL instrumentation, index advice, SQLite upkeep and static files storage
+
+The package is shared by the two Django projects of the repository, the
+quizes project and the quiz-app-django one, which puts the root of the
+repository on its path to import it. Deploy the package along with either.
+"""
@@ -0,0 +1,280 @@
+"""
+Query plan based index advice for SQLite
+
+The queries run by a set of scenarios (typically requests to the real
+views) are recorded, then explained with EXPLAIN QUERY PLAN. Full table
+scans and temporary B-trees are flagged, and for the tables of a flagged
+query an index is proposed on the columns it filters and sorts by, when no
+existing index starts with them:
+
+    equality columns, then the first range column, else the ORDER BY columns
+
+The proposals are heuristics to check, not a replacement for reading the
+plans: a scan of a table read whole on purpose is flagged without a
+proposal.
+"""
+import hashlib
+import re
+from collections import namedtuple
+
+from django.apps import apps
+from django.db import connections
+from django.db.migrations import Migration, RunSQL
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+
+EXPLAINED = ('SELECT', 'UPDATE', 'DELETE')
+
+SCAN_RE = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?(?: AS (\w+))?(.*)$')
+TEMP_BTREE_RE = re.compile(r'USE TEMP B-TREE FOR (.+)$')
+
+TABLE_RE = re.compile(
+    r'(?:FROM|JOIN|UPDATE) "(\w+)"(?: (?:AS )?"?'
+    r'(?!(?:ON|WHERE|INNER|LEFT|RIGHT|CROSS|SET|ORDER|GROUP|LIMIT|HAVING|UNION)\b)(\w+)"?)?'
+)
+CONDITION_RE = re.compile(
+    r'"?(\w+)"?\."(\w+)"\s*(=|IN\b|IS\b|<=|>=|<|>|BETWEEN\b|LIKE\b)', re.IGNORECASE
+)
+COLUMN_RE = re.compile(r'"?(\w+)"?\."(\w+)"')
+EQUALITY = ('=', 'IN', 'IS')
+
+Query = namedtuple('Query', 'sql params scenarios')
+Plan = namedtuple('Plan', 'query details scans temp_btrees')
+Proposal = namedtuple('Proposal', 'table columns model fields name queries')
+
+
+class QueryLog:
+    """Execute wrapper recording the distinct queries of the scenarios"""
+
+    def __init__(self):
+        self.queries = {}
+        self.scenario = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith(EXPLAINED):
+            query = self.queries.setdefault(sql, Query(sql, params, set()))
+            query.scenarios.add(self.scenario)
+        return execute(sql, params, many, context)
+
+
+def record(scenarios, using='default'):
+    """Run the scenarios, (name, callable) pairs, and record their queries
+
+    Returns the queries and the scenarios that failed with their error.
+    """
+    log = QueryLog()
+    failures = {}
+    with connections[using].execute_wrapper(log):
+        for name, scenario in scenarios:
+            log.scenario = name
+            try:
+                scenario()
+            except Exception as e:
+                failures[name] = f"{type(e).__name__}: {e}"
+    return list(log.queries.values()), failures
+
+
+def explain(query, using='default'):
+    """The EXPLAIN QUERY PLAN of a recorded query"""
+    with connections[using].cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + query.sql, query.params)
+        details = [row[-1] for row in cursor.fetchall()]
+
+    scans, temp_btrees = [], []
+    for detail in details:
+        scan = SCAN_RE.match(detail)
+        # "SCAN t USING (COVERING) INDEX" walks an index, not the table
+        if scan and 'USING' not in scan.group(3):
+            scans.append(scan.group(2) or scan.group(1))
+        temp_btree = TEMP_BTREE_RE.search(detail)
+        if temp_btree:
+            temp_btrees.append(temp_btree.group(1))
+    return Plan(query, details, scans, temp_btrees)
+
+
+def _aliases(sql):
+    aliases = {}
+    for table, alias in TABLE_RE.findall(sql):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def _order_by(sql):
+    position = sql.upper().rfind(' ORDER BY ')
+    if position < 0:
+        return ''
+    clause = sql[position + 10:]
+    return re.split(r'\sLIMIT\s', clause, flags=re.IGNORECASE)[0]
+
+
+def candidates(plan):
+    """The columns an index could serve, per table of a flagged query"""
+    sql = plan.query.sql
+    aliases = _aliases(sql)
+
+    equality, ranges = {}, {}
+    for alias, column, operator in CONDITION_RE.findall(sql):
+        table = aliases.get(alias)
+        if table is None:
+            continue
+        target = equality if operator.upper() in EQUALITY else ranges
+        columns = target.setdefault(table, [])
+        if column not in columns:
+            columns.append(column)
+
+    ordering = {}
+    if any(purpose.startswith(('ORDER BY', 'RIGHT PART OF ORDER BY')) for purpose in plan.temp_btrees):
+        for alias, column in COLUMN_RE.findall(_order_by(sql)):
+            if alias in aliases:
+                ordering.setdefault(aliases[alias], []).append(column)
+        # An index can only sort rows coming from a single table
+        if len(ordering) > 1:
+            ordering = {}
+
+    result = {}
+    for table in set(equality) | set(ranges) | set(ordering):
+        columns = list(equality.get(table, []))
+        if table in ranges:
+            columns += [c for c in ranges[table] if c not in columns][:1]
+        else:
+            columns += [c for c in ordering.get(table, []) if c not in columns]
+        if columns:
+            result[table] = tuple(columns)
+    return result
+
+
+def _indexed(table, columns, using):
+    with connections[using].cursor() as cursor:
+        constraints = connections[using].introspection.get_constraints(cursor, table)
+    for constraint in constraints.values():
+        if tuple(constraint['columns'] or ())[:len(columns)] == columns:
+            return True
+    return False
+
+
+def index_name(table, columns):
+    """An index name within the 30 characters allowed by Meta.indexes"""
+    name = f"{table}_{'_'.join(columns)}_idx"
+    if len(name) > 30:
+        digest = hashlib.blake2b(name.encode(), digest_size=4).hexdigest()
+        name = f"{name[:17].rstrip('_')}_{digest}_idx"
+    return name
+
+
+def propose(plans, using='default'):
+    """The missing indexes of the flagged plans"""
+    models = {
+        model._meta.db_table: model
+        for model in apps.get_models(include_auto_created=True)
+    }
+
+    proposals = {}
+    for plan in plans:
+        if not plan.scans and not plan.temp_btrees:
+            continue
+        for table, columns in candidates(plan).items():
+            if table not in models:
+                continue
+            model = models[table]
+            # SQLite indexes end with the rowid, the primary key of the models
+            if len(columns) > 1 and columns[-1] == model._meta.pk.column:
+                columns = columns[:-1]
+            if _indexed(table, columns, using):
+                continue
+            fields = {field.column: field.name for field in model._meta.concrete_fields}
+            if not all(column in fields for column in columns):
+                continue
+            key = (table, columns)
+            if key not in proposals:
+                proposals[key] = Proposal(
+                    table, columns, model, tuple(fields[column] for column in columns),
+                    index_name(table, columns), [],
+                )
+            proposals[key].queries.append(plan.query)
+
+    # An index on (a, b) serves the queries of an index on (a)
+    kept = []
+    for (table, columns), proposal in proposals.items():
+        wider = [
+            other for (other_table, other_columns), other in proposals.items()
+            if other_table == table and len(other_columns) > len(columns)
+            and other_columns[:len(columns)] == columns
+        ]
+        if wider:
+            wider[0].queries.extend(proposal.queries)
+        else:
+            kept.append(proposal)
+    return kept
+
+
+def meta_index(proposal):
+    """The Meta.indexes entry of a proposal"""
+    fields = ', '.join(repr(field) for field in proposal.fields)
+    return f"models.Index(fields=[{fields}], name={proposal.name!r})"
+
+
+def write_migrations(proposals, using='default'):
+    """Write a migration creating the proposed indexes in every app
+
+    The indexes are created with RunSQL, leaving the model state untouched,
+    so they can be deployed before being declared in Meta.indexes. Returns
+    the paths written.
+    """
+    loader = MigrationLoader(connections[using], ignore_no_migrations=True)
+    by_app = {}
+    for proposal in proposals:
+        by_app.setdefault(proposal.model._meta.app_label, []).append(proposal)
+
+    paths = []
+    for app_label, app_proposals in sorted(by_app.items()):
+        leaves = loader.graph.leaf_nodes(app_label)
+        number = int(leaves[0][1][:4]) + 1 if leaves and leaves[0][1][:4].isdigit() else 1
+
+        migration = Migration(f'{number:04d}_advised_indexes', app_label)
+        migration.dependencies = leaves
+        migration.operations = [
+            RunSQL(
+                sql='CREATE INDEX "{}" ON "{}" ({})'.format(
+                    proposal.name, proposal.table,
+                    ', '.join(f'"{column}"' for column in proposal.columns)
+                ),
+                reverse_sql=f'DROP INDEX "{proposal.name}"',
+            )
+            for proposal in app_proposals
+        ]
+
+        writer = MigrationWriter(migration)
+        with open(writer.path, 'w') as f:
+            f.write(writer.as_string())
+        paths.append(writer.path)
+    return paths
+
+
+def report(plans, proposals, failures, verbose=False):
+    """The text report of an advice"""
+    lines = []
+    for name, error in failures.items():
+        lines.append(f"Scenario {name!r} failed: {error}")
+
+    flagged = [plan for plan in plans if plan.scans or plan.temp_btrees]
+    lines.append(f"{len(plans)} distinct queries, {len(flagged)} flagged")
+    for plan in plans if verbose else flagged:
+        flags = [f"full scan of {table}" for table in plan.scans]
+        flags += [f"temp B-tree for {purpose.lower()}" for purpose in plan.temp_btrees]
+        lines.append('')
+        lines.append(f"[{', '.join(sorted(plan.query.scenarios))}] {'; '.join(flags) or 'ok'}")
+        lines.append(f"  {plan.query.sql}")
+        lines.extend(f"    {detail}" for detail in plan.details)
+
+    lines.append('')
+    if not proposals:
+        lines.append("No missing index")
+    for proposal in proposals:
+        lines.append(
+            f"{proposal.model._meta.label}: {meta_index(proposal)} "
+            f"({len(proposal.queries)} queries)"
+        )
+    return '\n'.join(lines)
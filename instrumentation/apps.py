@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class InstrumentationConfig(AppConfig):
+    name = 'instrumentation'
+
+    def ready(self):
+        from .sqlite import configure_connection
+
+        connection_created.connect(configure_connection)
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from instrumentation.sqlite import maintain, persist_pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain the SQLite database: store the journal mode of "
+        "SQLITE_PRAGMAS, refresh the statistics of the query planner "
+        "(ANALYZE), checkpoint and truncate the WAL file and, with --vacuum, "
+        "rebuild the file to reclaim free pages. Runs once, for cron, or "
+        "every --interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help="Also VACUUM, which blocks the writers while it runs",
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            help="Seconds between two runs, forever",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError("The database is not an SQLite database")
+
+        persisted = persist_pragmas(connection)
+        if persisted:
+            self.stdout.write(', '.join(f"{name} = {value}" for name, value in persisted.items()))
+
+        while True:
+            start = time.perf_counter()
+            result = maintain(connection, vacuum=options['vacuum'])
+            busy, frames, checkpointed = result['checkpoint']
+            self.stdout.write(
+                f"Analyzed{', vacuumed' if options['vacuum'] else ''} in "
+                f"{time.perf_counter() - start:.2f} s, "
+                f"{checkpointed} of {frames} WAL frames checkpointed"
+                f"{' (busy)' if busy else ''}, "
+                f"{result['size_before']} -> {result['size_after']} bytes"
+            )
+            if options['interval'] is None:
+                return
+            # Not holding a connection between two runs
+            connection.close()
+            time.sleep(options['interval'])
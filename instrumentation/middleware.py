@@ -0,0 +1,160 @@
+"""
+Per-request SQL instrumentation
+
+SQLInstrumentationMiddleware wraps every database connection for the time
+of a request, recording how many queries ran, how long they took and which
+ones repeated. The numbers of the request are sent back in a Server-Timing
+header, readable in the network tab of the browser, and rolling aggregates
+per view are kept in memory for the admins (see instrumentation.views).
+"""
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+
+# Times the same SQL (whatever the parameters) must run in one request to
+# be reported as an N+1 pattern
+REPEAT_THRESHOLD = getattr(settings, 'SQL_INSTRUMENTATION_REPEAT_THRESHOLD', 3)
+
+# Number of requests per view the aggregates are computed over
+WINDOW = getattr(settings, 'SQL_INSTRUMENTATION_WINDOW', 500)
+
+SERVER_TIMING = getattr(settings, 'SQL_INSTRUMENTATION_SERVER_TIMING', True)
+
+
+class QueryRecorder:
+    """Execute wrapper recording the queries of a request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.executions = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+            if not many:
+                self.executions[(sql, _hashable(params))] += 1
+
+    @property
+    def repeated(self):
+        """SQL run at least REPEAT_THRESHOLD times, with any parameters"""
+        return {
+            sql: count for sql, count in self.statements.items()
+            if count >= REPEAT_THRESHOLD
+        }
+
+    @property
+    def duplicates(self):
+        """Number of queries that ran before with the same parameters"""
+        return sum(count - 1 for count in self.executions.values())
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries", '
+            f'db-dup;desc="{self.duplicates} duplicated", '
+            f'db-repeat;desc="{len(self.repeated)} repeated"'
+        )
+
+
+def _hashable(params):
+    if isinstance(params, dict):
+        return tuple(sorted((key, _hashable(value)) for key, value in params.items()))
+    if isinstance(params, (list, tuple)):
+        return tuple(_hashable(value) for value in params)
+    try:
+        hash(params)
+    except TypeError:
+        return repr(params)
+    return params
+
+
+class ViewStatistics:
+    """Rolling SQL statistics of the last requests of every view"""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._requests = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, view, recorder):
+        sample = (
+            recorder.count,
+            recorder.duration * 1000,
+            recorder.duplicates,
+            tuple(recorder.repeated),
+        )
+        with self._lock:
+            self._requests[view].append(sample)
+
+    def reset(self):
+        with self._lock:
+            self._requests.clear()
+
+    def aggregates(self):
+        """Statistics per view, the most query hungry views first"""
+        with self._lock:
+            requests = {view: list(samples) for view, samples in self._requests.items()}
+
+        views = []
+        for view, samples in requests.items():
+            queries = sorted(sample[0] for sample in samples)
+            durations = [sample[1] for sample in samples]
+            patterns = Counter(sql for sample in samples for sql in sample[3])
+            views.append({
+                'view': view,
+                'requests': len(samples),
+                'queries_mean': sum(queries) / len(queries),
+                'queries_max': queries[-1],
+                'db_ms_mean': sum(durations) / len(durations),
+                'db_ms_max': max(durations),
+                'duplicated_queries_mean': sum(sample[2] for sample in samples) / len(samples),
+                'repeated_patterns': [
+                    {'sql': sql, 'requests': count}
+                    for sql, count in patterns.most_common(10)
+                ],
+            })
+
+        return sorted(views, key=lambda view: view['queries_mean'], reverse=True)
+
+
+statistics = ViewStatistics()
+
+
+class SQLInstrumentationMiddleware(MiddlewareMixin):
+    """Record the SQL queries of every request
+
+    The hooks of MiddlewareMixin run in the thread of the view when it is
+    synchronous, and under ASGI in the thread the ORM calls of the request
+    are sent to with sync_to_async, so async views are recorded too.
+    """
+
+    def process_request(self, request):
+        request._sql_recorder = recorder = QueryRecorder()
+        for connection in connections.all():
+            connection.execute_wrappers.append(recorder)
+
+    def process_response(self, request, response):
+        recorder = getattr(request, '_sql_recorder', None)
+        if recorder is None:
+            return response
+        for connection in connections.all():
+            if recorder in connection.execute_wrappers:
+                connection.execute_wrappers.remove(recorder)
+
+        match = request.resolver_match
+        statistics.record(match.view_name if match else '<unresolved>', recorder)
+
+        if SERVER_TIMING:
+            response['Server-Timing'] = recorder.server_timing()
+        return response
@@ -0,0 +1,134 @@
+"""
+SQLite connection profile and maintenance
+
+configure_connection is a connection_created receiver setting the pragmas
+of the SQLITE_PRAGMAS setting on every new SQLite connection, for example:
+
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'wal',       # readers no longer block the writer
+        'synchronous': 'normal',     # safe with WAL, no fsync per commit
+        'busy_timeout': 5000,        # ms to wait for a lock before failing
+        'mmap_size': 268435456,      # bytes of the file read through mmap
+        'cache_size': -65536,        # page cache, negative is in KiB
+    }
+
+The journal mode is stored in the database file, the others only last as
+long as the connection. Connecting leaves it alone, so that running a
+management command or the tests does not rewrite the file: it is set by
+persist_pragmas, which the sqlite_maintenance command runs first. Run it
+once when deploying a new database.
+
+maintain runs the periodic upkeep of the file: new statistics for the query
+planner, a checkpoint truncating the WAL file and an optional VACUUM.
+"""
+from django.conf import settings
+
+
+# The pragmas that may be set, and the type of their value
+PRAGMAS = {
+    'journal_mode': str,
+    'synchronous': str,
+    'busy_timeout': int,
+    'mmap_size': int,
+    'cache_size': int,
+    'temp_store': str,
+    'wal_autocheckpoint': int,
+}
+
+# Set first, the other pragmas apply to the journal mode in use
+ORDER = ('journal_mode',)
+
+# Stored in the database file rather than set per connection
+PERSISTENT = ('journal_mode',)
+
+
+def pragma_statements(pragmas):
+    """The PRAGMA statements setting the pragmas
+
+    Pragmas take no parameters, the names and values are checked instead.
+    Raises ValueError on unknown names and invalid values.
+    """
+    statements = []
+    for name in sorted(pragmas, key=lambda name: (name not in ORDER, name)):
+        if name not in PRAGMAS:
+            raise ValueError(f"Unsupported SQLite pragma {name!r}")
+        value = pragmas[name]
+        if PRAGMAS[name] is int:
+            value = int(value)
+        elif not str(value).isalpha():
+            raise ValueError(f"Invalid value {value!r} of the SQLite pragma {name!r}")
+        statements.append(f"PRAGMA {name} = {value}")
+    return statements
+
+
+def _configured(persistent):
+    """The SQLITE_PRAGMAS stored in the file, or set per connection"""
+    return {
+        name: value for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items()
+        if (name in PERSISTENT) == persistent
+    }
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Set the SQLITE_PRAGMAS on a new SQLite connection
+
+    Except the ones stored in the database file, see persist_pragmas.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = _configured(persistent=False)
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
+
+
+def persist_pragmas(connection):
+    """Store the SQLITE_PRAGMAS kept by the database file, the journal mode
+
+    Returns the values in use afterwards, an in-memory database keeps its
+    memory journal.
+    """
+    pragmas = _configured(persistent=True)
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
+    return {name: current_pragmas(connection)[name] for name in pragmas}
+
+
+def current_pragmas(connection):
+    """The values of the supported pragmas on a connection
+
+    None for the pragmas without a value, mmap_size of in-memory databases.
+    """
+    with connection.cursor() as cursor:
+        values = {}
+        for name in PRAGMAS:
+            cursor.execute(f"PRAGMA {name}")
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
+
+
+def maintain(connection, vacuum=False):
+    """Run ANALYZE, a truncating WAL checkpoint and optionally VACUUM
+
+    Returns the checkpoint as (busy, WAL frames, checkpointed frames) and
+    the size of the database file in bytes before and after.
+    """
+    with connection.cursor() as cursor:
+        def size():
+            cursor.execute("PRAGMA page_count")
+            pages = cursor.fetchone()[0]
+            cursor.execute("PRAGMA page_size")
+            return pages * cursor.fetchone()[0]
+
+        before = size()
+        cursor.execute("ANALYZE")
+        if vacuum:
+            # Rewrites the whole file, holding the write lock meanwhile
+            cursor.execute("VACUUM")
+        cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        checkpoint = tuple(cursor.fetchone())
+        return {'checkpoint': checkpoint, 'size_before': before, 'size_after': size()}
@@ -0,0 +1,22 @@
+"""
+Storage of the static files
+
+Content hashed names, with gzip and brotli variants of the compressible
+files built by collectstatic, for WhiteNoiseMiddleware to serve with
+far-future immutable Cache-Control headers.
+"""
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    CompressedManifestStaticFilesStorage leaving the names unhashed while
+    there is no manifest at all, collectstatic not run (tests, development),
+    instead of failing to render every page. With a manifest, a file
+    missing from it is still an error.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
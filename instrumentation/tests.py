@@ -0,0 +1,65 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from quizes.models import Quiz
+from .middleware import REPEAT_THRESHOLD, QueryRecorder, statistics
+
+
+class QueryRecorderTests(TestCase):
+
+    def test_counts(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for pk in (1, 1):
+                list(Quiz.objects.filter(pk=pk))
+            User.objects.count()
+
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(recorder.duplicates, 1)
+        self.assertEqual(recorder.repeated, {})
+        self.assertGreater(recorder.duration, 0)
+
+    def test_repeated(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for pk in range(REPEAT_THRESHOLD):
+                list(Quiz.objects.filter(pk=pk))
+
+        self.assertEqual(list(recorder.repeated.values()), [REPEAT_THRESHOLD])
+        self.assertEqual(recorder.duplicates, 0)
+        self.assertIn(f'desc="{REPEAT_THRESHOLD} queries"', recorder.server_timing())
+        self.assertIn('db-repeat;desc="1 repeated"', recorder.server_timing())
+
+
+class SQLInstrumentationMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        statistics.reset()
+        self.addCleanup(statistics.reset)
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('quizes:quiz_list_view'))
+
+        self.assertIn(f'desc="{len(queries)} queries"', response['Server-Timing'])
+        # The wrapper is removed at the end of the request
+        self.assertEqual(connection.execute_wrappers, [])
+
+    def test_statistics_are_for_staff(self):
+        self.client.get(reverse('quizes:quiz_list_view'))
+        url = reverse('sql_statistics')
+
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user('student', password='password'))
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(User.objects.create_user('admin', password='password', is_staff=True))
+        data = self.client.get(url).json()
+        views = {view['view']: view for view in data['views']}
+        self.assertEqual(views['quizes:quiz_list_view']['requests'], 1)
+        self.assertGreater(views['quizes:quiz_list_view']['queries_mean'], 0)
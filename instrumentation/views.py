@@ -0,0 +1,16 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from .middleware import WINDOW, statistics
+
+
+@staff_member_required
+def sql_statistics_view(request):
+    """The SQL statistics of the views over their last requests
+
+    They are kept in the memory of the process serving this request.
+    """
+    return JsonResponse({
+        'window': WINDOW,
+        'views': statistics.aggregates()
+    })
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Question, Answer
+from .models import Question, Answer, QuestionImport
 
 class AnswerInline(admin.TabularInline):
     model = Answer
@@ -10,4 +10,5 @@ class QuestionAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Question, QuestionAdmin)
-admin.site.register(Answer)
\ No newline at end of file
+admin.site.register(Answer)
+admin.site.register(QuestionImport)
\ No newline at end of file
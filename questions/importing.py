@@ -0,0 +1,141 @@
+"""
+Streaming import of question banks
+
+Files are read one record at a time and written in chunks, so the memory
+used does not depend on the size of the file. Two formats are read:
+
+CSV, with a header row. ``quiz`` and ``question`` columns, any number of
+``answer...`` columns (answer_1, answer_2...) and a ``correct`` column
+holding the text of the correct answer:
+
+    quiz,question,answer_1,answer_2,answer_3,correct
+    Python basics,What is 2 ** 3?,6,8,9,8
+
+JSONL, one object per line, the answers as objects or as texts along with
+a ``correct`` key:
+
+    {"quiz": 3, "question": "...", "answers": [{"text": "...", "correct": true}, ...]}
+    {"quiz": "Python basics", "question": "...", "answers": ["6", "8"], "correct": "8"}
+
+Quizes are given by id or by name.
+"""
+import csv
+import json
+
+from quizes.models import Quiz
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def read_csv(f):
+    """Records of a CSV file"""
+    reader = csv.DictReader(f)
+    fields = reader.fieldnames or []
+    if 'question' not in fields:
+        raise InvalidRecord("The CSV file has no question column")
+    answer_fields = [field for field in fields if field.startswith('answer')]
+
+    for row in reader:
+        correct = row.get('correct')
+        yield {
+            'quiz': row.get('quiz'),
+            'question': row['question'],
+            'answers': [
+                {'text': row[field], 'correct': row[field] == correct}
+                for field in answer_fields if row[field]
+            ],
+        }
+
+
+def read_jsonl(f):
+    """Records of a JSONL file, blank lines skipped"""
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            # Rejected as a record, so the records after it are still read
+            yield InvalidRecord(f"Invalid JSON: {e}")
+            continue
+
+        if isinstance(record, dict) and 'correct' in record:
+            record['answers'] = [
+                {'text': answer, 'correct': answer == record['correct']}
+                if isinstance(answer, str) else answer
+                for answer in record.get('answers') or []
+            ]
+        yield record
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+class QuizResolver:
+    """Find the id of quizes given by id or name, remembering them"""
+
+    def __init__(self, default=None):
+        self.ids = {}
+        self.default = self(default) if default not in (None, '') else None
+
+    def __call__(self, reference):
+        reference = str(reference).strip()
+        if reference not in self.ids:
+            if reference.isdigit():
+                ids = list(Quiz.objects.filter(pk=reference).values_list('pk', flat=True))
+            else:
+                ids = list(Quiz.objects.filter(name=reference).values_list('pk', flat=True)[:2])
+
+            if not ids:
+                raise InvalidRecord(f"Unknown quiz {reference!r}")
+            if len(ids) > 1:
+                raise InvalidRecord(f"Several quizes are named {reference!r}, use its id")
+            self.ids[reference] = ids[0]
+        return self.ids[reference]
+
+
+def clean(record, resolve_quiz):
+    """The quiz id, text and answers of a record
+
+    Raises InvalidRecord when the record can't be imported.
+    """
+    if isinstance(record, InvalidRecord):
+        raise record
+    if not isinstance(record, dict):
+        raise InvalidRecord("Not an object")
+
+    quiz = record.get('quiz')
+    if quiz in (None, ''):
+        if resolve_quiz.default is None:
+            raise InvalidRecord("No quiz")
+        quiz_id = resolve_quiz.default
+    else:
+        quiz_id = resolve_quiz(quiz)
+
+    text = record.get('question')
+    if not isinstance(text, str) or not text.strip():
+        raise InvalidRecord("No question text")
+
+    answers = record.get('answers')
+    if not isinstance(answers, list) or len(answers) < 2:
+        raise InvalidRecord("Less than two answers")
+
+    cleaned = []
+    for answer in answers:
+        if not isinstance(answer, dict) or not isinstance(answer.get('text'), str) \
+                or not answer['text'].strip():
+            raise InvalidRecord("Answers need a text")
+        cleaned.append((answer['text'], bool(answer.get('correct'))))
+
+    # Answers are graded by their text
+    if len({answer for answer, _ in cleaned}) < len(cleaned):
+        raise InvalidRecord("Duplicated answers")
+    if sum(correct for _, correct in cleaned) != 1:
+        raise InvalidRecord("Not exactly one correct answer")
+
+    return quiz_id, text, cleaned
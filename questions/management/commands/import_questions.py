@@ -0,0 +1,211 @@
+import csv
+import hashlib
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from questions.importing import READERS, InvalidRecord, QuizResolver, clean
+from questions.models import Answer, Question, QuestionImport
+from quizes.listing import invalidate_list
+from quizes.snapshots import publish_snapshot
+
+
+# Rejected records reported one by one, the next ones are only counted
+REPORTED_REJECTIONS = 20
+
+EXTENSIONS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+
+def file_checksum(path):
+    """SHA-256 of the content of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a question bank from a CSV or JSONL file (see "
+        "questions.importing for the formats). The file is streamed and "
+        "written in chunks, each in its own transaction along with the "
+        "progress of the import, so an interrupted import can be resumed "
+        "with --resume. A file whose content was already imported, from "
+        "any path, is not imported again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=tuple(READERS),
+            help="Format of the file, guessed from its extension by default",
+        )
+        parser.add_argument('--encoding', default='utf-8-sig')
+        parser.add_argument(
+            '--quiz', help="Id or name of the quiz of the records without one",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Records written per transaction",
+        )
+        parser.add_argument(
+            '--strict', action='store_true',
+            help="Stop at the first invalid record instead of skipping it",
+        )
+        progress = parser.add_mutually_exclusive_group()
+        progress.add_argument(
+            '--resume', action='store_true',
+            help="Continue an interrupted import after its last committed chunk",
+        )
+        progress.add_argument(
+            '--restart', action='store_true',
+            help="Import the file from the start even if an import of it was interrupted",
+        )
+
+    def handle(self, path, **options):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError(
+                "The database doesn't return the ids of bulk inserted rows, "
+                "which the answers are linked with"
+            )
+
+        fmt = options['format'] or EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        if fmt is None:
+            raise CommandError("Unknown file extension, give the --format")
+        if options['chunk_size'] < 1:
+            raise CommandError("The chunk size must be positive")
+
+        try:
+            resolve_quiz = QuizResolver(options['quiz'])
+        except InvalidRecord as e:
+            raise CommandError(e)
+
+        try:
+            checksum = file_checksum(path)
+        except OSError as e:
+            raise CommandError(e)
+
+        progress = self.progress(os.path.abspath(path), checksum, options)
+        if progress.finished:
+            self.stdout.write(f"{path} was already imported (from {progress.source})")
+            return
+
+        try:
+            with open(path, encoding=options['encoding'], newline='') as f:
+                records = islice(enumerate(READERS[fmt](f), 1), progress.records, None)
+                self.load(records, resolve_quiz, progress, options)
+        except (OSError, UnicodeDecodeError, csv.Error, InvalidRecord) as e:
+            raise CommandError(e)
+
+        # Bulk inserts send no signals, publish the quizes once at the end
+        for quiz_id in progress.quizes:
+            publish_snapshot(quiz_id)
+        invalidate_list()
+
+        progress.finished = True
+        progress.save(update_fields=['finished', 'date'])
+
+    def progress(self, source, checksum, options):
+        """The QuestionImport to record the import of the file in
+
+        The finished import of the same content when there is one.
+        """
+        imported = QuestionImport.objects.filter(checksum=checksum, finished=True).first()
+        if imported is not None:
+            return imported
+
+        progress = QuestionImport.objects.filter(source=source).first()
+
+        if options['resume']:
+            if progress is None:
+                raise CommandError(f"No import of {source} to resume")
+            if progress.checksum and progress.checksum != checksum:
+                raise CommandError(
+                    f"{source} changed since its import stopped, start over with --restart"
+                )
+            progress.checksum = checksum
+            if progress.records:
+                self.stdout.write(f"Resuming after record {progress.records}")
+            return progress
+
+        if progress is not None and not progress.finished and not options['restart']:
+            raise CommandError(
+                f"An import of {source} stopped after {progress.records} records, "
+                f"continue it with --resume or start over with --restart"
+            )
+        progress, _ = QuestionImport.objects.update_or_create(source=source, defaults={
+            'checksum': checksum, 'records': 0, 'questions': 0, 'answers': 0,
+            'rejected': 0, 'quizes': [], 'finished': False,
+        })
+        return progress
+
+    def load(self, records, resolve_quiz, progress, options):
+        start = time.perf_counter()
+        read = written = 0
+
+        while True:
+            chunk = list(islice(records, options['chunk_size']))
+            if not chunk:
+                break
+
+            questions, rejected = [], 0
+            for number, record in chunk:
+                try:
+                    questions.append(clean(record, resolve_quiz))
+                except InvalidRecord as e:
+                    if options['strict']:
+                        raise CommandError(f"Record {number}: {e}")
+                    if progress.rejected + rejected < REPORTED_REJECTIONS:
+                        self.stderr.write(f"Record {number} rejected: {e}")
+                    rejected += 1
+
+            with transaction.atomic():
+                answers = self.write(questions)
+
+                progress.records += len(chunk)
+                progress.questions += len(questions)
+                progress.answers += answers
+                progress.rejected += rejected
+                progress.quizes = sorted(
+                    set(progress.quizes) | {quiz_id for quiz_id, _, _ in questions}
+                )
+                progress.save()
+
+            read += len(chunk)
+            written += len(questions) + answers
+            elapsed = time.perf_counter() - start
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f"{progress.records} records, {read / elapsed:.0f} records/s, "
+                    f"{written / elapsed:.0f} rows/s"
+                )
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"Imported {progress.questions} questions and {progress.answers} answers, "
+            f"rejected {progress.rejected} records. "
+            f"{read} records read in {elapsed:.2f} s "
+            f"({read / elapsed if elapsed else 0:.0f} records/s, "
+            f"{written / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+
+    def write(self, questions):
+        """Insert the questions and their answers, returns the number of answers"""
+        created = Question.objects.bulk_create([
+            Question(quiz_id=quiz_id, text=text) for quiz_id, text, _ in questions
+        ])
+        answers = [
+            Answer(question_id=question.pk, text=text, correct=correct)
+            for question, (_, _, choices) in zip(created, questions)
+            for text, correct in choices
+        ]
+        Answer.objects.bulk_create(answers)
+        return len(answers)
@@ -0,0 +1,27 @@
+# Generated by Django 4.0.4 on 2026-10-18 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Absolute path of the imported file', max_length=500, unique=True)),
+                ('records', models.PositiveIntegerField(default=0, help_text='Records of the file read so far, imported or rejected')),
+                ('questions', models.PositiveIntegerField(default=0)),
+                ('answers', models.PositiveIntegerField(default=0)),
+                ('rejected', models.PositiveIntegerField(default=0)),
+                ('quizes', models.JSONField(default=list, help_text='Ids of the quizes questions were imported to')),
+                ('finished', models.BooleanField(default=False)),
+                ('date', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
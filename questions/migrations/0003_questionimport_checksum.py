@@ -0,0 +1,18 @@
+# Generated by Django 4.0.4 on 2026-10-18 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0002_questionimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionimport',
+            name='checksum',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the content of the imported file', max_length=64),
+        ),
+    ]
@@ -55,4 +55,47 @@ class Answer(models.Model):
 
     def __str__(self):
         return f"Question: {str(self.question.text)[:15]}, Ans: {str(self.text)[:10]}, Correct: {self.correct}"
-    
\ No newline at end of file
+    
+
+class QuestionImport(models.Model):
+    """
+    The progress of a question bank import (see the import_questions
+    command). It is saved in the transaction of every chunk written, so an
+    interrupted import resumes after the last committed chunk.
+    """
+
+    source = models.CharField(
+        help_text="Absolute path of the imported file",
+        max_length=500,
+        unique=True
+    )
+
+    checksum = models.CharField(
+        help_text="SHA-256 of the content of the imported file",
+        max_length=64,
+        blank=True,
+        db_index=True
+    )
+
+    records = models.PositiveIntegerField(
+        help_text="Records of the file read so far, imported or rejected",
+        default=0
+    )
+
+    questions = models.PositiveIntegerField(default=0)
+
+    answers = models.PositiveIntegerField(default=0)
+
+    rejected = models.PositiveIntegerField(default=0)
+
+    quizes = models.JSONField(
+        help_text="Ids of the quizes questions were imported to",
+        default=list
+    )
+
+    finished = models.BooleanField(default=False)
+
+    date = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} - {self.records} records"
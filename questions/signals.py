@@ -0,0 +1,28 @@
+"""
+Signals of the Questions app
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from quizes.listing import invalidate_list
+from quizes.snapshots import schedule_publish
+from .models import Question, Answer
+
+
+@receiver([post_save, post_delete], sender=Question)
+def publish_question_quiz(sender, instance, **kwargs):
+    """A new snapshot of the quiz when one of its questions changes"""
+    schedule_publish(instance.quiz_id)
+    # The quiz list shows the number of questions of the quizes
+    invalidate_list()
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def publish_answer_quiz(sender, instance, **kwargs):
+    """A new snapshot of the quiz when one of its answers changes"""
+    try:
+        question = instance.question
+    except Question.DoesNotExist:
+        # Deleted along with its question, which publishes the quiz
+        return
+    schedule_publish(question.quiz_id)
@@ -1,3 +1,147 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
 from django.test import TestCase
 
-# Create your tests here.
+from quizes.models import Quiz
+from quizes.snapshots import get_snapshot, snapshot_questions
+from .models import Answer, Question, QuestionImport
+
+
+class ImportQuestionsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.quiz = Quiz.objects.create(
+            name="Python basics",
+            number_of_questions=10,
+            time=10,
+            required_score=50,
+            difficulty="Easy",
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def call(self, path, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_questions', path, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_csv(self):
+        path = self.write('bank.csv', (
+            "quiz,question,answer_1,answer_2,answer_3,correct\n"
+            "Python basics,What is 2 ** 3?,6,8,9,8\n"
+            f"{self.quiz.pk},\"Multi\nline\",yes,no,,no\n"
+            "Python basics,No correct answer,a,b,c,d\n"
+            "Unknown quiz,Question,a,b,,a\n"
+        ))
+
+        stdout, stderr = self.call(path, chunk_size=2)
+
+        self.assertIn("Imported 2 questions and 5 answers, rejected 2 records", stdout)
+        self.assertIn("Record 3 rejected: Not exactly one correct answer", stderr)
+        self.assertIn("Record 4 rejected: Unknown quiz 'Unknown quiz'", stderr)
+        question = Question.objects.get(text="What is 2 ** 3?")
+        self.assertEqual(question.quiz, self.quiz)
+        self.assertEqual(question.answers.get(correct=True).text, "8")
+        self.assertEqual(Question.objects.get(text="Multi\nline").answers.count(), 2)
+
+        progress = QuestionImport.objects.get()
+        self.assertTrue(progress.finished)
+        self.assertEqual(progress.records, 4)
+        self.assertEqual(progress.quizes, [self.quiz.pk])
+
+        # The imported questions are served
+        ids = self.quiz.questions.values_list('pk', flat=True)
+        self.assertEqual(len(snapshot_questions(get_snapshot(self.quiz.pk), ids)), 2)
+
+    def test_jsonl(self):
+        lines = [
+            {'question': "Objects", 'answers': [
+                {'text': "a", 'correct': False}, {'text': "b", 'correct': True},
+            ]},
+            {'question': "Texts", 'answers': ["a", "b"], 'correct': "a"},
+            {'question': "Duplicates", 'answers': ["a", "a"], 'correct': "a"},
+        ]
+        path = self.write('bank.jsonl', '\n'.join(map(json.dumps, lines)) + '\n\n{broken\n')
+
+        stdout, stderr = self.call(path, quiz=str(self.quiz.pk))
+
+        self.assertIn("Imported 2 questions and 4 answers, rejected 2 records", stdout)
+        self.assertIn("Record 3 rejected: Duplicated answers", stderr)
+        self.assertIn("Record 4 rejected: Invalid JSON", stderr)
+        self.assertEqual(Answer.objects.get(correct=True, question__text="Texts").text, "a")
+
+    def test_strict(self):
+        path = self.write('bank.csv', (
+            "quiz,question,answer_1,answer_2,correct\n"
+            "Python basics,First,a,b,a\n"
+            "Python basics,,a,b,a\n"
+        ))
+
+        with self.assertRaisesMessage(CommandError, "Record 2: No question text"):
+            self.call(path, strict=True, chunk_size=1)
+        # The chunk before the invalid record is committed
+        self.assertEqual(Question.objects.count(), 1)
+        self.assertFalse(QuestionImport.objects.get().finished)
+
+    def test_resume(self):
+        path = self.write('bank.csv', "quiz,question,answer_1,answer_2,correct\n" + ''.join(
+            f"Python basics,Question {i},a,b,a\n" for i in range(5)
+        ))
+        # An import interrupted after its first two records
+        QuestionImport.objects.create(
+            source=os.path.abspath(path), records=2, questions=2, answers=4,
+            quizes=[self.quiz.pk],
+        )
+
+        with self.assertRaisesMessage(CommandError, "--resume"):
+            self.call(path)
+
+        stdout, _ = self.call(path, resume=True, chunk_size=2)
+
+        self.assertIn("Resuming after record 2", stdout)
+        self.assertIn("Imported 5 questions and 10 answers", stdout)
+        self.assertEqual(
+            sorted(Question.objects.values_list('text', flat=True)),
+            ["Question 2", "Question 3", "Question 4"]
+        )
+
+    def test_imported_once(self):
+        content = "quiz,question,answer_1,answer_2,correct\nPython basics,Once,a,b,a\n"
+        path = self.write('bank.csv', content)
+        self.call(path)
+
+        stdout, _ = self.call(path)
+        self.assertIn("bank.csv was already imported", stdout)
+        # The same content under another name
+        stdout, _ = self.call(self.write('copy.csv', content), resume=True)
+        self.assertIn("copy.csv was already imported", stdout)
+        self.assertEqual(Question.objects.count(), 1)
+
+        # Changed, it is another bank
+        self.write('bank.csv', content + "Python basics,Twice,a,b,a\n")
+        self.call(path)
+        self.assertEqual(Question.objects.count(), 3)
+
+    def test_resume_a_changed_file(self):
+        path = self.write('bank.csv', "quiz,question,answer_1,answer_2,correct\n")
+        QuestionImport.objects.create(source=os.path.abspath(path), checksum="0" * 64, records=2)
+
+        with self.assertRaisesMessage(CommandError, "changed since its import stopped"):
+            self.call(path, resume=True)
+
+    def test_unknown_default_quiz(self):
+        path = self.write('bank.csv', "question,answer_1,answer_2,correct\n")
+        with self.assertRaisesMessage(CommandError, "Unknown quiz 'Nope'"):
+            self.call(path, quiz="Nope")
@@ -0,0 +1,63 @@
+"""
+Recording of the answers clicked during a quiz
+
+record_answer reads what it needs in one query: the answer, its shared
+given question and the quiz of the user for its category. It then writes
+in one transaction of at most two statements. The INSERT of the link
+between the quiz and the given question comes first. A unique constraint
+on (quiz, question) rejects a second answer to the question, even from
+concurrent clicks. Then an UPDATE adds the points of the answer to the
+marks counter of the quiz with F().
+
+The given questions are shared by every quiz, one per (question, answer)
+with the points of the answer. The first click on an answer creates its
+row in the same transaction, a third statement: an INSERT that does
+nothing on a conflict with the unique constraint, when a concurrent click
+created it first, and the link reads its uid with a subquery.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import Answer, GivenQuizQuestions, Quiz, QuizGivenQuestion
+
+
+def record_answer(user, answer_uid):
+    """Record an answer of the user in the quiz of its category
+
+    Returns whether the answer is correct, whether it was recorded (False
+    when the question already had an answer in the quiz) and the marks of
+    the quiz. The marks are the ones read before the click plus its points,
+    another click recorded meanwhile may not be counted in them yet.
+    Raises Answer.DoesNotExist and Quiz.DoesNotExist.
+    """
+    given = GivenQuizQuestions.objects.filter(answer=OuterRef("pk"))
+    quiz = Quiz.objects.filter(user=user, category=OuterRef("question__category")).order_by("-start_time")
+    answer = Answer.objects.select_related("question").annotate(
+        given_uid=Subquery(given.values("uid")[:1]),
+        given_points=Subquery(given.values("points")[:1]),
+        quiz_uid=Subquery(quiz.values("uid")[:1]),
+        quiz_marks=Subquery(quiz.values("marks")[:1]),
+    ).get(uid=answer_uid)
+    if answer.quiz_uid is None:
+        raise Quiz.DoesNotExist("No quiz of the user for the category of the answer")
+
+    given_uid, points = answer.given_uid, answer.given_points
+    try:
+        with transaction.atomic():
+            if given_uid is None:
+                points = answer.question.mark if answer.is_correct else 0
+                GivenQuizQuestions.objects.bulk_create(
+                    [GivenQuizQuestions(question=answer.question, answer=answer, points=points)],
+                    ignore_conflicts=True,
+                )
+                given_uid = Subquery(
+                    GivenQuizQuestions.objects.filter(question=answer.question, answer=answer).values("uid")
+                )
+            QuizGivenQuestion.objects.create(
+                quiz_id=answer.quiz_uid, givenquizquestions_id=given_uid, question=answer.question,
+            )
+            if points:
+                Quiz.objects.filter(uid=answer.quiz_uid).add_marks(points)
+    except IntegrityError:
+        return answer.is_correct, False, answer.quiz_marks
+    return answer.is_correct, True, answer.quiz_marks + points
@@ -0,0 +1,101 @@
+from uuid import uuid4
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from home.models import Answer, Category, GivenQuizQuestions, Payment, Question, Quiz, UserActivity
+from instrumentation.advisor import explain, propose, record, report
+
+
+def seed(categories=3, questions=10, answers=3, users=3):
+    """Categories with their questions, and users having taken their quizes"""
+    staff = User.objects.create_user('advisor-staff', password='advisor', is_staff=True)
+    candidates = [
+        User.objects.create_user(f'advisor-{i}', password='advisor') for i in range(users)
+    ]
+
+    for i in range(categories):
+        category = Category.objects.create(name=f'Category {i}')
+        for j in range(questions):
+            question = Question.objects.create(category=category, question=f'Question {j}')
+            Answer.objects.bulk_create(
+                Answer(question=question, answer=f'Answer {k}', is_correct=k == 0)
+                for k in range(answers)
+            )
+        answer = Answer.objects.filter(question__category=category).first()
+        given = GivenQuizQuestions.objects.create(question=answer.question, answer=answer, points=5)
+        for user in candidates:
+            quiz = Quiz.objects.create(uid=uuid4().hex, user=user, category=category)
+            quiz.given_question.add(given, through_defaults={'question': given.question})
+
+    for user in candidates:
+        Payment.objects.create(user=user, amount=100, status='completed')
+        UserActivity.objects.create(user=user, action='quiz')
+    return staff, candidates
+
+
+def scenarios(staff, user):
+    """(name, callable) pairs requesting the home and management views"""
+    client, staff_client = Client(), Client()
+    client.force_login(user)
+    staff_client.force_login(staff)
+
+    category = Category.objects.order_by('name').first()
+    answer = Answer.objects.filter(question__category=category, is_correct=True).first()
+
+    return [
+        ('index', lambda: client.get(reverse('index'), {'category': category.name})),
+        ('quiz', lambda: client.get(reverse('quiz'), {'category': category.name, 'page': 2})),
+        ('check answer', lambda: client.get(reverse('check_answer', args=[answer.uid, 'true']))),
+        ('attended questions', lambda: client.get(
+            reverse('load_attended_question_data', args=[answer.question.uid])
+        )),
+        ('dashboard', lambda: staff_client.get(reverse('management_dashboard'))),
+        ('quiz activity', lambda: staff_client.get(reverse('quiz_activity'))),
+        ('data visualization', lambda: staff_client.get(reverse('data_visualization'))),
+        ('user activity log', lambda: staff_client.get(reverse('user_activity_log'))),
+        ('statistics', lambda: staff_client.get(reverse('statistics'))),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the queries of the home and management views on a throwaway "
+        "database, EXPLAIN QUERY PLAN each of them, flag full table scans and "
+        "temporary B-trees and propose the missing indexes. Run it again on "
+        "every schema change; --check fails when an index is missing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Show the plans of every query, not only the flagged ones",
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Fail when indexes are proposed",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("The index advisor reads SQLite query plans")
+
+        # A test database, the advice must not depend on the real data
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                staff, candidates = seed()
+                queries, failures = record(scenarios(staff, candidates[0]))
+                plans = [explain(query) for query in queries]
+                proposals = propose(plans)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(report(plans, proposals, failures, verbose=options['all']))
+
+        if options['check'] and proposals:
+            raise CommandError(f"{len(proposals)} missing indexes")
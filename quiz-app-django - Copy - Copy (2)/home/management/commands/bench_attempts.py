@@ -0,0 +1,164 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+
+from home.answers import record_answer
+from home.models import Answer, Category, GivenQuizQuestions, Question, Quiz, QuizGivenQuestion
+
+
+def seed(users, questions):
+    """A category of questions with their given questions, a quiz per user"""
+    category = Category.objects.create(name='Benchmark', total_time=60)
+    Question.objects.bulk_create(
+        Question(category=category, question=f'Question {i}', mark=5) for i in range(questions)
+    )
+    answers = []
+    for question in Question.objects.filter(category=category):
+        answers += [
+            Answer(question=question, answer='Right', is_correct=True),
+            Answer(question=question, answer='Wrong', is_correct=False),
+        ]
+    Answer.objects.bulk_create(answers)
+    GivenQuizQuestions.objects.bulk_create(
+        GivenQuizQuestions(question_id=answer.question_id, answer=answer, points=5 if answer.is_correct else 0)
+        for answer in Answer.objects.filter(question__category=category)
+    )
+    User.objects.bulk_create(User(username=f'bench-{i}') for i in range(users))
+    for user in User.objects.filter(username__startswith='bench-'):
+        Quiz.objects.create(uid=uuid4().hex, user=user, category=category)
+    return category
+
+
+def recompute(user, answer_uid):
+    """The former path: link the answer, save the quiz, re-sum its marks"""
+    answer = Answer.objects.select_related('question').get(uid=answer_uid)
+    given = GivenQuizQuestions.objects.get(question=answer.question, answer=answer)
+    quiz = Quiz.objects.get(user=user, category=answer.question.category)
+    if Quiz.objects.filter(user=user, given_question__question=answer.question).exists():
+        return False
+    quiz.given_question.add(given, through_defaults={'question': answer.question})
+    quiz.save()
+    # What calculate_marks did on every save
+    marks = sum(quiz.given_question.values_list('points', flat=True) or [0])
+    if quiz.marks != marks:
+        quiz.marks = marks
+        quiz.save(update_fields=['marks'])
+    return True
+
+
+PATHS = {
+    'recompute': recompute,
+    'counter': lambda user, answer_uid: record_answer(user, answer_uid)[1],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the quiz attempts when every answer "
+        "re-sums the marks of its quiz (the former calculate_marks) and "
+        "when it adds its points to the marks counter. Concurrent "
+        "candidates answer every question of their quiz, on a throwaway "
+        "file database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=16, help="Concurrent candidates")
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--format', choices=('table', 'json'), default='table')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("The benchmark runs on a throwaway SQLite database")
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        report = {}
+        try:
+            category = seed(options['users'], options['questions'])
+            users = list(User.objects.filter(username__startswith='bench-'))
+            # Every question answered, correct and wrong alternately
+            answers = [
+                answer.uid for i, answer in enumerate(
+                    Answer.objects.filter(question__category=category).order_by('question', '-is_correct')
+                ) if i % 2 == (i // 2) % 2
+            ]
+            for name, path in PATHS.items():
+                QuizGivenQuestion.objects.all().delete()
+                Quiz.objects.update(marks=0)
+                report[name] = self.run(path, users, answers)
+                expected = Quiz.objects.with_expected_marks().aggregate(
+                    marks=Sum('marks'), expected=Sum('expected_marks')
+                )
+                report[name]['consistent'] = expected['marks'] == expected['expected']
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(self.table(report))
+
+    def run(self, path, users, answers):
+        samples, errors = [], 0
+        lock = threading.Lock()
+
+        def candidate(user):
+            nonlocal errors
+            try:
+                for answer_uid in answers:
+                    start = time.perf_counter()
+                    try:
+                        path(user, answer_uid)
+                    except OperationalError:
+                        # database is locked
+                        with lock:
+                            errors += 1
+                        continue
+                    with lock:
+                        samples.append((time.perf_counter() - start) * 1000)
+            finally:
+                connection.close()
+
+        # The queries of one answer, on a question of its own
+        with CaptureQueriesContext(connection) as queries:
+            path(users[0], answers[0])
+        QuizGivenQuestion.objects.all().delete()
+        Quiz.objects.update(marks=0)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(len(users)) as executor:
+            list(executor.map(candidate, users))
+        elapsed = time.perf_counter() - start
+
+        quantiles = statistics.quantiles(samples, n=100) if len(samples) > 1 else [0] * 99
+        return {
+            'answers': len(samples),
+            'errors': errors,
+            'queries_per_answer': len(queries),
+            'throughput': len(samples) / elapsed,
+            'p50_ms': quantiles[49],
+            'p95_ms': quantiles[94],
+        }
+
+    def table(self, report):
+        lines = [
+            f"{'path':<10} {'answers':>7} {'answers/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'queries':>7} {'errors':>6} {'consistent':>10}"
+        ]
+        for name, run in report.items():
+            lines.append(
+                f"{name:<10} {run['answers']:>7} {run['throughput']:>9.1f} {run['p50_ms']:>8.2f} "
+                f"{run['p95_ms']:>8.2f} {run['queries_per_answer']:>7} {run['errors']:>6} "
+                f"{str(run['consistent']):>10}"
+            )
+        return '\n'.join(lines)
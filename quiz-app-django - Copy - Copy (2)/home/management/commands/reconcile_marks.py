@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from home.models import Quiz
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the marks of every quiz from the points of its answers, "
+        "in batches, report the quizzes whose marks counter drifted and fix "
+        "them. --dry-run only reports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report the drift without fixing it",
+        )
+
+    def handle(self, *args, **options):
+        checked = drifted = drift = 0
+        last = ''
+        while True:
+            # Keyset batches, every batch is one read and at most one write
+            batch = list(
+                Quiz.objects.filter(uid__gt=last).order_by('uid').with_expected_marks()
+                .values_list('uid', 'marks', 'expected_marks')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last = batch[-1][0]
+            checked += len(batch)
+
+            wrong = [(uid, marks, expected) for uid, marks, expected in batch if marks != expected]
+            for uid, marks, expected in wrong:
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"{uid}: {marks} marks, {expected} expected")
+                drift += abs(marks - expected)
+            drifted += len(wrong)
+            if wrong and not options['dry_run']:
+                # Recomputed by the UPDATE itself, not from the values read
+                Quiz.objects.filter(uid__in=[uid for uid, _, _ in wrong]).recompute_marks()
+
+        self.stdout.write(
+            f"{checked} quizzes checked, {drifted} drifted by {drift} marks in total"
+            f"{', fixed' if drifted and not options['dry_run'] else ''}"
+        )
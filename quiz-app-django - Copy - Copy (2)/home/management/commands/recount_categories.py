@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from home.models import Category
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the questions and marks of every category, report the "
+        "counters that drifted (after bulk changes to the questions, which "
+        "send no signals) and fix them. --dry-run only reports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report the drift without fixing it",
+        )
+
+    def handle(self, *args, **options):
+        checked = drifted = 0
+        last = None
+        while True:
+            categories = Category.objects.order_by('uid')
+            if last is not None:
+                categories = categories.filter(uid__gt=last)
+            batch = list(
+                categories.with_counted_totals().values_list(
+                    'uid', 'name', 'total_questions', 'counted_questions', 'total_marks', 'counted_marks'
+                )[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last = batch[-1][0]
+            checked += len(batch)
+
+            wrong = [row for row in batch if (row[2], row[4]) != (row[3], row[5])]
+            for uid, name, questions, counted_questions, marks, counted_marks in wrong:
+                self.stdout.write(
+                    f"{name}: {questions} questions and {marks} marks, "
+                    f"{counted_questions} and {counted_marks} counted"
+                )
+            drifted += len(wrong)
+            if wrong and not options['dry_run']:
+                Category.objects.filter(uid__in=[row[0] for row in wrong]).recount()
+
+        self.stdout.write(
+            f"{checked} categories checked, {drifted} drifted"
+            f"{', fixed' if drifted and not options['dry_run'] else ''}"
+        )
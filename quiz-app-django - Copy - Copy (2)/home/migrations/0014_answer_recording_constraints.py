@@ -0,0 +1,99 @@
+# Generated by Django 4.0.4 on 2026-10-18 11:40
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def prepare_constraints(apps, schema_editor):
+    """Merge the duplicate rows the new unique constraints forbid"""
+    GivenQuizQuestions = apps.get_model('home', 'GivenQuizQuestions')
+    QuizGivenQuestion = apps.get_model('home', 'QuizGivenQuestion')
+    Quiz = apps.get_model('home', 'Quiz')
+
+    # One given question per (question, answer), the oldest one
+    kept = {}
+    for given in GivenQuizQuestions.objects.order_by('created_at', 'uid'):
+        key = (given.question_id, given.answer_id)
+        if key not in kept:
+            kept[key] = given.uid
+            continue
+        for link in QuizGivenQuestion.objects.filter(givenquizquestions_id=given.uid):
+            if QuizGivenQuestion.objects.filter(quiz_id=link.quiz_id, givenquizquestions_id=kept[key]).exists():
+                link.delete()
+            else:
+                link.givenquizquestions_id = kept[key]
+                link.save(update_fields=['givenquizquestions'])
+        given.delete()
+
+    # The points were never set, the marks of the quizes were always 0
+    for given in GivenQuizQuestions.objects.select_related('question', 'answer'):
+        given.points = given.question.mark if given.answer.is_correct else 0
+        given.save(update_fields=['points'])
+
+    # One answer per question and quiz, the first one given
+    seen = set()
+    for link in QuizGivenQuestion.objects.select_related('givenquizquestions').order_by('id'):
+        key = (link.quiz_id, link.givenquizquestions.question_id)
+        if key in seen:
+            link.delete()
+            continue
+        seen.add(key)
+        link.question_id = link.givenquizquestions.question_id
+        link.save(update_fields=['question'])
+
+    points = QuizGivenQuestion.objects.filter(quiz=models.OuterRef('pk')).order_by().values('quiz').annotate(
+        total=models.Sum('givenquizquestions__points')
+    ).values('total')
+    Quiz.objects.update(marks=Coalesce(models.Subquery(points), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0013_payment_created_at'),
+    ]
+
+    operations = [
+        # The table Django created for the many-to-many field, now a model
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='QuizGivenQuestion',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('givenquizquestions', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='home.givenquizquestions')),
+                        ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='home.quiz')),
+                    ],
+                    options={
+                        'db_table': 'home_quiz_given_question',
+                        'unique_together': {('quiz', 'givenquizquestions')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='quiz',
+                    name='given_question',
+                    field=models.ManyToManyField(blank=True, through='home.QuizGivenQuestion', to='home.givenquizquestions'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='quizgivenquestion',
+            name='question',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='home.question'),
+        ),
+        migrations.RunPython(prepare_constraints, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='quizgivenquestion',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='home.question'),
+        ),
+        migrations.AddConstraint(
+            model_name='givenquizquestions',
+            constraint=models.UniqueConstraint(fields=('question', 'answer'), name='home_given_question_answer_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='quizgivenquestion',
+            constraint=models.UniqueConstraint(fields=('quiz', 'question'), name='home_quiz_one_answer_per_question'),
+        ),
+    ]
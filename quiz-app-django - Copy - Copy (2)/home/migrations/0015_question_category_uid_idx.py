@@ -0,0 +1,17 @@
+# Generated by Django 4.0.4 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0014_answer_recording_constraints'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['category', 'uid'], name='home_question_category_uid_idx'),
+        ),
+    ]
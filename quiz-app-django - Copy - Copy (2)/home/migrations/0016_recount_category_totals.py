@@ -0,0 +1,26 @@
+# Generated by Django 4.0.4 on 2026-10-18 14:20
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def recount(apps, schema_editor):
+    """Start the counters of the categories from their questions"""
+    Category = apps.get_model('home', 'Category')
+    Question = apps.get_model('home', 'Question')
+    questions = Question.objects.filter(category=models.OuterRef('pk')).order_by().values('category')
+    Category.objects.update(
+        total_questions=Coalesce(models.Subquery(questions.annotate(count=models.Count('pk')).values('count')), 0),
+        total_marks=Coalesce(models.Subquery(questions.annotate(total=models.Sum('mark')).values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0015_question_category_uid_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount, migrations.RunPython.noop),
+    ]
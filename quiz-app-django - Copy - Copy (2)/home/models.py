@@ -1,8 +1,9 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from uuid import uuid4
 from random import shuffle
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from datetime import timedelta
 
@@ -16,6 +17,32 @@ class BaseModel(models.Model):
         abstract = True
 
 
+class CategoryQuerySet(models.QuerySet):
+    def add_questions(self, questions, marks):
+        """Move the question and marks counters of the categories, in one UPDATE"""
+        return self.update(
+            total_questions=models.F("total_questions") + questions,
+            total_marks=models.F("total_marks") + marks,
+        )
+
+    def with_counted_totals(self):
+        """Annotate counted_questions and counted_marks, from the questions"""
+        questions, marks = self._counted_totals()
+        return self.annotate(counted_questions=questions, counted_marks=marks)
+
+    def recount(self):
+        """Set the counters of the categories from their questions, in one UPDATE"""
+        questions, marks = self._counted_totals()
+        return self.update(total_questions=questions, total_marks=marks)
+
+    def _counted_totals(self):
+        questions = Question.objects.filter(category=models.OuterRef("pk")).order_by().values("category")
+        return (
+            Coalesce(models.Subquery(questions.annotate(count=models.Count("pk")).values("count")), 0),
+            Coalesce(models.Subquery(questions.annotate(total=models.Sum("mark")).values("total")), 0),
+        )
+
+
 # 🔹 Categories (Each quiz belongs to a category)
 class Category(BaseModel):
     name = models.CharField(max_length=100)
@@ -26,17 +53,17 @@ class Category(BaseModel):
     pdf_file = models.FileField(upload_to="pdfs/", default=None, null=True, blank=True)  # PDF file field
     total_time = models.IntegerField(default=60)
 
+    # total_questions and total_marks count the questions of the category
+    # and their marks, moved by the signals of the questions below, the
+    # recount_categories command repairs them after bulk changes
+    objects = CategoryQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
     def get_total(self):
-        """Fix the method to properly calculate total marks and quizzes."""
-        if not hasattr(self, '_total_calculated'):
-            self._total_calculated = True
-            total_quizzes = self.quiz.count()  # Use 'quiz' instead of 'quiz_set'
-            total_marks = self.quiz.aggregate(models.Sum('marks'))['marks__sum'] or 0
-            return total_marks, total_quizzes
-        return 0, 0  # Default case
+        """The total marks and number of questions of the category"""
+        return self.total_marks, self.total_questions
 
 
 # 🔹 Questions
@@ -55,6 +82,36 @@ class Question(BaseModel):
 
     class Meta:
         ordering = ["uid"]
+        indexes = [
+            # The keyset pages of a category, see home.questions
+            models.Index(fields=["category", "uid"], name="home_question_category_uid_idx"),
+        ]
+
+
+# ✅ Keep the counters of the categories in step with their questions
+@receiver(pre_save, sender=Question)
+def remember_question_totals(sender, instance, **kwargs):
+    instance._previous_totals = None
+    if not instance._state.adding:
+        instance._previous_totals = (
+            Question.objects.filter(pk=instance.pk).values_list("category_id", "mark").first()
+        )
+
+
+@receiver(post_save, sender=Question)
+def count_question(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_totals", None)
+    if previous == (instance.category_id, instance.mark):
+        return
+    if previous is not None:
+        category_id, mark = previous
+        Category.objects.filter(pk=category_id).add_questions(-1, -mark)
+    Category.objects.filter(pk=instance.category_id).add_questions(1, instance.mark)
+
+
+@receiver(post_delete, sender=Question)
+def uncount_question(sender, instance, **kwargs):
+    Category.objects.filter(pk=instance.category_id).add_questions(-1, -instance.mark)
 
 
 # 🔹 Answers
@@ -80,6 +137,32 @@ class GivenQuizQuestions(BaseModel):
     def __str__(self):
         return f"{self.question.question} - {self.answer.answer}"
 
+    class Meta:
+        constraints = [
+            # Shared by every quiz, see record_answer
+            models.UniqueConstraint(fields=["question", "answer"], name="home_given_question_answer_uniq"),
+        ]
+
+
+class QuizQuerySet(models.QuerySet):
+    def add_marks(self, points):
+        """Add points to the marks of the quizzes, in one UPDATE"""
+        return self.update(marks=models.F("marks") + points)
+
+    def with_expected_marks(self):
+        """Annotate expected_marks, the sum of the points of the answers given"""
+        return self.annotate(expected_marks=self._expected_marks())
+
+    def recompute_marks(self):
+        """Set the marks of the quizzes from their answers, in one UPDATE"""
+        return self.update(marks=self._expected_marks())
+
+    def _expected_marks(self):
+        points = QuizGivenQuestion.objects.filter(quiz=models.OuterRef("pk")).order_by().values("quiz").annotate(
+            total=models.Sum("givenquizquestions__points")
+        ).values("total")
+        return Coalesce(models.Subquery(points), 0)
+
 
 # 🔹 Quiz Model (Each user takes multiple quizzes)
 class Quiz(models.Model):
@@ -93,24 +176,16 @@ class Quiz(models.Model):
     uid = models.CharField(max_length=32, primary_key=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="quiz")  # ✅ Fixed related_name
-    given_question = models.ManyToManyField(GivenQuizQuestions, blank=True)
+    given_question = models.ManyToManyField(GivenQuizQuestions, blank=True, through="QuizGivenQuestion")
     marks = models.IntegerField(default=0)
     total_marks = models.IntegerField(default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="not_started")
     start_time = models.DateTimeField(auto_now_add=True)
     end_time = models.DateTimeField(blank=True, null=True)
 
-    def calculate_marks(self):
-        """Calculate total marks based on correct answers."""
-        if hasattr(self, '_marks_calculated'):
-            return  
-
-        self._marks_calculated = True  
-        total_marks_obtained = sum(self.given_question.values_list('points', flat=True) or [0])  
-        
-        if self.marks != total_marks_obtained:  
-            self.marks = total_marks_obtained
-            self.save(update_fields=['marks'])  
+    # marks is a counter: record_answer adds the points of every answer
+    # with add_marks, the reconcile_marks command fixes any drift
+    objects = QuizQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.user.username} | {self.category.name} | {self.marks} marks"
@@ -120,12 +195,25 @@ class Quiz(models.Model):
         """Returns quiz completion percentage"""
         return round((self.marks / self.total_marks) * 100, 2) if self.total_marks else 0
 
-# ✅ Update marks when quiz is completed
+# 🔹 The answers given in a quiz, one per question
+class QuizGivenQuestion(models.Model):
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    givenquizquestions = models.ForeignKey(GivenQuizQuestions, on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = "home_quiz_given_question"
+        unique_together = [("quiz", "givenquizquestions")]
+        constraints = [
+            models.UniqueConstraint(fields=["quiz", "question"], name="home_quiz_one_answer_per_question"),
+        ]
+
+# ✅ The end of a new quiz, from the time allowed by its category
 @receiver(post_save, sender=Quiz)
-def update_marks(sender, instance, created, **kwargs):
-    if instance.category:
+def set_end_time(sender, instance, created, **kwargs):
+    if created and instance.end_time is None:
         instance.end_time = instance.start_time + timedelta(minutes=instance.category.total_time)
-    instance.calculate_marks()
+        Quiz.objects.filter(pk=instance.pk).update(end_time=instance.end_time)
 
 # 🔹 Payment Model (User pays for each quiz)
 from uuid import uuid4
@@ -143,6 +231,8 @@ class Payment(models.Model):
     response_dump = models.JSONField(default=dict, blank=True)
     checkout_url = models.URLField(null=True, blank=True)
     callback_url = models.URLField(default='http://localhost:8000/payment-callback/', blank=True)
+    # Null for the payments made before it was added back
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
 
     def __str__(self):
         return f"{self.first_name} - {self.last_name} | {self.amount}"
@@ -0,0 +1,65 @@
+"""
+Keyset pagination of the questions of a category
+
+The questions are ordered by uid, and a page starts after (or ends
+before) the uid of a question instead of at an OFFSET. With the
+(category, uid) index, a page is an index range read of its own rows, so
+the last page costs what the first one does, and no COUNT is needed. The
+answers of the questions of a page come with one more query.
+"""
+from collections import namedtuple
+from uuid import UUID
+
+from django.db.models import Prefetch
+
+from .models import Answer, Question
+
+
+MAX_LIMIT = 50
+
+# The questions of a page and the cursors of the pages around it, None at the ends
+Page = namedtuple("Page", "questions previous next")
+
+
+def parse_cursor(value):
+    """The uid of a cursor parameter, None when empty, ValueError when invalid"""
+    return UUID(value) if value else None
+
+
+def question_page(category=None, after=None, before=None, limit=1):
+    """The limit questions of the category after, or before, a question uid"""
+    limit = max(1, min(limit, MAX_LIMIT))
+    questions = Question.objects.prefetch_related(
+        Prefetch("answers", queryset=Answer.objects.only("uid", "answer", "question"))
+    )
+    if category is not None:
+        questions = questions.filter(category=category)
+
+    if before is not None:
+        rows = list(questions.filter(uid__lt=before).order_by("-uid")[:limit + 1])
+        more = len(rows) > limit
+        rows = rows[:limit][::-1]
+        # The next page starts after the last question of this one, the
+        # question at before included
+        return Page(rows, rows[0].uid if rows and more else None, rows[-1].uid if rows else None)
+
+    if after is not None:
+        questions = questions.filter(uid__gt=after)
+    rows = list(questions.order_by("uid")[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return Page(
+        rows,
+        rows[0].uid if rows and after is not None else None,
+        rows[-1].uid if more else None,
+    )
+
+
+def serialize(question):
+    """A question and its answers, without telling the correct one"""
+    return {
+        "uid": str(question.uid),
+        "question": question.question,
+        "mark": question.mark,
+        "answers": [{"uid": str(answer.uid), "answer": answer.answer} for answer in question.answers.all()],
+    }
@@ -1,3 +1,295 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from uuid import uuid4
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .answers import record_answer
+from .questions import question_page
+from .models import Answer, Category, GivenQuizQuestions, Question, Quiz, QuizGivenQuestion
+
+
+def make_quiz(user, questions=3):
+    category = Category.objects.create(name='Category')
+    for i in range(questions):
+        question = Question.objects.create(category=category, question=f'Question {i}', mark=5)
+        Answer.objects.create(question=question, answer='Right', is_correct=True)
+        Answer.objects.create(question=question, answer='Wrong', is_correct=False)
+    return Quiz.objects.create(uid=uuid4().hex, user=user, category=category)
+
+
+class RecordAnswerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('candidate', password='secret')
+        self.quiz = make_quiz(self.user)
+        self.right = Answer.objects.filter(is_correct=True).first()
+        self.wrong = Answer.objects.get(question=self.right.question, is_correct=False)
+
+    def test_records_and_adds_the_points(self):
+        self.assertEqual(record_answer(self.user, self.right.uid), (True, True, 5))
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.marks, 5)
+        self.assertEqual(list(self.quiz.given_question.values_list('answer', flat=True)), [self.right.uid])
+
+    def test_one_answer_per_question(self):
+        record_answer(self.user, self.wrong.uid)
+        self.assertEqual(record_answer(self.user, self.right.uid), (True, False, 0))
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.marks, 0)
+
+    def test_given_questions_are_shared(self):
+        other = User.objects.create_user('other', password='secret')
+        Quiz.objects.create(uid=uuid4().hex, user=other, category=self.quiz.category)
+        record_answer(self.user, self.right.uid)
+        record_answer(other, self.right.uid)
+        self.assertEqual(GivenQuizQuestions.objects.count(), 1)
+
+    def statements(self, answer):
+        with CaptureQueriesContext(connection) as queries:
+            record_answer(self.user, answer.uid)
+        return [q['sql'] for q in queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+
+    def test_queries(self):
+        GivenQuizQuestions.objects.create(question=self.right.question, answer=self.right, points=5)
+        # The read, the INSERT and the UPDATE
+        self.assertEqual(len(self.statements(self.right)), 3)
+
+    def test_queries_of_the_first_click(self):
+        statements = self.statements(self.right)
+        # The read, the INSERT of the given question, the INSERT and the UPDATE
+        self.assertEqual(len(statements), 4)
+        self.assertIn('INSERT OR IGNORE INTO "home_givenquizquestions"', statements[1])
+        given = GivenQuizQuestions.objects.get()
+        self.assertEqual((given.answer, given.points), (self.right, 5))
+        self.assertEqual(list(self.quiz.given_question.all()), [given])
+
+    def test_first_click_on_a_wrong_answer(self):
+        # No points, no UPDATE
+        self.assertEqual(len(self.statements(self.wrong)), 3)
+        self.assertEqual(GivenQuizQuestions.objects.get().points, 0)
+
+    def test_check_answer(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('check_answer', args=[self.right.uid, 'true']))
+        self.assertEqual(response.json(), {'status': 200, 'marks': 5, 'is_correct': 'true'})
+        response = self.client.get(reverse('check_answer', args=[self.right.uid, 'true']))
+        self.assertEqual(response.json(), {'status': 404, 'marks': 5, 'is_correct': 'true'})
+
+
+class AttendedQuestionsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('candidate', password='secret')
+        self.quiz = make_quiz(self.user, questions=3)
+        self.url = reverse('attended_questions', args=[self.quiz.uid])
+        self.client.force_login(self.user)
+
+    def test_every_attended_question(self):
+        right, wrong = [Answer.objects.filter(is_correct=flag).order_by('question')[0] for flag in (True, False)]
+        record_answer(self.user, right.uid)
+        response = self.client.get(self.url)
+        questions = response.json()['questions']
+        self.assertEqual(list(questions), [str(right.question_id)])
+        self.assertEqual(
+            {item['uid']: (item['isCorrect'], item['isSelected']) for item in questions[str(right.question_id)]},
+            {str(right.uid): ('True', 'true'), str(wrong.uid): ('False', 'false')},
+        )
+
+    def test_queries_do_not_grow_with_the_questions(self):
+        answers = list(Answer.objects.filter(is_correct=True))
+        record_answer(self.user, answers[0].uid)
+        with CaptureQueriesContext(connection) as one:
+            self.client.get(self.url)
+        for answer in answers[1:]:
+            record_answer(self.user, answer.uid)
+        with CaptureQueriesContext(connection) as three:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.json()['questions']), 3)
+        self.assertEqual(len(one), len(three))
+
+    def test_conditional_get(self):
+        answers = list(Answer.objects.filter(is_correct=True))
+        record_answer(self.user, answers[0].uid)
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        record_answer(self.user, answers[1].uid)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_deleted_answer_changes_the_etag(self):
+        right = Answer.objects.filter(is_correct=True).order_by('question')[0]
+        Answer.objects.create(question=right.question, answer='Newest', is_correct=False)
+        record_answer(self.user, right.uid)
+        etag = self.client.get(self.url)['ETag']
+
+        # Neither the newest nor the selected answer of the question
+        Answer.objects.get(question=right.question, answer='Wrong').delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['questions'][str(right.question_id)]), 2)
+
+    def test_quiz_of_another_user(self):
+        self.client.force_login(User.objects.create_user('other', password='secret'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class ReconcileMarksTests(TestCase):
+    def test_fixes_the_drift(self):
+        user = User.objects.create_user('candidate', password='secret')
+        quiz = make_quiz(user)
+        for answer in Answer.objects.filter(is_correct=True)[:2]:
+            record_answer(user, answer.uid)
+        Quiz.objects.filter(pk=quiz.pk).add_marks(3)
+
+        out = StringIO()
+        call_command('reconcile_marks', '--dry-run', stdout=out)
+        self.assertIn('1 quizzes checked, 1 drifted by 3 marks in total', out.getvalue())
+        quiz.refresh_from_db()
+        self.assertEqual(quiz.marks, 13)
+
+        call_command('reconcile_marks', '--batch-size', '1', stdout=StringIO())
+        quiz.refresh_from_db()
+        self.assertEqual(quiz.marks, 10)
+
+
+class CategoryTotalsTests(TestCase):
+    def test_counters_follow_the_questions(self):
+        category = Category.objects.create(name='Counted')
+        other = Category.objects.create(name='Other')
+        question = Question.objects.create(category=category, question='One', mark=5)
+        Question.objects.create(category=category, question='Two', mark=3)
+        category.refresh_from_db()
+        self.assertEqual(category.get_total(), (8, 2))
+
+        question.mark = 4
+        question.save()
+        category.refresh_from_db()
+        self.assertEqual(category.get_total(), (7, 2))
+
+        question.category = other
+        question.save()
+        category.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((category.get_total(), other.get_total()), ((3, 1), (4, 1)))
+
+        question.delete()
+        other.refresh_from_db()
+        self.assertEqual(other.get_total(), (0, 0))
+
+    def test_recount(self):
+        category = Category.objects.create(name='Counted')
+        Question.objects.bulk_create([Question(category=category, question='Bulk', mark=2)])
+        out = StringIO()
+        call_command('recount_categories', stdout=out)
+        self.assertIn('1 categories checked, 1 drifted, fixed', out.getvalue())
+        category.refresh_from_db()
+        self.assertEqual(category.get_total(), (2, 1))
+
+
+class QuestionPageTests(TestCase):
+    def setUp(self):
+        self.quiz = make_quiz(User.objects.create_user('candidate', password='secret'), questions=5)
+        self.uids = list(Question.objects.order_by('uid').values_list('uid', flat=True))
+
+    def test_keyset_pages(self):
+        first = question_page(self.quiz.category, limit=2)
+        self.assertEqual([q.uid for q in first.questions], self.uids[:2])
+        self.assertIsNone(first.previous)
+
+        second = question_page(self.quiz.category, after=first.next, limit=2)
+        self.assertEqual([q.uid for q in second.questions], self.uids[2:4])
+        last = question_page(self.quiz.category, after=second.next, limit=2)
+        self.assertEqual([q.uid for q in last.questions], self.uids[4:])
+        self.assertIsNone(last.next)
+
+        back = question_page(self.quiz.category, before=second.previous, limit=2)
+        self.assertEqual([q.uid for q in back.questions], self.uids[:2])
+        self.assertIsNone(back.previous)
+        forward = question_page(self.quiz.category, after=back.next, limit=2)
+        self.assertEqual([q.uid for q in forward.questions], self.uids[2:4])
+
+        # From the end, back to the page before the last question
+        back = question_page(self.quiz.category, before=last.questions[0].uid, limit=3)
+        self.assertEqual([q.uid for q in back.questions], self.uids[1:4])
+        self.assertEqual(back.previous, self.uids[1])
+        forward = question_page(self.quiz.category, after=back.next, limit=3)
+        self.assertEqual([q.uid for q in forward.questions], self.uids[4:])
+
+        empty = question_page(self.quiz.category, before=self.uids[0], limit=2)
+        self.assertEqual((empty.questions, empty.previous, empty.next), ([], None, None))
+
+    def test_answers_are_prefetched(self):
+        with self.assertNumQueries(2):
+            page = question_page(self.quiz.category, after=self.uids[0], limit=3)
+            self.assertEqual([len(q.answers.all()) for q in page.questions], [2, 2, 2])
+
+
+class QuizPageTests(TestCase):
+    def test_quiz_created_by_the_index(self):
+        category = Category.objects.create(name='Category')
+        question = Question.objects.create(category=category, question='Question', mark=5)
+        answer = Answer.objects.create(question=question, answer='Right', is_correct=True)
+        user = User.objects.create_user('candidate', password='secret')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('index'), {'category': 'Category'})
+        self.assertEqual(response.status_code, 302)
+        quiz = Quiz.objects.get(user=user)
+        self.assertEqual(len(quiz.uid), 32)
+
+        response = self.client.get(reverse('quiz'), {'category': 'Category'})
+        self.assertContains(response, f'data-attended-url="{reverse("attended_questions", args=[quiz.uid])}"')
+        self.assertContains(response, f'id="{answer.uid}"')
+
+        # A second visit keeps the quiz
+        self.client.get(reverse('index'), {'category': 'Category'})
+        self.assertEqual(Quiz.objects.filter(user=user).count(), 1)
+
+    def test_quiz_without_a_uid(self):
+        # Created before the index gave them one
+        category = Category.objects.create(name='Category')
+        user = User.objects.create_user('candidate', password='secret')
+        Quiz.objects.create(uid='', user=user, category=category)
+        self.client.force_login(user)
+        response = self.client.get(reverse('quiz'), {'category': 'Category'})
+        self.assertContains(response, '<span id="marks">')
+
+
+class StaticFilesTests(TestCase):
+    @override_settings(DEBUG=False)
+    def test_pages_render_before_collectstatic(self):
+        # No manifest yet, the static files keep their names
+        Category.objects.create(name='Category', image='media/category.png')
+        self.client.force_login(User.objects.create_user('candidate', password='secret'))
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, '/static/home/css/utils.css')
+
+
+class ConcurrentAnswersTests(TransactionTestCase):
+    def test_parallel_clicks(self):
+        user = User.objects.create_user('candidate', password='secret')
+        quiz = make_quiz(user, questions=4)
+        answers = list(Answer.objects.all())
+
+        def click(answer):
+            try:
+                return record_answer(user, answer.uid)[1]
+            finally:
+                connections.close_all()
+
+        # Every answer of every question, three times, all at once
+        with ThreadPoolExecutor(8) as executor:
+            recorded = list(executor.map(click, answers * 3))
+
+        quiz.refresh_from_db()
+        links = QuizGivenQuestion.objects.filter(quiz=quiz)
+        self.assertEqual(recorded.count(True), 4)
+        self.assertEqual(links.count(), 4)
+        self.assertEqual(GivenQuizQuestions.objects.values('answer').distinct().count(), GivenQuizQuestions.objects.count())
+        self.assertEqual(quiz.marks, sum(link.givenquizquestions.points for link in links))
@@ -6,10 +6,12 @@ urlpatterns = [
   path('',index,name="index"),
   path('checkAnswer/<uid>/<str:createObj>',check_answer,name='check_answer'),
   path('quiz/',quiz,name="quiz"),
+  path('quiz/<uuid:category_uid>/questions/',questions,name='questions'),
   path('signUp/',sign_up,name='sign_up'),
   path('signIn/',sign_in,name='sign_in'),
   path('signOut/',sign_out,name='sign_out'),
   path('loadAttendedQuestionData/<uid>',loadAttendedQuestionData,name='load_attended_question_data'),
+  path('quiz/<str:quiz_uid>/attended/',attended_questions,name='attended_questions'),
   path('initiate-payment/', initiate_payment, name='initiate_payment'),
   path('payment/callback/', payment_callback, name='payment_callback'),
 ]
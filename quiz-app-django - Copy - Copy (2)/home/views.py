@@ -1,17 +1,20 @@
 from django.shortcuts import render, HttpResponse, redirect, get_object_or_404
 from . models import *
 from django.http import JsonResponse, HttpResponseNotFound
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth import login, logout, authenticate
 from django.contrib import messages
-from django.db.models import Q
+from django.db.models import Count, Max, Q
+from django.utils.cache import get_conditional_response, patch_cache_control
 import chapa
+import hashlib
 import uuid
 import time
 from django.conf import settings
 from .chapa_api import ChapaAPI
+from .answers import record_answer
+from .questions import parse_cursor, question_page, serialize
 
 
 # Create your views here.
@@ -31,7 +34,7 @@ def index(request):
         if not quiz_query.exists():
             category = Category.objects.get(name=category_text)
             quiz = Quiz.objects.create(
-                user=user, total_marks=0, category=category, marks=0)
+                uid=uuid.uuid4().hex, user=user, total_marks=0, category=category, marks=0)
             quiz.save()
         else:
             quiz = quiz_query.first()
@@ -44,26 +47,15 @@ def index(request):
 def check_answer(request, uid, createObj):
     try:
         payload = {'status': 200}
-        answer = Answer.objects.get(uid=str(uid))
         if createObj == 'true':
-            question = GivenQuizQuestions.objects.get_or_create(
-                question=answer.question, answer=answer)[0]
-            quiz = Quiz.objects.get(
-                user=request.user, category=answer.question.category)
-            is_already_given = Quiz.objects.filter(
-                Q(user=request.user) & Q(
-                    given_question__question=question.question)
-            ).exists()
-
-            if not is_already_given:
-                quiz.given_question.add(question)
-                quiz.save()
-            else:
+            is_correct, recorded, marks = record_answer(request.user, str(uid))
+            if not recorded:
                 payload = {'status': 404}
-            payload['marks'] = quiz.marks
+            payload['marks'] = marks
         else:
             payload = {'status': 404}
-        if answer.is_correct:
+            is_correct = Answer.objects.filter(uid=str(uid)).values_list('is_correct', flat=True).get()
+        if is_correct:
             payload['is_correct'] = 'true'
         else:
             payload['is_correct'] = 'false'
@@ -77,7 +69,6 @@ def check_answer(request, uid, createObj):
 def quiz(request):
     try:
         category_name = request.GET.get('category')  # Get category name from URL
-        questions = Question.objects.all()
         quiz = None  # Initialize quiz variable
         category = None  # Initialize category variable
 
@@ -86,20 +77,21 @@ def quiz(request):
             quiz = Quiz.objects.filter(user=request.user, category=category).first()  # Get user's quiz
 
             if quiz:
-                # Ensure no recursive save calls
-                quiz.calculate_marks()
-                total_marks, total_questions = quiz.category.get_total()
-                Quiz.objects.filter(uid=quiz.uid).update(marks=quiz.marks)
-
-            questions = questions.filter(category__name__icontains=category_name)
-
-        # Pagination Logic
-        p = Paginator(questions, 1)
-        page_no = request.GET.get('page', 1)  # Default to page 1
-        page_obj = p.get_page(page_no)
+                # Already read, its total_marks counter is shown as it is
+                quiz.category = category
+
+        # Keyset pagination, one question per page
+        page = question_page(
+            category,
+            after=parse_cursor(request.GET.get('after')),
+            before=parse_cursor(request.GET.get('before')),
+        )
+        number = request.GET.get('n', '1')
+        number = int(number) if number.isdigit() else 1
 
         context = {
-            'page_obj': page_obj,
+            'page': page,
+            'number': number,
             'category': category,
             'quiz': quiz,
             'homeactive': True
@@ -111,6 +103,43 @@ def quiz(request):
         return HttpResponse(f"Something Went Wrong ---> {str(e)}")
 
 
+@login_required
+def questions(request, category_uid):
+    """The next questions of a category with their answers, JSON or HTML
+
+    ?after=<question uid> (or ?before=) and ?limit=, the page of questions
+    and the cursors of the pages around it. ?format=html renders them as
+    the question forms of the quiz page, numbered from ?n=.
+    """
+    category = get_object_or_404(Category, uid=category_uid)
+    try:
+        after = parse_cursor(request.GET.get('after'))
+        before = parse_cursor(request.GET.get('before'))
+        limit = int(request.GET.get('limit', 5))
+    except ValueError:
+        return JsonResponse({'status': 400, 'message': 'Invalid cursor or limit'}, status=400)
+    page = question_page(category, after=after, before=before, limit=limit)
+
+    cursors = {
+        'previous': str(page.previous) if page.previous else None,
+        'next': str(page.next) if page.next else None,
+    }
+    if request.GET.get('format') == 'html':
+        number = request.GET.get('n', '1')
+        response = render(request, 'home/questions.html', {
+            'questions': page.questions,
+            'first_number': int(number) if number.isdigit() else 1,
+        })
+        response['X-Previous-Cursor'] = cursors['previous'] or ''
+        response['X-Next-Cursor'] = cursors['next'] or ''
+        return response
+    return JsonResponse({
+        'status': 200,
+        'questions': [serialize(question) for question in page.questions],
+        **cursors,
+    })
+
+
 def sign_up(request):
 
     if request.method == 'POST':
@@ -174,6 +203,43 @@ def loadAttendedQuestionData(request, uid):
         context['status'] = 404
     return JsonResponse(context)
 
+@login_required
+def attended_questions(request, quiz_uid):
+    """The attended state of every question answered in a quiz of the user
+
+    {"questions": {<question uid>: [{"uid", "isCorrect", "isSelected"}, ...]}},
+    the answers of each question as loadAttendedQuestionData gives them, in
+    a constant number of queries whatever the number of questions. The ETag
+    changes when a question is answered or an answer of one is added,
+    edited or deleted.
+    """
+    quiz = get_object_or_404(Quiz.objects.only('uid'), uid=quiz_uid, user=request.user)
+    links = QuizGivenQuestion.objects.filter(quiz=quiz)
+    version = links.aggregate(
+        count=Count('id', distinct=True), last=Max('id'),
+        answers=Count('question__answers', distinct=True), changed=Max('question__answers__updated_at'),
+    )
+    etag = '"%s"' % hashlib.blake2b(
+        "{uid}:{count}:{last}:{answers}:{changed}".format(uid=quiz.uid, **version).encode(), digest_size=16
+    ).hexdigest()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        selected = dict(links.values_list('question_id', 'givenquizquestions__answer_id'))
+        questions = {}
+        answers = Answer.objects.filter(question_id__in=selected).values_list('uid', 'question_id', 'is_correct')
+        for uid, question_id, is_correct in answers:
+            questions.setdefault(str(question_id), []).append({
+                'uid': str(uid),
+                'isCorrect': str(is_correct),
+                'isSelected': 'true' if uid == selected[question_id] else 'false',
+            })
+        response = JsonResponse({'status': 200, 'quiz': quiz.uid, 'questions': questions})
+        response['ETag'] = etag
+
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 def quiz_activity(request):
     quizzes = Quiz.objects.all()  # Fetch all quizzes or apply filters as needed
     return render(request, 'quiz_activity.html', {'quizzes': quizzes})
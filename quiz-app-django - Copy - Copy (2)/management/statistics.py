@@ -0,0 +1,127 @@
+"""
+Statistics of the management pages, computed off the request
+
+The totals and their bar chart are computed by a background thread and
+cached with the time they were computed at. The pages serve the cached
+ones: a request finding them older than MAX_AGE starts a refresh and is
+answered with the previous ones meanwhile. Only the first request after
+the cache is emptied waits, for the four totals it computes and caches
+for the thread to chart, never for the chart.
+
+matplotlib is imported by the thread rendering the chart, not when the
+workers start. It draws with the non-interactive Agg backend on a Figure of
+its own, pyplot and its global state are not thread-safe.
+"""
+import logging
+import threading
+from io import BytesIO
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Sum
+from django.utils import timezone
+
+from home.models import Category, Payment, Quiz, User
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "management:statistics"
+MAX_AGE = 300  # seconds
+
+LABELS = ["Total Users", "Total Categories", "Total Quizzes Taken", "Total Money Earned"]
+COLORS = ["#007bff", "#28a745", "#dc3545", "#ffc107"]
+
+_refresh_lock = threading.Lock()
+
+
+def collect():
+    """The totals of the statistics page"""
+    return {
+        "total_users": User.objects.count(),
+        "total_categories": Category.objects.count(),
+        "total_quizzes": Quiz.objects.count(),
+        "total_money_earned": Payment.objects.filter(status="completed").aggregate(
+            Sum("amount")
+        )["amount__sum"] or 0,
+    }
+
+
+def render_chart(values):
+    """The PNG bar chart of the totals"""
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6), facecolor="#f8f9fa")
+    ax = fig.subplots()
+    bars = ax.bar(LABELS, values, color=COLORS, edgecolor="black")
+
+    ax.set_xlabel("Metrics", fontsize=14, fontweight="bold")
+    ax.set_ylabel("Values", fontsize=14, fontweight="bold")
+    ax.set_title("Overall Quiz App Statistics", fontsize=16, fontweight="bold")
+    ax.grid(axis="y", linestyle="--", alpha=0.7)
+    for bar in bars:
+        yval = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width() / 2, yval + 0.1, f"{yval}", ha="center", va="bottom", fontsize=12)
+    ax.set_facecolor("#f8f9fa")
+    fig.tight_layout()
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def refresh(data=None):
+    """Render the chart of the totals, computed unless given, and cache them"""
+    if data is None:
+        data = {"totals": collect(), "generated_at": timezone.now()}
+    data = {**data, "png": render_chart(list(data["totals"].values()))}
+    cache.set(CACHE_KEY, data, None)
+    return data
+
+
+def _refresh_in_background(data):
+    try:
+        refresh(data)
+    except Exception:
+        logger.exception("Refreshing the statistics failed")
+    finally:
+        connections.close_all()
+        _refresh_lock.release()
+
+
+def start_refresh(data=None):
+    """Refresh in a background thread, unless one is already running"""
+    if not _refresh_lock.acquire(blocking=False):
+        return False
+    threading.Thread(
+        target=_refresh_in_background, args=(data,), name="statistics-refresh", daemon=True
+    ).start()
+    return True
+
+
+def latest():
+    """The cached statistics, refreshed in the background when stale
+
+    A dict of the totals, the PNG chart (None until it has been rendered)
+    and the time they were computed at. On an empty cache the totals are
+    computed here, cached, and the thread only renders their chart.
+    """
+    data = cache.get(CACHE_KEY)
+    if data is None:
+        data = {"totals": collect(), "png": None, "generated_at": timezone.now()}
+        cache.set(CACHE_KEY, data, None)
+        start_refresh(data)
+    elif (timezone.now() - data["generated_at"]).total_seconds() > MAX_AGE:
+        start_refresh()
+    return data
+
+
+def series(data):
+    """The totals as a JSON series for client-side charts"""
+    return {
+        "labels": LABELS,
+        "values": list(data["totals"].values()),
+        "generated_at": data["generated_at"].isoformat(),
+    }
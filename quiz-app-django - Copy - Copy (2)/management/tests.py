@@ -1,3 +1,171 @@
+from datetime import timedelta
+from unittest import mock
+from uuid import uuid4
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from home.models import Category, Payment, Quiz
+from . import statistics
+from .views import DASHBOARD_PAGE_SIZE, dashboard_candidates, dashboard_page
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Category')
+        self.admin = User.objects.create_user('admin', password='secret', is_staff=True)
+
+    def candidate(self, username, marks=(), payments=()):
+        user = User.objects.create_user(username, email=f'{username}@example.com', password='secret')
+        for mark in marks:
+            Quiz.objects.create(uid=uuid4().hex, user=user, category=self.category, marks=mark)
+        for amount, status in payments:
+            Payment.objects.create(user=user, amount=amount, status=status)
+        return user
+
+    def usernames(self, search='', sort='id'):
+        return list(dashboard_candidates(search, sort).values_list('username', flat=True))
+
+    def test_totals(self):
+        self.candidate('alice', marks=(5, 10), payments=((10, 'completed'), (20, 'completed'), (5, 'pending')))
+        self.candidate('bob')
+        rows = {row['username']: row for row in dashboard_candidates().values(
+            'username', 'total_score', 'quiz_count', 'total_payment', 'payment_status'
+        )}
+        self.assertEqual(set(rows), {'alice', 'bob'})
+        self.assertEqual(
+            (rows['alice']['total_score'], rows['alice']['quiz_count'], rows['alice']['total_payment']), (15, 2, 30)
+        )
+        self.assertEqual(rows['alice']['payment_status'], 'pending')
+        self.assertEqual(
+            (rows['bob']['total_score'], rows['bob']['quiz_count'], rows['bob']['payment_status']), (0, 0, 'No Payment')
+        )
+
+    def test_latest_payment_ties(self):
+        user = self.candidate('alice', payments=((10, 'completed'), (20, 'pending')))
+        # Made at once, or before created_at was added back
+        for created_at in (Payment.objects.first().created_at, None):
+            Payment.objects.filter(user=user).update(created_at=created_at)
+            latest = Payment.objects.filter(user=user).order_by('-id').first()
+            self.assertEqual(dashboard_candidates().get(pk=user.pk).payment_status, latest.status)
+
+    def test_search(self):
+        self.candidate('alice')
+        self.candidate('bob')
+        User.objects.filter(username='bob').update(email='robert@example.org')
+        self.assertEqual(self.usernames('ALI'), ['alice'])
+        self.assertEqual(self.usernames('example.org'), ['bob'])
+        self.assertEqual(self.usernames('nobody'), [])
+
+    def test_sort(self):
+        for username, marks in (('carol', (5,)), ('alice', (10,)), ('bob', (5,))):
+            self.candidate(username, marks=marks)
+        self.assertEqual(self.usernames(sort='id'), ['carol', 'alice', 'bob'])
+        self.assertEqual(self.usernames(sort='username'), ['alice', 'bob', 'carol'])
+        # Ties broken by the id
+        self.assertEqual(self.usernames(sort='score'), ['alice', 'carol', 'bob'])
+        # An unknown sort is the id
+        self.assertEqual(self.usernames(sort='password'), ['carol', 'alice', 'bob'])
+
+    def test_queries_do_not_grow_with_the_candidates(self):
+        self.candidate('alice', marks=(5,), payments=((10, 'completed'),))
+        with self.assertNumQueries(2):
+            dashboard_page('', 'id', 1)
+        cache.clear()
+        for i in range(DASHBOARD_PAGE_SIZE + 5):
+            self.candidate(f'candidate-{i}', marks=(i,), payments=((i, 'completed'),))
+        # The count and the page
+        with self.assertNumQueries(2):
+            data = dashboard_page('', 'score', 1)
+        self.assertEqual((len(data['candidates']), data['num_pages']), (DASHBOARD_PAGE_SIZE, 2))
+        # Then cached
+        with self.assertNumQueries(0):
+            dashboard_page('', 'score', 1)
+
+    def test_approving_a_payment_refreshes_the_cache(self):
+        user = self.candidate('alice', payments=((10, 'pending'),))
+        self.client.force_login(self.admin)
+        url = reverse('management_dashboard')
+        self.assertContains(self.client.get(url), 'pending')
+
+        self.client.get(reverse('approve_payment', args=[user.pk]))
+        response = self.client.get(url)
+        self.assertEqual(response.context['candidates'][0]['payment_status'], 'completed')
+        self.assertEqual(response.context['candidates'][0]['total_payment'], 10)
+
+    def test_for_staff(self):
+        self.client.force_login(User.objects.create_user('candidate', password='secret'))
+        self.assertEqual(self.client.get(reverse('management_dashboard')).status_code, 302)
+
+
+@mock.patch.object(statistics, 'render_chart', return_value=b'PNG')
+class StatisticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', password='secret', is_staff=True)
+
+    def wait_for_refresh(self):
+        with statistics._refresh_lock:
+            pass
+
+    def test_cold_cache_collects_once(self, render_chart):
+        with mock.patch.object(statistics, 'collect', wraps=statistics.collect) as collect:
+            data = statistics.latest()
+            self.wait_for_refresh()
+        self.assertEqual(collect.call_count, 1)
+        self.assertEqual((data['totals']['total_users'], data['png']), (1, None))
+
+        # The thread charted the totals of the request
+        cached = cache.get(statistics.CACHE_KEY)
+        self.assertEqual(cached['png'], b'PNG')
+        self.assertEqual((cached['totals'], cached['generated_at']), (data['totals'], data['generated_at']))
+        render_chart.assert_called_once_with(list(data['totals'].values()))
+
+    def test_one_refresh_at_a_time(self, render_chart):
+        with statistics._refresh_lock:
+            self.assertFalse(statistics.start_refresh())
+        self.assertTrue(statistics.start_refresh())
+        self.wait_for_refresh()
+        self.assertEqual(cache.get(statistics.CACHE_KEY)['png'], b'PNG')
+
+    def test_stale_statistics_are_served_while_refreshed(self, render_chart):
+        stale = {
+            'totals': dict.fromkeys(('total_users', 'total_categories', 'total_quizzes', 'total_money_earned'), 7),
+            'png': b'OLD',
+            'generated_at': timezone.now() - timedelta(seconds=statistics.MAX_AGE + 1),
+        }
+        cache.set(statistics.CACHE_KEY, stale, None)
+        self.assertEqual(statistics.latest(), stale)
+        self.wait_for_refresh()
+        refreshed = cache.get(statistics.CACHE_KEY)
+        self.assertEqual(refreshed['png'], b'PNG')
+        self.assertGreater(refreshed['generated_at'], stale['generated_at'])
+
+        # Fresh ones are served as they are
+        with mock.patch.object(statistics, 'start_refresh') as start_refresh:
+            self.assertEqual(statistics.latest(), refreshed)
+        start_refresh.assert_not_called()
+
+    def test_endpoints_are_for_staff(self, render_chart):
+        urls = [reverse(name) for name in ('statistics', 'statistics_chart', 'statistics_data')]
+        self.client.force_login(User.objects.create_user('candidate', password='secret'))
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.admin)
+        # No refresh can start, the chart is not rendered yet
+        with statistics._refresh_lock:
+            response = self.client.get(reverse('statistics_chart'))
+        self.assertEqual((response.status_code, response['Retry-After']), (503, '5'))
+        data = self.client.get(reverse('statistics_data')).json()
+        self.assertEqual(data['values'], [2, 0, 0, 0])
 
-# Create your tests here.
+        statistics.start_refresh(cache.get(statistics.CACHE_KEY))
+        self.wait_for_refresh()
+        response = self.client.get(reverse('statistics_chart'))
+        self.assertEqual((response['Content-Type'], response.content), ('image/png', b'PNG'))
+        self.assertIn('Last-Modified', response)
@@ -1,7 +1,8 @@
 from django.urls import path
 from .views import (
     management_login, management_dashboard, approve_payment, management_logout,
-    quiz_activity, data_visualization, check_payment, user_activity_log, statistics_view, candidate_detail
+    quiz_activity, data_visualization, check_payment, user_activity_log, statistics_view, candidate_detail,
+    statistics_chart, statistics_data,
 )
 
 urlpatterns = [
@@ -15,6 +16,8 @@ urlpatterns = [
     path("", management_dashboard, name="management_dashboard"),
     path('user-activity-log/', user_activity_log, name='user_activity_log'),
     path('statistics/', statistics_view, name='statistics'),
+    path('statistics/chart.png', statistics_chart, name='statistics_chart'),
+    path('statistics/data.json', statistics_data, name='statistics_data'),
     path('candidate/<int:id>/', candidate_detail, name='candidate_detail'),
 
 
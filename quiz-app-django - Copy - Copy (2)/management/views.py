@@ -8,10 +8,16 @@ from django.contrib import messages
 from django.db.models import Avg, Count
 from django.http import JsonResponse
 from home.models import UserActivity
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
 from django.db.models import Count, Sum
+from django.db.models import OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.core.cache import cache
+from django.core.paginator import Paginator
+import hashlib
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+from . import statistics
 
 
 
@@ -20,31 +26,102 @@ def is_admin(user):
     return user.is_staff  # Modify this if you have a custom permission system
 
 # Management Dashboard - Candidate Profiles, Quiz Performance, and Payment Status
+DASHBOARD_PAGE_SIZE = 50
+DASHBOARD_CACHE_TIMEOUT = 30  # seconds, approving a payment refreshes it at once
+DASHBOARD_GENERATION_KEY = "management:dashboard:generation"
+
+# Sort parameter -> ordering, the id breaks ties so the pages are stable
+DASHBOARD_SORTS = {
+    "id": ("id",),
+    "username": ("username", "id"),
+    "email": ("email", "id"),
+    "score": ("-total_score", "id"),
+    "quizzes": ("-quiz_count", "id"),
+    "payment": ("-total_payment", "id"),
+}
+
+
+def dashboard_candidates(search="", sort="id"):
+    """The candidates with their quiz and payment totals, in one query
+
+    Correlated subqueries instead of joins: two joined aggregates multiply
+    each other's rows, and SQLite only evaluates the subqueries of the rows
+    of the page when sorting by a column of the users.
+    """
+    quizzes = Quiz.objects.filter(user=OuterRef("pk")).order_by().values("user")
+    payments = Payment.objects.filter(user=OuterRef("pk"))
+    completed = payments.filter(status="completed").order_by().values("user")
+
+    candidates = User.objects.filter(is_staff=False).annotate(
+        total_score=Coalesce(Subquery(quizzes.annotate(total=Sum("marks")).values("total")), 0),
+        quiz_count=Coalesce(Subquery(quizzes.annotate(count=Count("pk")).values("count")), 0),
+        total_payment=Coalesce(Subquery(completed.annotate(total=Sum("amount")).values("total")), 0.0),
+        # The latest payment, whatever its status, so pending ones can be approved.
+        # The id breaks the ties of payments made at once, or before created_at
+        payment_status=Coalesce(
+            Subquery(payments.order_by("-created_at", "-id").values("status")[:1]), Value("No Payment")
+        ),
+    )
+    if search:
+        candidates = candidates.filter(Q(username__icontains=search) | Q(email__icontains=search))
+    return candidates.order_by(*DASHBOARD_SORTS.get(sort, DASHBOARD_SORTS["id"]))
+
+
+def invalidate_dashboard():
+    """Drop the cached dashboard pages"""
+    try:
+        cache.incr(DASHBOARD_GENERATION_KEY)
+    except ValueError:
+        pass  # Nothing cached yet
+
+
+def dashboard_page(search, sort, page):
+    """A page of the dashboard, cached for DASHBOARD_CACHE_TIMEOUT seconds"""
+    generation = cache.get_or_set(DASHBOARD_GENERATION_KEY, 1, None)
+    digest = hashlib.blake2b(f"{search}|{sort}|{page}".encode(), digest_size=8).hexdigest()
+    key = f"management:dashboard:{generation}:{digest}"
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    paginator = Paginator(
+        dashboard_candidates(search, sort).values(
+            "id", "username", "email", "total_score", "quiz_count", "total_payment", "payment_status"
+        ),
+        DASHBOARD_PAGE_SIZE,
+    )
+    page_obj = paginator.get_page(page)
+    candidates = list(page_obj)
+    for candidate in candidates:
+        candidate["status"] = "Completed" if candidate["quiz_count"] else "Not Started"
+
+    data = {
+        "candidates": candidates,
+        "number": page_obj.number,
+        "num_pages": paginator.num_pages,
+        "count": paginator.count,
+    }
+    cache.set(key, data, DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
 @login_required
 @user_passes_test(is_admin)
 def management_dashboard(request):
-    candidates = User.objects.filter(is_staff=False)
-    candidate_data = []
-
-    for candidate in candidates:
-        quizzes = Quiz.objects.filter(user=candidate)
-        total_score = quizzes.aggregate(Sum("marks"))["marks__sum"] or 0
-        status = "Completed" if quizzes.exists() else "Not Started"
-        
-        # Get latest payment
-        payment = Payment.objects.filter(user=candidate, status="completed").order_by("-created_at").first()
-        payment_status = payment.status if payment else "No Payment"
-
-        candidate_data.append({
-            "id": candidate.id,
-            "username": candidate.username,
-            "email": candidate.email,
-            "total_score": total_score,
-            "status": status,
-            "payment_status": payment_status,
-        })
-
-    return render(request, "management/dashboard.html", {"candidates": candidate_data})
+    search = request.GET.get("q", "").strip()
+    sort = request.GET.get("sort", "id")
+    if sort not in DASHBOARD_SORTS:
+        sort = "id"
+    page = request.GET.get("page", "1")
+    if not page.isdigit():
+        page = "1"
+
+    data = dashboard_page(search, sort, page)
+    return render(request, "management/dashboard.html", {
+        **data,
+        "q": search,
+        "sort": sort,
+    })
 
 # Approve Payments
 @login_required
@@ -54,6 +131,7 @@ def approve_payment(request, user_id):
     if payment:
         payment.status = "completed"
         payment.save()
+        invalidate_dashboard()
         messages.success(request, "Payment approved successfully.")
     else:
         messages.error(request, "No pending payment found.")
@@ -119,54 +197,35 @@ def candidate_detail(request, id):
     candidate = get_object_or_404(Candidate, id=id)
     return render(request, 'candidate_detail.html', {'candidate': candidate})
 
+@login_required
+@user_passes_test(is_admin)
 def statistics_view(request):
-    # Data for the overall statistics
-    total_users = User.objects.count()
-    total_categories = Category.objects.count()
-    total_quizzes = Quiz.objects.count()
-    total_money_earned = Payment.objects.filter(status='completed').aggregate(Sum('amount'))['amount__sum'] or 0
-
-    # Data for the graph
-    labels = ['Total Users', 'Total Categories', 'Total Quizzes Taken', 'Total Money Earned']
-    values = [total_users, total_categories, total_quizzes, total_money_earned]
-
-    # Creating the bar chart
-    fig, ax = plt.subplots(figsize=(10, 6))
-
-    # Creating the bar chart
-    bars = ax.bar(labels, values, color=['#007bff', '#28a745', '#dc3545', '#ffc107'], edgecolor='black')
-
-    # Adding labels and title with better font styles
-    ax.set_xlabel('Metrics', fontsize=14, fontweight='bold')
-    ax.set_ylabel('Values', fontsize=14, fontweight='bold')
-    ax.set_title('Overall Quiz App Statistics', fontsize=16, fontweight='bold')
-
-    # Adding gridlines for better readability
-    ax.grid(axis='y', linestyle='--', alpha=0.7)
-
-    # Displaying the values on top of the bars
-    for bar in bars:
-        yval = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2, yval + 0.1, f'{yval}', ha='center', va='bottom', fontsize=12)
-
-    # Setting a clean background
-    ax.set_facecolor('#f8f9fa')
-    fig.patch.set_facecolor('#f8f9fa')
-
-    # Save plot to a BytesIO object and encode as base64 for embedding in HTML
-    img_buf = BytesIO()
-    plt.tight_layout()  # Ensure everything fits in the figure neatly
-    plt.savefig(img_buf, format='png')
-    img_buf.seek(0)
-    img_base64 = base64.b64encode(img_buf.getvalue()).decode('utf-8')
-    img_buf.close()
-
+    data = statistics.latest()
     context = {
-        'img_base64': img_base64,
-        'total_users': total_users,
-        'total_categories': total_categories,
-        'total_quizzes': total_quizzes,
-        'total_money_earned': total_money_earned,
+        **data["totals"],
+        "generated_at": data["generated_at"],
+        "has_chart": data["png"] is not None,
+        # Changes with every chart, so the browser never shows a stale one
+        "chart_version": int(data["generated_at"].timestamp()),
     }
+    return render(request, 'management/statistics.html', context)
+
 
-    return render(request, 'management/statistics.html', context)
\ No newline at end of file
+@login_required
+@user_passes_test(is_admin)
+def statistics_chart(request):
+    data = statistics.latest()
+    if data["png"] is None:
+        response = HttpResponse("The chart is being generated.", status=503, content_type="text/plain")
+        response["Retry-After"] = "5"
+        return response
+    response = HttpResponse(data["png"], content_type="image/png")
+    response["Last-Modified"] = http_date(data["generated_at"].timestamp())
+    patch_cache_control(response, private=True, max_age=statistics.MAX_AGE)
+    return response
+
+
+@login_required
+@user_passes_test(is_admin)
+def statistics_data(request):
+    return JsonResponse(statistics.series(statistics.latest()))
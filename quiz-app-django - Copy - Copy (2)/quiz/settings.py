@@ -1,10 +1,15 @@
 from django.contrib.messages import constants as messages
 from pathlib import Path
 import os
+import sys
 from decouple import config
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# The instrumentation package is shared with the quizes project, one
+# directory up; appended, so the modules of this project come first
+sys.path.append(str(BASE_DIR.parent))
+
 # Secret Key & Debug
 SECRET_KEY = config('SECRET_KEY')
 DEBUG = config('DEBUG', default=True, cast=bool)
@@ -22,11 +27,13 @@ INSTALLED_APPS = [
     'home',
     'django_extensions',
     'management', 
+    'instrumentation',
 
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'instrumentation.middleware.SQLInstrumentationMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For serving static files
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -36,6 +43,12 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# SQL instrumentation (query count and time in a Server-Timing header,
+# per-view aggregates at /admin/sql-statistics/)
+SQL_INSTRUMENTATION_SERVER_TIMING = True
+SQL_INSTRUMENTATION_REPEAT_THRESHOLD = 3
+SQL_INSTRUMENTATION_WINDOW = 500
+
 ROOT_URLCONF = 'quiz.urls'
 
 TEMPLATES = [
@@ -61,9 +74,21 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file, the threads of the concurrency tests write to it in parallel
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# SQLite pragmas set on every connection (see instrumentation.sqlite), but
+# the journal mode, stored in the file by the sqlite_maintenance command
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -94,6 +119,11 @@ STATICFILES_DIRS = [
 # Directory where Django collects static files for production
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Hashed names and gzip/brotli variants built by collectstatic, served by
+# WhiteNoiseMiddleware, the hashed files with immutable caching headers (see
+# instrumentation.storage)
+STATICFILES_STORAGE = 'instrumentation.storage.StaticFilesStorage'
+
 # Media Files (User-uploaded files)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -17,7 +17,9 @@ from django.contrib import admin
 from django.urls import path,include
 from django.conf import settings
 from django.conf.urls.static import static
+from instrumentation.views import sql_statistics_view
 urlpatterns = [
+    path('admin/sql-statistics/', sql_statistics_view, name='sql_statistics'),
     path('admin/', admin.site.urls),
     path('',include('home.urls')),
     path("management/", include("management.urls")),
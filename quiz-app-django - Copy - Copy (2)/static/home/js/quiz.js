@@ -2,7 +2,31 @@ document.querySelector(".background_div").style.height = window.height;
 let answerInput = Array.from(document.getElementsByClassName("answerInput"));
 let click_uid, uid;
 var questionP = $(".questionP");
-var createObj = true;
+// The ids of the questions answered in the quiz, a click on one of their
+// answers only checks it
+let attendedQuestions = new Set();
+
+function showAttendedQuestion(question, answers) {
+  attendedQuestions.add(question.id);
+  for (i of answers) {
+    answer = document.getElementById(i["uid"]);
+    answer.disabled = true;
+    if (i["isCorrect"] == "True") {
+      answer.parentNode.classList.add("list-group-item-success");
+      answer.parentNode.classList.remove("list-group-item-primary");
+    }
+    if (i["isSelected"] == "true") {
+      answer.checked = true;
+      if (i["isCorrect"] == "False") {
+        answer.parentNode.classList.add("list-group-item-danger");
+        answer.parentNode.classList.remove("list-group-item-primary");
+        question.classList.add("text-danger");
+      } else {
+        question.classList.add("text-success");
+      }
+    }
+  }
+}
 
 async function loadAttendedQuestionData(uid) {
   await fetch(`/loadAttendedQuestionData/${uid}`)
@@ -10,33 +34,33 @@ async function loadAttendedQuestionData(uid) {
       return response.json();
     })
     .then((data) => {
-      console.log(data);
       if (data["status"] == 200) {
-        console.log(data);
-        createObj = false;
-        for (i of data["payload"]) {
-          answer = document.getElementById(i["uid"]);
-          answer.disabled = true;
-          if (i["isCorrect"] == "True") {
-            answer.parentNode.classList.add("list-group-item-success");
-            answer.parentNode.classList.remove("list-group-item-primary");
-          }
-          if (i["isSelected"] == "true") {
-            answer.checked = true;
-            if (i["isCorrect"] == "False") {
-              answer.parentNode.classList.add("list-group-item-danger");
-              answer.parentNode.classList.remove("list-group-item-primary");
-              questionP.get(0).classList.add("text-danger");
-            } else {
-              questionP.get(0).classList.add("text-success");
-            }
-          }
+        showAttendedQuestion(questionP.get(0), data["payload"]);
+      }
+    });
+}
+
+// Every question of the quiz in one request, revalidated with its ETag
+async function loadAttendedQuestions(url) {
+  await fetch(url)
+    .then((response) => {
+      return response.json();
+    })
+    .then((data) => {
+      for (question of questionP.get()) {
+        if (data["questions"][question.id]) {
+          showAttendedQuestion(question, data["questions"][question.id]);
         }
       }
     });
 }
 
-loadAttendedQuestionData(questionP.get(0).id);
+let attendedUrl = document.getElementById("marks").dataset.attendedUrl;
+if (attendedUrl) {
+  loadAttendedQuestions(attendedUrl);
+} else if (questionP.length) {
+  loadAttendedQuestionData(questionP.get(0).id);
+}
 
 async function giveCorrectAnswer(array) {
   for (answer of array) {
@@ -57,23 +81,26 @@ async function giveCorrectAnswer(array) {
 answerInput.forEach((e, i) => {
   e.addEventListener("click", (e) => {
     uid = e.target.id;
+    let form = e.target.closest("form");
+    let question = form.querySelector(".questionP");
+    let createObj = !attendedQuestions.has(question.id);
     fetch(`/checkAnswer/${uid}/${createObj}`).then((response) => {
       response.json().then((data) => {
         if (data["status"] == 200) {
+          attendedQuestions.add(question.id);
           if (data["is_correct"] == "true") {
             e.target.parentNode.classList.add("list-group-item-success");
-            questionP.addClass("text-success");
+            question.classList.add("text-success");
             giveAlert("alertDiv", "success", "Congo! Write Answer.");
             document.getElementById("marks").innerHTML = data["marks"];
           } else {
             e.target.parentNode.classList.add("list-group-item-danger");
-            questionP.addClass("text-danger");
+            question.classList.add("text-danger");
             giveAlert("alertDiv", "danger", "So Sad ! Wrong Answer.");
           }
-          answerInput = Array.from(
-            document.getElementsByClassName("answerInput")
+          giveCorrectAnswer(
+            Array.from(form.getElementsByClassName("answerInput"))
           );
-          giveCorrectAnswer(answerInput);
           e.target.parentNode.classList.remove("list-group-item-primary");
         } else {
           giveAlert(
@@ -0,0 +1,67 @@
+"""
+Signed attempt tokens
+
+quiz_detail_data_view hands the student a token recording which quiz
+version was served, the questions sampled in their order and when the
+attempt started. The token is signed with the SECRET_KEY, so
+save_quiz_view can trust it without any server-side state: grading needs
+no query to know what was served, and forged or expired attempts are
+rejected before touching the database.
+"""
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core import signing
+
+
+SALT = 'quizes.attempt'
+
+# Seconds accepted after the end of the quiz time, for the network
+GRACE = getattr(settings, 'QUIZ_ATTEMPT_GRACE', 60)
+
+
+Attempt = namedtuple('Attempt', 'quiz_id version question_ids started deadline')
+
+
+class InvalidAttempt(Exception):
+    """The token was not issued by us or not for this quiz"""
+
+
+class ExpiredAttempt(InvalidAttempt):
+    """The quiz time of the attempt is over"""
+
+
+def issue_attempt(snapshot, question_ids, now=None):
+    """A token for an attempt at the questions of a snapshot"""
+    started = int(now if now is not None else time.time())
+    deadline = started + snapshot.content['time'] * 60 + GRACE
+
+    return signing.dumps({
+        'q': snapshot.quiz_id,
+        'v': snapshot.version,
+        'i': list(question_ids),
+        's': started,
+        'd': deadline,
+    }, salt=SALT, compress=True)
+
+
+def read_attempt(token, quiz_id, now=None):
+    """The attempt of a token issued for a quiz
+
+    Raises InvalidAttempt when the token is forged or for another quiz and
+    ExpiredAttempt when its deadline has passed.
+    """
+    try:
+        data = signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        raise InvalidAttempt("The attempt token is not valid")
+
+    attempt = Attempt(data['q'], data['v'], data['i'], data['s'], data['d'])
+    if str(attempt.quiz_id) != str(quiz_id):
+        raise InvalidAttempt("The attempt token is for another quiz")
+
+    if (now if now is not None else time.time()) > attempt.deadline:
+        raise ExpiredAttempt("The time of this attempt is over")
+
+    return attempt
@@ -0,0 +1,212 @@
+"""
+Helpers of the benchmark commands
+
+The benchmarks run on a throwaway copy of the database schema, filled with
+generated quizes through bulk inserts, so they can be run anywhere without
+touching the real data.
+"""
+import math
+import os
+import tempfile
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+from questions.models import Question, Answer
+from .models import Quiz, Topic
+
+
+BENCHMARK_PASSWORD = 'benchmark'
+
+
+@contextmanager
+def temporary_database(verbosity=0):
+    """Run the block on a new, migrated database that is destroyed after
+
+    SQLite databases are created as a file, not in memory, so the threads
+    of a benchmark share them the way the workers of a server would.
+    """
+    directory = tempfile.TemporaryDirectory()
+    test_settings = connection.settings_dict.get('TEST')
+    if connection.vendor == 'sqlite':
+        connection.settings_dict['TEST'] = {
+            **(test_settings or {}), 'NAME': os.path.join(directory.name, 'benchmark.sqlite3'),
+        }
+
+    try:
+        old_name = connection.creation.create_test_db(
+            verbosity=verbosity, autoclobber=True, serialize=False
+        )
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+    finally:
+        connection.settings_dict['TEST'] = test_settings
+        directory.cleanup()
+
+
+def bulk_insert(model, objects, batch_size=1000):
+    """bulk_create objects from an iterable, one batch in memory at a time"""
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return
+        model.objects.bulk_create(batch)
+
+
+def seed(topics=10, quizes=100, questions=50, answers=4, users=50,
+         number_of_questions=20, batch_size=1000):
+    """Fill the database with generated quizes and students
+
+    Every quiz gets the same number of questions, each with the given
+    number of answers of which the first one is correct. Returns the number
+    of rows created per model.
+    """
+    with transaction.atomic():
+        password = make_password(BENCHMARK_PASSWORD)
+        bulk_insert(
+            User,
+            (User(username=f"student-{i}", password=password) for i in range(users)),
+            batch_size,
+        )
+
+        bulk_insert(Topic, (Topic(name=f"Topic {i}") for i in range(topics)), batch_size)
+        topic_ids = list(Topic.objects.values_list('pk', flat=True))
+
+        bulk_insert(
+            Quiz,
+            (
+                Quiz(
+                    name=f"Quiz {i}",
+                    topic_id=topic_ids[i % len(topic_ids)] if topic_ids else None,
+                    number_of_questions=number_of_questions,
+                    time=10,
+                    required_score=50,
+                    difficulty="Easy",
+                )
+                for i in range(quizes)
+            ),
+            batch_size,
+        )
+        quiz_ids = list(Quiz.objects.values_list('pk', flat=True))
+
+        bulk_insert(
+            Question,
+            (
+                Question(text=f"Question {i} of quiz {quiz_id}", quiz_id=quiz_id)
+                for quiz_id in quiz_ids
+                for i in range(questions)
+            ),
+            batch_size,
+        )
+        question_ids = list(Question.objects.values_list('pk', flat=True))
+
+        bulk_insert(
+            Answer,
+            (
+                Answer(text=f"Answer {j}", correct=j == 0, question_id=question_id)
+                for question_id in question_ids
+                for j in range(answers)
+            ),
+            batch_size,
+        )
+
+    return {
+        'users': users,
+        'topics': topics,
+        'quizes': quizes,
+        'questions': len(question_ids),
+        'answers': len(question_ids) * answers,
+    }
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(timings, queries, elapsed):
+    """Latency (ms), throughput and query statistics of one endpoint"""
+    return {
+        'requests': len(timings),
+        'throughput': len(timings) / elapsed if elapsed else None,
+        'p50_ms': percentile(timings, 50),
+        'p95_ms': percentile(timings, 95),
+        'p99_ms': percentile(timings, 99),
+        'max_ms': max(timings) if timings else None,
+        'queries_mean': sum(queries) / len(queries) if queries else None,
+        'queries_max': max(queries) if queries else None,
+    }
+
+
+class QueryCounter:
+    """Execute wrapper counting the queries run on a connection"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def view_scenarios():
+    """Requests to the views of a seeded database, for the index advisor
+
+    (name, callable) pairs, each run with an empty cache so the queries of
+    the cold paths are replayed too.
+    """
+    # Imported here, the views import this module's app models
+    from django.core.cache import cache
+    from django.test import Client
+    from django.urls import reverse
+
+    from questions.importing import QuizResolver
+    from results.writebehind import user_results
+
+    quiz = Quiz.objects.order_by('pk').first()
+    user = User.objects.filter(is_staff=False).order_by('pk').first()
+    staff, _ = User.objects.get_or_create(username='benchmark-staff', defaults={'is_staff': True})
+
+    client, staff_client = Client(), Client()
+    client.force_login(user)
+    staff_client.force_login(staff)
+
+    def start_and_submit():
+        data = client.get(reverse('quizes:quiz_data_view', args=[quiz.pk])).json()
+        client.post(reverse('quizes:quiz_save_view', args=[quiz.pk]), {'attempt': data['attempt']})
+
+    def export():
+        response = staff_client.get(
+            reverse('results:export_results_view'), {'quiz': quiz.pk, 'since': '2000-01-01'}
+        )
+        b''.join(response.streaming_content)
+
+    scenarios = [
+        ('quiz list', lambda: client.get(reverse('quizes:quiz_list_view'), {'page': 2})),
+        ('quiz list by topic', lambda: client.get(
+            reverse('quizes:quiz_list_view'), {'topic': quiz.topic_id}
+        )),
+        ('quiz page', lambda: client.get(reverse('quizes:quiz_view', args=[quiz.pk]))),
+        ('quiz start and submit', start_and_submit),
+        ('user results', lambda: user_results(user, quiz.pk)),
+        ('results export', export),
+        ('question import', lambda: QuizResolver()(quiz.name)),
+    ]
+
+    def cold(scenario):
+        def run():
+            cache.clear()
+            scenario()
+        return run
+
+    return [(name, cold(scenario)) for name, scenario in scenarios]
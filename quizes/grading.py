@@ -0,0 +1,120 @@
+"""
+Grading of the quiz submissions against a precompiled answer key
+"""
+
+
+class AnswerKey:
+    """The correct answer of every question of a quiz
+
+    Maps each question id to its text and to the id and text of its correct
+    answer, so a whole submission is graded in memory in one pass.
+    """
+
+    def __init__(self, rows):
+        """
+        rows: (question id, question text, correct answer id, correct answer
+        text) tuples. The answer fields are None when the question has no
+        correct answer.
+        """
+        self.questions = {}
+        self.question_ids = {}
+
+        for question_id, text, answer_id, answer_text in rows:
+            self.questions.setdefault(question_id, (text, answer_id, answer_text))
+            self.question_ids.setdefault(text, question_id)
+
+    @classmethod
+    def from_snapshot(cls, content):
+        """Compile the answer key of a quiz snapshot content"""
+        return cls.from_questions(content['questions'])
+
+    @classmethod
+    def from_questions(cls, questions):
+        """Compile the answer key of snapshot questions (see snapshot_questions)"""
+        rows = []
+        for question_id, text, answers in questions:
+            correct = next((answer for answer in answers if answer[2]), (None, None, None))
+            rows.append((question_id, text, correct[0], correct[1]))
+
+        return cls(rows)
+
+    def resolve(self, key):
+        """
+        The question a submission key refers to, either by its text or by
+        its id. Returns (question id, keyed by id) or (None, False) when the
+        key is not a question of the quiz.
+        """
+        if key in self.question_ids:
+            return self.question_ids[key], False
+
+        if key.isdigit() and int(key) in self.questions:
+            return int(key), True
+
+        return None, False
+
+    def grade(self, submission, question_ids=None):
+        """Grade a submission mapping questions to the selected answers
+
+        Questions are keyed by their text, with the text of the selected
+        answer as value, or by their id, with the id of the selected answer
+        as value.
+
+        When the ids of the questions served are known (from the attempt
+        token) exactly those are graded, in the order they were served, and
+        the ones missing from the submission count as not answered.
+        Otherwise the questions submitted are graded, ignoring the keys that
+        are not questions of the quiz or that repeat a graded question.
+
+        Returns the number of correct answers, the number of graded
+        questions and the results of every question as sent to the student.
+        """
+        if question_ids is None:
+            selections = self._submitted(submission)
+        else:
+            selections = self._served(submission, question_ids)
+
+        correct = 0
+        results = []
+
+        for question_id, selected, by_id in selections:
+            text, answer_id, answer_text = self.questions[question_id]
+
+            if selected == '':
+                results.append({text: 'not answered'})
+                continue
+
+            if by_id:
+                is_correct = answer_id is not None and selected == str(answer_id)
+            else:
+                is_correct = answer_text is not None and selected == answer_text
+
+            if is_correct:
+                correct += 1
+
+            results.append({text: {
+                'correct_answer': answer_text,
+                'answered': selected
+            }})
+
+        return correct, len(results), results
+
+    def _submitted(self, submission):
+        """(question id, selected answer, keyed by id) of the submission"""
+        graded = set()
+        for key, selected in submission.items():
+            question_id, by_id = self.resolve(key)
+            if question_id is None or question_id in graded:
+                continue
+            graded.add(question_id)
+            yield question_id, selected, by_id
+
+    def _served(self, submission, question_ids):
+        """(question id, selected answer, keyed by id) of the served questions"""
+        for question_id in question_ids:
+            if question_id not in self.questions:
+                continue
+            text = self.questions[question_id][0]
+            if text in submission:
+                yield question_id, submission[text], False
+            else:
+                yield question_id, submission.get(str(question_id), ''), True
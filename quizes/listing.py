@@ -0,0 +1,46 @@
+"""
+Caching of the quiz list
+
+The rendered list and the number of quizes are cached under a generation
+token that is replaced whenever a Quiz, a Topic or the number of questions
+of a quiz changes, which invalidates every cached page at once.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.utils.functional import cached_property
+
+
+GENERATION_KEY = 'quizes:list-generation'
+
+# Seconds a page of the quiz list is cached. Invalidation is immediate in
+# the process making the change, the timeout bounds how stale the other
+# processes can be when the cache is not shared.
+LIST_TIMEOUT = getattr(settings, 'QUIZ_LIST_CACHE_TIMEOUT', 300)
+
+
+def list_generation():
+    """The current generation token of the cached quiz list"""
+    return cache.get_or_set(GENERATION_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_list():
+    """Drop every cached page of the quiz list once the transaction commits"""
+    transaction.on_commit(lambda: cache.set(GENERATION_KEY, uuid.uuid4().hex, None))
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator keeping the number of objects in the cache"""
+
+    def __init__(self, *args, cache_key, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_key = cache_key
+
+    @cached_property
+    def count(self):
+        return cache.get_or_set(
+            self.cache_key, lambda: Paginator.count.func(self), LIST_TIMEOUT
+        )
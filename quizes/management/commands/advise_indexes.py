@@ -0,0 +1,64 @@
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from instrumentation.advisor import explain, propose, record, report, write_migrations
+from quizes.benchmark import seed, temporary_database, view_scenarios
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the queries of the quiz and results views on a throwaway "
+        "database, EXPLAIN QUERY PLAN each of them, flag full table scans and "
+        "temporary B-trees and propose the missing indexes. Run it again on "
+        "every schema change; --check fails when an index is missing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Show the plans of every query, not only the flagged ones",
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Fail when indexes are proposed",
+        )
+        parser.add_argument(
+            '--write-migration', action='store_true',
+            help="Write migrations creating the proposed indexes of the project's apps",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("The index advisor reads SQLite query plans")
+
+        with override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'advise_indexes',
+            }},
+        ), temporary_database():
+            seed(topics=3, quizes=30, questions=10, answers=3, users=3, number_of_questions=5)
+            queries, failures = record(view_scenarios())
+            plans = [explain(query) for query in queries]
+            proposals = propose(plans)
+
+        self.stdout.write(report(plans, proposals, failures, verbose=options['all']))
+
+        if options['write_migration']:
+            # Not the apps of Django or of third parties
+            base = Path(settings.BASE_DIR).resolve()
+            local = [
+                proposal for proposal in proposals
+                if base in Path(apps.get_app_config(proposal.model._meta.app_label).path).resolve().parents
+            ]
+            for path in write_migrations(local):
+                self.stdout.write(f"Wrote {path}")
+
+        if options['check'] and proposals:
+            raise CommandError(f"{len(proposals)} missing indexes")
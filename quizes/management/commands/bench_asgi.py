@@ -0,0 +1,368 @@
+import asyncio
+import io
+import json
+import platform
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from quizes.benchmark import seed, summarize, temporary_database
+from quizes.models import Quiz
+
+
+# The views each serving path answers the quiz endpoints with
+PATHS = {
+    'wsgi': ('quizes:quiz_data_view', 'quizes:quiz_save_view'),
+    'asgi': ('quizes:quiz_data_async_view', 'quizes:quiz_save_async_view'),
+}
+
+FORM = 'application/x-www-form-urlencoded'
+
+
+class ThreadMonitor:
+    """Sample the number of threads of the process in the background"""
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            # Not counting the monitor itself
+            self.peak = max(self.peak, threading.active_count() - 1)
+
+
+def wsgi_request(application, method, path, query='', body=b'', headers=()):
+    """Call a WSGI application the way a server would, returns the status and body"""
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in headers:
+        name = name.upper().replace('-', '_')
+        if name != 'CONTENT_TYPE':
+            name = 'HTTP_' + name
+        environ[name] = value
+
+    status = []
+    result = application(environ, lambda s, h, exc_info=None: status.append(s))
+    try:
+        content = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return int(status[0].split()[0]), content
+
+
+async def asgi_request(application, method, path, query='', body=b'', headers=()):
+    """Call an ASGI application the way a server would, returns the status and body"""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'testserver')] + [
+            (name.lower().encode(), value.encode()) for name, value in headers
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        return messages.pop() if messages else {'type': 'http.disconnect'}
+
+    status, content = None, []
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            content.append(message.get('body', b''))
+
+    await application(scope, receive, send)
+    return status, b''.join(content)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the WSGI and ASGI serving paths of the quiz data and save "
+        "endpoints. Concurrent students start a quiz and submit it through "
+        "config.wsgi, one thread per student as a threaded server would, then "
+        "through config.asgi with the async views, every student a task of a "
+        "single event loop. Reports latency percentiles, throughput and the "
+        "peak number of threads of each path."
+    )
+
+    def add_arguments(self, parser):
+        seeding = parser.add_argument_group("seeding")
+        seeding.add_argument('--quizes', type=int, default=20)
+        seeding.add_argument('--questions', type=int, default=30, help="Questions per quiz")
+        seeding.add_argument('--answers', type=int, default=4, help="Answers per question")
+        seeding.add_argument('--users', type=int, default=50)
+        seeding.add_argument(
+            '--number-of-questions', type=int, default=10,
+            help="Questions served per quiz start",
+        )
+
+        run = parser.add_argument_group("run")
+        run.add_argument('--concurrency', type=int, default=200, help="Concurrent students")
+        run.add_argument(
+            '--iterations', type=int, default=3,
+            help="Start and submit rounds per student",
+        )
+        run.add_argument(
+            '--think-ms', type=int, default=1000,
+            help="Time a student keeps the connection open between starting "
+                 "and submitting a quiz",
+        )
+        run.add_argument(
+            '--ramp-ms', type=int, default=2000,
+            help="Students arrive at random times within this period",
+        )
+        run.add_argument(
+            '--paths', nargs='+', choices=tuple(PATHS), default=list(PATHS),
+            help="Serving paths to benchmark",
+        )
+
+        parser.add_argument('--format', choices=('table', 'json'), default='table')
+        parser.add_argument('--output', help="Write the report to this file")
+
+    def handle(self, *args, **options):
+        # An isolated cache, so the run neither reads nor pollutes the real one
+        with override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'bench_asgi',
+            }},
+        ), temporary_database():
+            seeded = seed(
+                topics=1,
+                quizes=options['quizes'],
+                questions=options['questions'],
+                answers=options['answers'],
+                users=options['users'],
+                number_of_questions=options['number_of_questions'],
+            )
+            students = self.students(options['concurrency'])
+            quiz_ids = list(Quiz.objects.values_list('pk', flat=True))
+
+            report = {
+                'concurrency': options['concurrency'],
+                'iterations': options['iterations'],
+                'ramp_ms': options['ramp_ms'],
+                'think_ms': options['think_ms'],
+                'seed': seeded,
+                'paths': {},
+            }
+            for name in options['paths']:
+                run = getattr(self, f'run_{name}')
+                report['paths'][name] = self.measure(run, students, quiz_ids, options)
+
+        report['environment'] = {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+        }
+
+        if options['format'] == 'json':
+            output = json.dumps(report, indent=2)
+        else:
+            output = self.table(report)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def students(self, count):
+        """The request headers of logged in students, one per concurrent student"""
+        users = list(User.objects.order_by('pk'))
+        sessions = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            sessions.append(client.cookies[settings.SESSION_COOKIE_NAME].value)
+
+        students = []
+        for i in range(count):
+            csrf = get_random_string(32)
+            students.append((
+                ('Cookie', f'{settings.SESSION_COOKIE_NAME}={sessions[i % len(sessions)]}; '
+                           f'{settings.CSRF_COOKIE_NAME}={csrf}'),
+                ('Accept', 'application/json'),
+                ('X-CSRFToken', csrf),
+            ))
+        return students
+
+    def measure(self, run, students, quiz_ids, options):
+        # An untimed round first, so both paths find the snapshots cached
+        run(students, quiz_ids, 1, 0, 0, defaultdict(list))
+
+        samples = defaultdict(list)
+        with ThreadMonitor() as monitor:
+            start = time.perf_counter()
+            run(
+                students, quiz_ids, options['iterations'],
+                options['ramp_ms'] / 1000, options['think_ms'] / 1000, samples,
+            )
+            elapsed = time.perf_counter() - start
+
+        endpoints = {}
+        for name in ('data', 'save'):
+            ok = [sample[0] for sample in samples[name] if sample[1]]
+            endpoints[name] = summarize(ok, [], elapsed)
+            endpoints[name]['errors'] = len(samples[name]) - len(ok)
+
+        return {
+            'elapsed_s': elapsed,
+            'throughput': sum(len(requests) for requests in samples.values()) / elapsed,
+            'peak_threads': monitor.peak,
+            'endpoints': endpoints,
+        }
+
+    def run_wsgi(self, students, quiz_ids, iterations, ramp, think, samples):
+        from config.wsgi import application
+
+        data_name, save_name = PATHS['wsgi']
+
+        def student(headers):
+            rng = random.Random()
+            time.sleep(rng.uniform(0, ramp))
+            for _ in range(iterations):
+                quiz_id = rng.choice(quiz_ids)
+
+                start = time.perf_counter()
+                status, content = wsgi_request(
+                    application, 'GET', reverse(data_name, args=[quiz_id]), headers=headers
+                )
+                samples['data'].append(((time.perf_counter() - start) * 1000, status == 200))
+                if status != 200:
+                    continue
+
+                time.sleep(think)
+
+                body = self.submission(rng, content)
+                start = time.perf_counter()
+                status, content = wsgi_request(
+                    application, 'POST', reverse(save_name, args=[quiz_id]),
+                    body=body, headers=headers + (('Content-Type', FORM),),
+                )
+                samples['save'].append(((time.perf_counter() - start) * 1000, status == 200))
+
+        with ThreadPoolExecutor(len(students)) as executor:
+            list(executor.map(student, students))
+
+    def run_asgi(self, students, quiz_ids, iterations, ramp, think, samples):
+        from config.asgi import application
+
+        data_name, save_name = PATHS['asgi']
+
+        async def student(headers):
+            rng = random.Random()
+            await asyncio.sleep(rng.uniform(0, ramp))
+            for _ in range(iterations):
+                quiz_id = rng.choice(quiz_ids)
+
+                start = time.perf_counter()
+                status, content = await asgi_request(
+                    application, 'GET', reverse(data_name, args=[quiz_id]), headers=headers
+                )
+                samples['data'].append(((time.perf_counter() - start) * 1000, status == 200))
+                if status != 200:
+                    continue
+
+                await asyncio.sleep(think)
+
+                body = self.submission(rng, content)
+                start = time.perf_counter()
+                status, content = await asgi_request(
+                    application, 'POST', reverse(save_name, args=[quiz_id]),
+                    body=body, headers=headers + (('Content-Type', FORM),),
+                )
+                samples['save'].append(((time.perf_counter() - start) * 1000, status == 200))
+
+        async def main():
+            await asyncio.gather(*(student(headers) for headers in students))
+
+        asyncio.run(main())
+
+    def submission(self, rng, content):
+        """Random answers to the questions of a quiz data response"""
+        data = json.loads(content)
+        submission = {
+            text: rng.choice(answers)
+            for question in data['data']
+            for text, answers in question.items()
+        }
+        submission['attempt'] = data['attempt']
+        return urlencode(submission).encode()
+
+    def table(self, report):
+        lines = [
+            f"{'path':<6} {'endpoint':<8} {'requests':>8} {'req/s':>8} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>6}"
+        ]
+        for path, result in report['paths'].items():
+            for name, stats in result['endpoints'].items():
+                if not stats['requests']:
+                    lines.append(f"{path:<6} {name:<8} {'-':>8} {'-':>8} {'-':>8} {'-':>8} {'-':>8} {stats['errors']:>6}")
+                    continue
+                lines.append(
+                    f"{path:<6} {name:<8} {stats['requests']:>8} {stats['throughput']:>8.1f} "
+                    f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} "
+                    f"{stats['errors']:>6}"
+                )
+        for path, result in report['paths'].items():
+            lines.append(
+                f"{path}: {result['elapsed_s']:.2f} s, {result['throughput']:.1f} requests/s, "
+                f"peak of {result['peak_threads']} threads"
+            )
+        lines.append(
+            f"{report['concurrency']} students arriving within {report['ramp_ms']} ms, "
+            f"{report['think_ms']} ms between starting and submitting a quiz"
+        )
+        return '\n'.join(lines)
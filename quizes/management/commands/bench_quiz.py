@@ -0,0 +1,194 @@
+import json
+import math
+import platform
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from quizes.benchmark import QueryCounter, seed, summarize, temporary_database
+from quizes.models import Quiz
+from quizes.views import QuizListView
+
+
+ENDPOINTS = ('quiz_list_view', 'quiz_data_view', 'quiz_save_view')
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the quiz list, quiz data and quiz save views end to end. "
+        "A throwaway database is seeded with bulk inserts, then concurrent "
+        "students list the quizes, start one and submit it through the "
+        "Django test client. Reports the latency percentiles, throughput and "
+        "SQL queries of every endpoint."
+    )
+
+    def add_arguments(self, parser):
+        seeding = parser.add_argument_group("seeding")
+        seeding.add_argument('--topics', type=int, default=10)
+        seeding.add_argument('--quizes', type=int, default=100)
+        seeding.add_argument('--questions', type=int, default=50, help="Questions per quiz")
+        seeding.add_argument('--answers', type=int, default=4, help="Answers per question")
+        seeding.add_argument('--users', type=int, default=50)
+        seeding.add_argument(
+            '--number-of-questions', type=int, default=20,
+            help="Questions served per quiz start",
+        )
+
+        run = parser.add_argument_group("run")
+        run.add_argument('--concurrency', type=int, default=8, help="Concurrent students")
+        run.add_argument(
+            '--iterations', type=int, default=20,
+            help="List, start and submit rounds per student",
+        )
+        run.add_argument(
+            '--warmup', type=int, default=1,
+            help="Untimed rounds per student before the run",
+        )
+
+        parser.add_argument('--format', choices=('table', 'json'), default='table')
+        parser.add_argument('--output', help="Write the report to this file")
+
+    def handle(self, *args, **options):
+        # An isolated cache, so the run neither reads nor pollutes the real one
+        with override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'bench_quiz',
+            }},
+        ), temporary_database():
+            seeded = seed(
+                topics=options['topics'],
+                quizes=options['quizes'],
+                questions=options['questions'],
+                answers=options['answers'],
+                users=options['users'],
+                number_of_questions=options['number_of_questions'],
+            )
+            report = self.run(options)
+            report['seed'] = seeded
+
+        report['environment'] = {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+        }
+
+        if options['format'] == 'json':
+            output = json.dumps(report, indent=2)
+        else:
+            output = self.table(report)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def run(self, options):
+        quiz_ids = list(Quiz.objects.values_list('pk', flat=True))
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        pages = max(1, math.ceil(len(quiz_ids) / QuizListView.paginate_by))
+        concurrency = options['concurrency']
+
+        def student(i, iterations, samples):
+            user_id = user_ids[i % len(user_ids)]
+            try:
+                self.student(user_id, iterations, quiz_ids, pages, samples)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            warmup = defaultdict(list)
+            list(executor.map(lambda i: student(i, options['warmup'], warmup), range(concurrency)))
+
+            samples = defaultdict(list)
+            start = time.perf_counter()
+            list(executor.map(lambda i: student(i, options['iterations'], samples), range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+        endpoints = {}
+        for name in ENDPOINTS:
+            ok = [sample for sample in samples[name] if sample[2]]
+            endpoints[name] = summarize(
+                [sample[0] for sample in ok], [sample[1] for sample in ok], elapsed
+            )
+            endpoints[name]['errors'] = len(samples[name]) - len(ok)
+
+        return {
+            'concurrency': concurrency,
+            'iterations': options['iterations'],
+            'elapsed_s': elapsed,
+            'throughput': sum(len(samples[name]) for name in ENDPOINTS) / elapsed,
+            'endpoints': endpoints,
+        }
+
+    def student(self, user_id, iterations, quiz_ids, pages, samples):
+        """List the quizes, start one and submit random answers"""
+        rng = random.Random()
+        client = Client()
+        client.force_login(User.objects.get(pk=user_id))
+        counter = QueryCounter()
+
+        def request(name, method, url, data=None):
+            counter.count = 0
+            start = time.perf_counter()
+            response = method(url, data)
+            duration = (time.perf_counter() - start) * 1000
+            samples[name].append((duration, counter.count, response.status_code == 200))
+            return response
+
+        with connection.execute_wrapper(counter):
+            for _ in range(iterations):
+                quiz_id = rng.choice(quiz_ids)
+
+                request(
+                    'quiz_list_view', client.get,
+                    reverse('quizes:quiz_list_view'), {'page': rng.randint(1, pages)}
+                )
+                response = request(
+                    'quiz_data_view', client.get,
+                    reverse('quizes:quiz_data_view', args=[quiz_id])
+                )
+                if response.status_code != 200:
+                    continue
+
+                data = response.json()
+                submission = {
+                    text: rng.choice(answers)
+                    for question in data['data']
+                    for text, answers in question.items()
+                }
+                submission['attempt'] = data['attempt']
+                request(
+                    'quiz_save_view', client.post,
+                    reverse('quizes:quiz_save_view', args=[quiz_id]), submission
+                )
+
+    def table(self, report):
+        lines = [
+            f"{'endpoint':<16} {'requests':>8} {'req/s':>8} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>6}"
+        ]
+        for name, stats in report['endpoints'].items():
+            if not stats['requests']:
+                lines.append(f"{name:<16} {'-':>8} {'-':>8} {'-':>8} {'-':>8} {'-':>8} {'-':>8} {stats['errors']:>6}")
+                continue
+            lines.append(
+                f"{name:<16} {stats['requests']:>8} {stats['throughput']:>8.1f} "
+                f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} "
+                f"{stats['queries_mean']:>8.1f} {stats['errors']:>6}"
+            )
+        lines.append(
+            f"{report['concurrency']} students, {report['elapsed_s']:.2f} s, "
+            f"{report['throughput']:.1f} requests/s overall"
+        )
+        return '\n'.join(lines)
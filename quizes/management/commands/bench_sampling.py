@@ -0,0 +1,84 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from questions.models import Question
+from quizes.models import Quiz
+from quizes.sampling import sample
+
+
+def legacy_sample(quiz):
+    """The sampling Quiz.get_questions used to do: shuffle the whole bank"""
+    questions = list(quiz.questions.all())
+    random.shuffle(questions)
+    return questions[:quiz.number_of_questions]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the id reservoir sampling of Quiz.get_questions with the "
+        "old load-and-shuffle sampling on growing question banks. The data "
+        "is created inside a transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+            help="Sizes of the question banks to benchmark",
+        )
+        parser.add_argument(
+            '--questions', type=int, default=20,
+            help="Number of questions sampled per quiz start",
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help="Number of samples timed per size",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'bank size':>10} {'engine':>10} {'median ms':>10} "
+            f"{'max ms':>10} {'queries':>8}"
+        )
+        with transaction.atomic():
+            for size in options['sizes']:
+                quiz = self.seed(size, options['questions'])
+                engines = (
+                    ('legacy', lambda: legacy_sample(quiz)),
+                    ('reservoir', lambda: sample(quiz.questions.all(), quiz.number_of_questions)),
+                )
+                for name, engine in engines:
+                    timings, queries = self.measure(engine, options['repeat'])
+                    self.stdout.write(
+                        f"{size:>10} {name:>10} "
+                        f"{statistics.median(timings):>10.2f} "
+                        f"{max(timings):>10.2f} {queries:>8}"
+                    )
+            transaction.set_rollback(True)
+
+    def seed(self, size, number_of_questions):
+        quiz = Quiz.objects.create(
+            name=f"Benchmark {size}",
+            number_of_questions=number_of_questions,
+            time=10,
+            required_score=50,
+            difficulty="Easy",
+        )
+        Question.objects.bulk_create(
+            (Question(text=f"Question {i}", quiz=quiz) for i in range(size)),
+            batch_size=1000,
+        )
+        return quiz
+
+    def measure(self, engine, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                engine()
+                timings.append((time.perf_counter() - start) * 1000)
+        return timings, len(context.captured_queries)
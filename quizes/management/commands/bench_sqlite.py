@@ -0,0 +1,146 @@
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import override_settings
+
+from quizes.benchmark import seed, summarize, temporary_database
+from quizes.models import Quiz
+from results.models import Result
+from results.statistics import score_rank
+from results.writebehind import user_results
+
+
+# SQLite's own defaults, the journal mode is stored in the file so it is
+# set back explicitly
+PROFILES = {
+    'default': {'journal_mode': 'delete'},
+    'tuned': None,  # settings.SQLITE_PRAGMAS
+}
+
+OPERATIONS = ('read', 'write')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of concurrent submissions and reads on "
+        "SQLite with its default connection settings and with the "
+        "SQLITE_PRAGMAS of the settings (WAL, busy timeout, mmap, cache). "
+        "Students write results, updating the statistics of their quiz, and "
+        "read their results and rank, on a throwaway file database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quizes', type=int, default=20)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=16, help="Concurrent students")
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help="Seconds each profile is run for",
+        )
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help="Share of the operations writing a result",
+        )
+        parser.add_argument('--format', choices=('table', 'json'), default='table')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("The benchmark compares SQLite settings")
+
+        report = {}
+        with temporary_database():
+            seed(
+                topics=2, quizes=options['quizes'], questions=5, answers=2,
+                users=options['users'], number_of_questions=5,
+            )
+            quiz_ids = list(Quiz.objects.values_list('pk', flat=True))
+            user_ids = list(User.objects.values_list('pk', flat=True))
+
+            for name, pragmas in PROFILES.items():
+                if pragmas is None:
+                    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    # New connections, with the pragmas of the profile
+                    connections.close_all()
+                    report[name] = self.run(quiz_ids, user_ids, options)
+                    report[name]['pragmas'] = pragmas
+            connections.close_all()
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(self.table(report))
+
+    def run(self, quiz_ids, user_ids, options):
+        samples = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def student(i):
+            rng = random.Random(i)
+            user_id = user_ids[i % len(user_ids)]
+            try:
+                while time.perf_counter() < deadline:
+                    quiz_id = rng.choice(quiz_ids)
+                    operation = 'write' if rng.random() < options['write_ratio'] else 'read'
+                    start = time.perf_counter()
+                    try:
+                        if operation == 'write':
+                            Result.objects.create(
+                                quiz_id=quiz_id, user_id=user_id, score=rng.randint(0, 100)
+                            )
+                        else:
+                            user_results(User(pk=user_id), quiz_id)
+                            score_rank(quiz_id, 50)
+                    except OperationalError:
+                        # database is locked
+                        with lock:
+                            errors[operation] += 1
+                        continue
+                    with lock:
+                        samples[operation].append((time.perf_counter() - start) * 1000)
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            list(executor.map(student, range(options['concurrency'])))
+        elapsed = time.perf_counter() - start
+
+        operations = {}
+        for operation in OPERATIONS:
+            operations[operation] = summarize(samples[operation], [], elapsed)
+            operations[operation]['errors'] = errors[operation]
+        return {
+            'elapsed_s': elapsed,
+            'throughput': sum(len(samples[operation]) for operation in OPERATIONS) / elapsed,
+            'operations': operations,
+        }
+
+    def table(self, report):
+        lines = [
+            f"{'profile':<8} {'operation':<9} {'ops':>7} {'ops/s':>8} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>6}"
+        ]
+        for name, run in report.items():
+            for operation, stats in run['operations'].items():
+                if not stats['requests']:
+                    lines.append(f"{name:<8} {operation:<9} {0:>7} {'-':>8} {'-':>8} {'-':>8} {'-':>8} {stats['errors']:>6}")
+                    continue
+                lines.append(
+                    f"{name:<8} {operation:<9} {stats['requests']:>7} {stats['throughput']:>8.1f} "
+                    f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} "
+                    f"{stats['errors']:>6}"
+                )
+        for name, run in report.items():
+            lines.append(f"{name}: {run['throughput']:.1f} operations/s overall")
+        return '\n'.join(lines)
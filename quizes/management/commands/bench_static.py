@@ -0,0 +1,95 @@
+import math
+import re
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from quizes.benchmark import seed, temporary_database
+from quizes.models import Quiz
+
+
+# What the exam page was served with before: unhashed names, no compressed
+# variants and no caching headers, so every asset is revalidated
+PROFILES = {
+    'plain': {
+        'STATICFILES_STORAGE': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+        'WHITENOISE_MAX_AGE': 0,
+    },
+    'hashed': {},
+}
+
+ASSET_RE = re.compile(r'''(?:src|href)=["']?(/static/[^"'\s>]+)''')
+
+# Parallel connections of a browser to one host
+CONNECTIONS = 6
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the cold and repeat loads of the exam page with the plain "
+        "static files and with the hashed, precompressed ones served with "
+        "immutable caching headers. collectstatic is run for each profile; "
+        "the load times are modeled from the requests and bytes measured, "
+        "for the round-trip time and bandwidth given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rtt-ms', type=float, default=150, help="Round-trip time")
+        parser.add_argument('--kbps', type=float, default=1600, help="Bandwidth, kilobits/s")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'profile':<8} {'load':<7} {'requests':>8} {'bytes':>8} {'modeled ms':>10}  assets"
+        )
+        with temporary_database():
+            seed(topics=1, quizes=1, questions=5, answers=3, users=1, number_of_questions=5)
+            quiz = Quiz.objects.get()
+            for name, profile in PROFILES.items():
+                with tempfile.TemporaryDirectory() as root, override_settings(
+                    DEBUG=False, ALLOWED_HOSTS=['testserver'], STATIC_ROOT=root, **profile
+                ):
+                    call_command('collectstatic', interactive=False, verbosity=0, stdout=StringIO())
+                    # A new client, so WhiteNoise scans the new STATIC_ROOT
+                    self.load(name, Client(), reverse('quizes:quiz_view', args=[quiz.pk]), options)
+
+    def load(self, name, client, url, options):
+        page = client.get(url)
+        assets = ASSET_RE.findall(page.content.decode())
+
+        cached = {}
+        requests, size = 1, len(page.content)
+        for asset in assets:
+            response = client.get(asset, HTTP_ACCEPT_ENCODING='br, gzip')
+            requests += 1
+            size += len(b''.join(response.streaming_content))
+            cached[asset] = response
+        self.report(name, 'cold', requests, size, assets, cached, options)
+
+        # The assets a browser revalidates on the next exam page
+        requests, size = 1, len(page.content)
+        for asset, response in cached.items():
+            if 'immutable' in response.get('Cache-Control', ''):
+                continue
+            revalidation = client.get(
+                asset, HTTP_ACCEPT_ENCODING='br, gzip',
+                HTTP_IF_NONE_MATCH=response.get('ETag', ''),
+            )
+            requests += 1
+            size += len(b''.join(revalidation.streaming_content)) if revalidation.streaming else 0
+        self.report(name, 'repeat', requests, size, assets, cached, options)
+
+    def report(self, name, load, requests, size, assets, cached, options):
+        # The page, then its assets over the parallel connections
+        rounds = 1 + math.ceil((requests - 1) / CONNECTIONS)
+        modeled = rounds * options['rtt_ms'] + size * 8 / options['kbps']
+        encodings = ', '.join(
+            f"{asset.rsplit('/', 1)[-1]} {response.get('Content-Encoding', 'identity')}"
+            for asset, response in cached.items()
+        )
+        self.stdout.write(
+            f"{name:<8} {load:<7} {requests:>8} {size:>8} {modeled:>10.0f}  {encodings}"
+        )
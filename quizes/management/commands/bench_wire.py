@@ -0,0 +1,120 @@
+import random
+import statistics
+import time
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+
+from quizes.middleware import brotli, compress
+from quizes.payloads import build_quiz_payload
+from quizes.views import _grade
+from quizes.wire import compact_quiz_payload, content_type
+
+WORDS = (
+    "which of the following statements about python lists tuples dictionaries "
+    "is true returns value function class method object instance variable "
+    "scope loop iteration generator exception module package import"
+).split()
+
+
+class Snapshot:
+    """The snapshot fields the payloads are built from"""
+
+    def __init__(self, content):
+        self.content = content
+        self.version = 'a' * 64
+        self.quiz_id = 1
+
+
+def text(rng, length):
+    words = []
+    while sum(len(word) + 1 for word in words) < length:
+        words.append(rng.choice(WORDS))
+    return ' '.join(words).capitalize()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the size and the serialization time of the default and "
+        "compact wire formats of the quiz data, the submissions and their "
+        "results, raw and compressed with gzip (and brotli when installed). "
+        "Works on generated quiz content, without a database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=20, help="Questions served")
+        parser.add_argument('--answers', type=int, default=4, help="Answers per question")
+        parser.add_argument('--question-length', type=int, default=120, help="Characters")
+        parser.add_argument('--answer-length', type=int, default=40, help="Characters")
+        parser.add_argument('--repeat', type=int, default=500, help="Timed runs per format")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        question_ids = list(range(1, options['questions'] + 1))
+        content = {
+            'time': 10,
+            'required_score': '50.00',
+            'number_of_questions': options['questions'],
+            'questions': [
+                [question_id, f"{question_id}. {text(rng, options['question_length'])}", [
+                    [question_id * 10 + i, text(rng, options['answer_length']), i == 0]
+                    for i in range(options['answers'])
+                ]]
+                for question_id in question_ids
+            ],
+        }
+        snapshot = Snapshot(content)
+        token = 'x' * 120
+        choices = [rng.randrange(options['answers']) for _ in question_ids]
+
+        default_submission = {'attempt': token, **{
+            question[1]: question[2][choice][1]
+            for question, choice in zip(content['questions'], choices)
+        }}
+        compact_submission = {'attempt': token, 'answers': ','.join(
+            str(question[2][choice][0])
+            for question, choice in zip(content['questions'], choices)
+        )}
+
+        cases = (
+            ('quiz data', 'default', lambda: JsonResponse({
+                'data': build_quiz_payload(content['questions']),
+                'time': content['time'], 'version': snapshot.version, 'attempt': token,
+            })),
+            ('quiz data', 'compact', lambda: JsonResponse({
+                'v': 1, 'version': snapshot.version, 'time': content['time'], 'attempt': token,
+                'questions': compact_quiz_payload(content['questions']),
+            }, content_type=content_type(1))),
+            ('submission', 'default', lambda: urlencode(default_submission).encode()),
+            ('submission', 'compact', lambda: urlencode(compact_submission).encode()),
+            ('results', 'default', lambda: JsonResponse(
+                _grade(snapshot, content['questions'], default_submission, question_ids)[1]
+            )),
+            ('results', 'compact', lambda: JsonResponse(
+                _grade(snapshot, content['questions'], compact_submission, question_ids, 1)[1],
+                content_type=content_type(1),
+            )),
+        )
+
+        encodings = ('gzip', 'br') if brotli is not None else ('gzip',)
+        self.stdout.write(
+            f"{'payload':<11} {'format':<8} {'bytes':>7} "
+            + ''.join(f"{encoding:>7}" for encoding in encodings)
+            + f" {'median us':>10}"
+        )
+        for payload, fmt, build in cases:
+            output = build()
+            body = output.content if isinstance(output, JsonResponse) else output
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                build()
+                timings.append((time.perf_counter() - start) * 1e6)
+            self.stdout.write(
+                f"{payload:<11} {fmt:<8} {len(body):>7} "
+                + ''.join(f"{len(compress(body, encoding)):>7}" for encoding in encodings)
+                + f" {statistics.median(timings):>10.1f}"
+            )
+        if brotli is None:
+            self.stdout.write("Install Brotli to compare the brotli sizes")
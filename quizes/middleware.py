@@ -0,0 +1,99 @@
+"""
+Compression of the JSON responses
+
+JSONCompressionMiddleware compresses the JSON (and NDJSON) responses with
+brotli, when the Brotli package is installed and the client accepts it, or
+with gzip. The HTML pages are left alone: they carry the CSRF token next to
+reflected user input, what BREACH attacks on compressed responses need.
+Streaming responses are compressed block by block, each block flushed so
+the stream keeps flowing.
+"""
+import gzip
+import io
+
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Bodies smaller than this are sent as they are
+MIN_LENGTH = 200
+
+re_accepts_br = _lazy_re_compile(r'\bbr\b')
+re_accepts_gzip = _lazy_re_compile(r'\bgzip\b')
+
+
+def is_json(content_type):
+    media_type = content_type.split(';')[0].strip().lower()
+    return media_type in ('application/json', 'application/x-ndjson') or media_type.endswith('+json')
+
+
+def negotiate_encoding(accept_encoding):
+    """The encoding to compress with, br, gzip or None"""
+    if brotli is not None and re_accepts_br.search(accept_encoding):
+        return 'br'
+    if re_accepts_gzip.search(accept_encoding):
+        return 'gzip'
+    return None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=5)
+    return gzip.compress(content, compresslevel=6, mtime=0)
+
+
+def compress_stream(blocks, encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=5)
+        for block in blocks:
+            yield compressor.process(block) + compressor.flush()
+        yield compressor.finish()
+        return
+
+    buffer = io.BytesIO()
+    with gzip.GzipFile(mode='wb', compresslevel=6, fileobj=buffer, mtime=0) as compressor:
+        for block in blocks:
+            compressor.write(block)
+            compressor.flush()
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class JSONCompressionMiddleware(MiddlewareMixin):
+    """Compress the JSON responses, brotli or gzip"""
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not is_json(response.get('Content-Type', '')):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response.headers['Content-Length']
+        else:
+            if len(response.content) < MIN_LENGTH:
+                return response
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The compressed body differs from the one the ETag was computed on
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,24 @@
+# Generated by Django 4.0.4 on 2026-10-18 18:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizes', '0002_alter_quiz_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(help_text='Hash of the content', max_length=32, unique=True)),
+                ('content', models.JSONField()),
+                ('date', models.DateTimeField(auto_now_add=True, null=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='quizes.quiz')),
+            ],
+        ),
+    ]
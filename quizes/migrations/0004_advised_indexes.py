@@ -0,0 +1,25 @@
+# Generated by Django 4.0.4 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizes', '0003_quizsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['name'], name='quizes_quiz_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['topic', 'name'], name='quizes_quiz_topic_id_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['name'], name='quizes_topic_name_idx'),
+        ),
+    ]
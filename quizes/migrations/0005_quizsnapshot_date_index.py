@@ -0,0 +1,17 @@
+# Generated by Django 4.0.4 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizes', '0004_advised_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizsnapshot',
+            index=models.Index(fields=['quiz', 'date'], name='quizes_quizsnapsh_a5fc6fd1_idx'),
+        ),
+    ]
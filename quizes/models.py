@@ -1,12 +1,13 @@
 """
 Models of the Quizes app
 """
-import random
 from django.db import models
 
 # Validators
 from validators.validators import PERCENTAGE_VALIDATOR
 
+from .sampling import sample
+
 
 DIFFICULTY_CHOICES = (
     ("Easy", "Easy"),
@@ -39,6 +40,12 @@ class Topic(models.Model):
         """
         return self.name
 
+    class Meta:
+        # Advised by advise_indexes: the topics are listed by name
+        indexes = [
+            models.Index(fields=['name'], name='quizes_topic_name_idx'),
+        ]
+
 
 # Quiz model
 class Quiz(models.Model):
@@ -93,9 +100,55 @@ class Quiz(models.Model):
 
     @property
     def get_questions(self):
-        questions = list(self.questions.all())
-        random.shuffle(questions)
-        return questions[:self.number_of_questions]
+        """
+        A random sample of number_of_questions questions, without loading
+        the whole question bank
+        """
+        return sample(self.questions.all(), self.number_of_questions)
+
+    class Meta:
+        verbose_name_plural = "Quizes"
+        # Advised by advise_indexes: the quizes are listed by name, of all
+        # the topics or of one, and imported questions name their quiz
+        indexes = [
+            models.Index(fields=['name'], name='quizes_quiz_name_idx'),
+            models.Index(fields=['topic', 'name'], name='quizes_quiz_topic_id_name_idx'),
+        ]
+
+# Quiz snapshot model
+class QuizSnapshot(models.Model):
+    """QuizSnapshot: An immutable version of the content of a quiz
+
+    The content holds the settings, questions and answers of the quiz as
+    served to the students, and the version is a hash of that content.
+    """
+
+    quiz = models.ForeignKey(
+        Quiz,
+        on_delete=models.CASCADE,
+        related_name="snapshots"
+    )
+
+    version = models.CharField(
+        help_text="Hash of the content",
+        max_length=32,
+        unique=True
+    )
+
+    content = models.JSONField()
+
+    date = models.DateTimeField(
+        auto_now_add=True,
+        blank=True,
+        null=True
+    )
+
+    def __str__(self):
+        return f"{self.quiz_id} - {self.version}"
 
     class Meta:
-        verbose_name_plural = "Quizes"
\ No newline at end of file
+        # Advised by advise_indexes: the superseded snapshots of a quiz are
+        # pruned by date
+        indexes = [
+            models.Index(fields=['quiz', 'date'], name='quizes_quizsnapsh_a5fc6fd1_idx'),
+        ]
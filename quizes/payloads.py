@@ -0,0 +1,29 @@
+"""
+Builders for the JSON payloads served by the Quizes app
+"""
+import random
+
+from questions.models import Question
+from .sampling import sample_ids
+
+
+def sample_question_ids(snapshot, rng=random):
+    """The ids of the questions served for an attempt at a snapshot
+
+    Sampled from the ids of the questions of the quiz in the database, in
+    one query reading the ids only, whatever the size of its bank.
+    """
+    k = max(0, snapshot.content['number_of_questions'])
+    return sample_ids(Question.objects.filter(quiz=snapshot.quiz_id), k, rng)
+
+
+def build_quiz_payload(questions):
+    """Build the question list sent to a student starting the quiz
+
+    Works on the snapshot questions served (see snapshot_questions), so it
+    does not run any query.
+    """
+    return [
+        {text: [answer_text for _, answer_text, _ in answers]}
+        for _, text, answers in questions
+    ]
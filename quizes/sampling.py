@@ -0,0 +1,72 @@
+"""
+Random sampling of rows that does not load the whole table
+
+Only primary keys are streamed from the database (for questions this is an
+index-only scan over the quiz foreign key) and a fixed size reservoir keeps
+the memory bounded by the sample size. The sampled rows are then fetched
+with a single ``pk IN (...)`` query.
+"""
+import math
+import random
+from itertools import islice
+
+
+# Rows read per round-trip while streaming the primary keys
+ID_CHUNK_SIZE = 2000
+
+_EXHAUSTED = object()
+
+
+def _uniform(rng):
+    """A random float in the open interval (0, 1)"""
+    value = rng.random()
+    while value == 0.0:
+        value = rng.random()
+    return value
+
+
+def reservoir_sample(iterable, k, rng=random):
+    """Pick k items uniformly at random from an iterable of unknown length
+
+    Uses Li's "Algorithm L", which jumps over the items it will not pick
+    instead of drawing a random number for each of them. The picked items
+    are returned in random order.
+    """
+    if k <= 0:
+        return []
+
+    iterator = iter(iterable)
+    reservoir = list(islice(iterator, k))
+
+    if len(reservoir) == k:
+        w = math.exp(math.log(_uniform(rng)) / k)
+        while True:
+            skip = math.floor(math.log(_uniform(rng)) / math.log1p(-w))
+            item = next(islice(iterator, skip, skip + 1), _EXHAUSTED)
+            if item is _EXHAUSTED:
+                break
+            reservoir[rng.randrange(k)] = item
+            w *= math.exp(math.log(_uniform(rng)) / k)
+
+    rng.shuffle(reservoir)
+    return reservoir
+
+
+def sample_ids(queryset, k, rng=random):
+    """Sample k primary keys of a queryset reading the ids only"""
+    ids = queryset.order_by().values_list('pk', flat=True)
+    return reservoir_sample(ids.iterator(chunk_size=ID_CHUNK_SIZE), k, rng)
+
+
+def sample(queryset, k, rng=random):
+    """Sample k objects of a queryset in random order
+
+    Costs two queries whatever the size of the queryset: one streaming the
+    ids and one fetching the picked rows.
+    """
+    ids = sample_ids(queryset, k, rng)
+    if not ids:
+        return []
+
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
@@ -0,0 +1,22 @@
+"""
+Signals of the Quizes app
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .listing import invalidate_list
+from .models import Quiz, Topic
+from .snapshots import schedule_publish
+
+
+@receiver([post_save, post_delete], sender=Quiz)
+def publish_quiz(sender, instance, **kwargs):
+    """A new snapshot of the quiz when its settings change"""
+    schedule_publish(instance.pk)
+    invalidate_list()
+
+
+@receiver([post_save, post_delete], sender=Topic)
+def invalidate_topic_quizes(sender, instance, **kwargs):
+    """The topics are shown in the quiz list"""
+    invalidate_list()
@@ -0,0 +1,212 @@
+"""
+Content-addressed snapshots of the quizes
+
+A snapshot is the content of a quiz (settings, questions and answers)
+serialized once and stored under the hash of that content. Snapshots never
+change: editing a question produces a new snapshot with a new version, so
+the served payloads can be cached and validated with strong ETags, and a
+submission can be graded against the exact version the student was shown.
+
+A superseded snapshot is kept while the attempts it was served to can
+still be submitted, then pruned when a later version is published.
+
+The whole content is only read when a snapshot is published (or evicted
+from the cache). The cache holds the snapshot without its questions, and
+every question under a key of its own: starting or grading an attempt
+reads the questions it serves, not the question bank.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Subquery
+from django.utils import timezone
+
+from .attempts import GRACE
+from .models import Quiz, QuizSnapshot
+
+
+# Seconds the current snapshot of a quiz is cached. Publishing replaces it
+# right away in the local cache, the timeout bounds how stale the other
+# processes can be when the cache is not shared.
+SNAPSHOT_TIMEOUT = getattr(settings, 'QUIZ_SNAPSHOT_TIMEOUT', 300)
+
+# Seconds a superseded snapshot is kept, at least the time of the quiz plus
+# the grace of its attempts
+SNAPSHOT_RETENTION = getattr(settings, 'QUIZ_SNAPSHOT_RETENTION', 24 * 60 * 60)
+
+
+def _current_key(quiz_id):
+    return f'quizes:snapshot:{quiz_id}'
+
+
+def _version_key(version):
+    return f'quizes:snapshot-version:{version}'
+
+
+def _question_key(version, question_id):
+    return f'quizes:snapshot-question:{version}:{question_id}'
+
+
+def _cache(snapshot):
+    """Cache the questions of a snapshot, returns the snapshot without them
+
+    The snapshot returned is the one cached and served, its content only
+    holds the settings of the quiz: read its questions with
+    snapshot_questions.
+    """
+    questions = snapshot.content.get('questions', [])
+    cache.set_many(
+        {_question_key(snapshot.version, question[0]): question for question in questions}, None
+    )
+    return QuizSnapshot(
+        pk=snapshot.pk, quiz_id=snapshot.quiz_id, version=snapshot.version, date=snapshot.date,
+        content={key: value for key, value in snapshot.content.items() if key != 'questions'},
+    )
+
+
+def serialize_quiz(quiz):
+    """The content of a quiz, with its questions and answers ordered by id"""
+    # Plain rows rather than model instances, quizes can have large banks.
+    # One query joining the answers, a question deleted meanwhile can't
+    # leave answers without their question
+    rows = quiz.questions.order_by('pk', 'answers__pk').values_list(
+        'pk', 'text', 'answers__pk', 'answers__text', 'answers__correct'
+    )
+    questions = {}
+    for pk, text, answer_pk, answer_text, correct in rows.iterator():
+        question = questions.setdefault(pk, [pk, text, []])
+        if answer_pk is not None:
+            question[2].append([answer_pk, answer_text, correct])
+
+    return {
+        'quiz': quiz.pk,
+        'time': quiz.time,
+        'number_of_questions': quiz.number_of_questions,
+        'required_score': str(quiz.required_score),
+        'questions': list(questions.values())
+    }
+
+
+def content_version(content):
+    """Hash of the canonical JSON encoding of a snapshot content"""
+    encoded = json.dumps(content, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+def publish_snapshot(quiz_id):
+    """Snapshot the current content of a quiz and make it the served one
+
+    Returns None when the quiz does not exist anymore.
+    """
+    quiz = Quiz.objects.filter(pk=quiz_id).first()
+    if quiz is None:
+        cache.delete(_current_key(quiz_id))
+        return None
+
+    content = serialize_quiz(quiz)
+    snapshot, created = QuizSnapshot.objects.get_or_create(
+        version=content_version(content),
+        defaults={'quiz': quiz, 'content': content}
+    )
+    if created:
+        prune_snapshots(quiz)
+    else:
+        current = cache.get(_current_key(quiz_id))
+        if current is None or current.version != snapshot.version:
+            # Back to an earlier content, served again from now on
+            snapshot.date = timezone.now()
+            QuizSnapshot.objects.filter(pk=snapshot.pk).update(date=snapshot.date)
+
+    snapshot = _cache(snapshot)
+    cache.set(_current_key(quiz_id), snapshot, SNAPSHOT_TIMEOUT)
+    cache.set(_version_key(snapshot.version), snapshot, None)
+    return snapshot
+
+
+def prune_snapshots(quiz):
+    """Delete the snapshots of a quiz no attempt can be submitted for anymore
+
+    A snapshot is served from its date until the date of the next one, the
+    ones superseded by a snapshot older than the retention are pruned.
+    """
+    retention = max(SNAPSHOT_RETENTION, quiz.time * 60 + GRACE)
+    superseded = QuizSnapshot.objects.filter(
+        quiz=quiz, date__lte=timezone.now() - timedelta(seconds=retention)
+    ).order_by('-date').values('date')[:1]
+
+    # Older than the current one, just published
+    QuizSnapshot.objects.filter(quiz=quiz, date__lt=Subquery(superseded)).delete()
+
+
+class _Publish:
+    """The on_commit callback publishing a quiz"""
+
+    def __init__(self, quiz_id):
+        self.quiz_id = quiz_id
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        publish_snapshot(self.quiz_id)
+
+
+def schedule_publish(quiz_id):
+    """Publish a new snapshot of the quiz once the transaction commits
+
+    Once per quiz and transaction, saving a question and its answers
+    serializes the quiz once. The callbacks pending on the connection tell
+    the quizes already scheduled, they are dropped with the transaction or
+    savepoint rolled back.
+    """
+    connection = transaction.get_connection()
+    for _, callback in connection.run_on_commit:
+        if isinstance(callback, _Publish) and callback.quiz_id == quiz_id and not callback.done:
+            return
+    transaction.on_commit(_Publish(quiz_id))
+
+
+def get_snapshot(quiz_id):
+    """The current snapshot of a quiz, or None if the quiz does not exist"""
+    snapshot = cache.get(_current_key(quiz_id))
+    if snapshot is None:
+        snapshot = publish_snapshot(quiz_id)
+    return snapshot
+
+
+def get_snapshot_version(quiz_id, version):
+    """A given snapshot of a quiz, or None if the quiz has no such version"""
+    snapshot = cache.get(_version_key(version))
+    if snapshot is None:
+        snapshot = QuizSnapshot.objects.filter(quiz=quiz_id, version=version).first()
+        if snapshot is None:
+            return None
+        snapshot = _cache(snapshot)
+        cache.set(_version_key(version), snapshot, None)
+
+    if str(snapshot.quiz_id) != str(quiz_id):
+        return None
+    return snapshot
+
+
+def snapshot_questions(snapshot, question_ids):
+    """The questions of a snapshot with these ids, in their order
+
+    [id, text, [[answer id, answer text, correct], ...]] lists, the ids
+    that are not questions of the snapshot are left out. Read from the
+    cache, the content is read again when some were evicted.
+    """
+    keys = [_question_key(snapshot.version, pk) for pk in question_ids]
+    found = cache.get_many(keys)
+    if len(found) < len(keys):
+        stored = QuizSnapshot.objects.filter(pk=snapshot.pk).first()
+        if stored is not None:
+            _cache(stored)
+            found = {
+                _question_key(snapshot.version, question[0]): question
+                for question in stored.content['questions']
+            }
+    return [found[key] for key in keys if key in found]
@@ -4,6 +4,10 @@ console.log(url)
 const quizBox = document.getElementById('quiz-box')
 const timerBox = document.getElementById('timer-box')
 
+// The signed attempt and the quiz version served, sent back with the answers
+let attempt
+let version
+
 const activateTimer = (time) =>{
     // First state
     if (time.toString().lenght < 2){
@@ -59,6 +63,8 @@ $.ajax({
     success: function(response){
         const data = response.data 
         const time = response.time
+        attempt = response.attempt
+        version = response.version
         data.forEach(element => { // A dictionary of a Question and its answers
             for (const [question, answers] of Object.entries(element)){
                 quizBox.innerHTML  += `
@@ -97,6 +103,8 @@ const sendData = () => {
     const elements = [...document.getElementsByClassName('ans')]
     const data = {}
     data['csrfmiddlewaretoken'] = csrf[0].value
+    data['attempt'] = attempt
+    data['version'] = version
     elements.forEach(el => {
         if (el.checked) {
             data[el.name] = el.value
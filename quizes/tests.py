@@ -1,3 +1,699 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipIf
+from urllib.parse import urlencode
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from questions.models import Question, Answer
+from results.models import Result
+from results.sharding import shards
+from instrumentation.advisor import explain, propose, record
+from instrumentation.sqlite import current_pragmas, persist_pragmas, pragma_statements
+from .attempts import GRACE, issue_attempt, read_attempt
+from .benchmark import seed, temporary_database, view_scenarios
+from .models import Quiz, QuizSnapshot, Topic
+from .sampling import reservoir_sample, sample, sample_ids
+from .snapshots import SNAPSHOT_RETENTION, get_snapshot, publish_snapshot, snapshot_questions
+from .wire import COMPACT_TYPE
+
+
+def create_quiz(questions, number_of_questions=None, answers=3):
+    """Create a quiz with the given number of questions and answers"""
+    quiz = Quiz.objects.create(
+        name="Quiz",
+        number_of_questions=number_of_questions or questions,
+        time=10,
+        required_score=50,
+        difficulty="Easy",
+    )
+    for i in range(questions):
+        question = Question.objects.create(text=f"Question {i}", quiz=quiz)
+        for j in range(answers):
+            Answer.objects.create(
+                text=f"Answer {i}.{j}",
+                correct=j == 0,
+                question=question,
+            )
+    return quiz
+
+
+class SamplingTests(TestCase):
+
+    def test_k_at_least_n(self):
+        for k in (5, 8):
+            picked = reservoir_sample(range(5), k, random.Random(1))
+            self.assertEqual(sorted(picked), [0, 1, 2, 3, 4])
+
+    def test_k_zero(self):
+        self.assertEqual(reservoir_sample(range(5), 0), [])
+        self.assertEqual(reservoir_sample(range(5), -1), [])
+        self.assertEqual(reservoir_sample([], 3), [])
+
+    def test_uniform(self):
+        rng = random.Random(42)
+        counts = Counter()
+        for _ in range(20000):
+            picked = reservoir_sample(range(20), 5, rng)
+            self.assertEqual(len(set(picked)), 5)
+            counts.update(picked)
+
+        # Every item is picked k/n of the time, a quarter of the 20000 draws
+        self.assertEqual(sorted(counts), list(range(20)))
+        for item, count in counts.items():
+            self.assertAlmostEqual(count / 20000, 0.25, delta=0.015, msg=item)
+
+    def test_sample_keeps_the_order_of_the_ids(self):
+        quiz = create_quiz(30, answers=1)
+        ids = sample_ids(quiz.questions.all(), 10, random.Random(7))
+        self.assertEqual(len(set(ids)), 10)
+
+        # The ids streamed and the rows fetched with in_bulk
+        with self.assertNumQueries(2):
+            questions = sample(quiz.questions.all(), 10, random.Random(7))
+        self.assertEqual([question.pk for question in questions], ids)
+        self.assertEqual(sample(quiz.questions.all(), 0), [])
+
+
+class QuizListViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('quizes:quiz_list_view')
+
+    def test_paginated_with_question_counts(self):
+        for i in range(25):
+            Quiz.objects.create(
+                name=f"Quiz {i:02}", number_of_questions=5, time=10,
+                required_score=50, difficulty="Easy",
+            )
+        create_quiz(2, number_of_questions=5)
+
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['object_list']), 20)
+        quiz = response.context['object_list'][0]
+        self.assertEqual((quiz.name, quiz.question_count, quiz.questions_served), ("Quiz", 2, 2))
+
+        response = self.client.get(self.url, {'page': 2})
+        self.assertEqual(len(response.context['object_list']), 6)
+
+    def test_topic_filter(self):
+        topic = Topic.objects.create(name="Python")
+        quiz = create_quiz(1)
+        quiz.topic = topic
+        quiz.save()
+        create_quiz(1)
+
+        response = self.client.get(self.url, {'topic': topic.pk})
+        self.assertEqual(list(response.context['object_list']), [quiz])
+
+    def test_cached_until_a_quiz_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz = create_quiz(1)
+
+        # Count, quizes with their topics and topics
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz.name = "Renamed"
+            quiz.save()
+        self.assertContains(self.client.get(self.url), "Renamed")
+
+
+class QuizDetailDataViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_payload_shape(self):
+        quiz = create_quiz(2)
+        response = self.client.get(reverse('quizes:quiz_data_view', args=[quiz.pk]))
+
+        data = response.json()
+        self.assertEqual(data['time'], 10)
+        self.assertEqual(
+            sorted(data['data'], key=lambda item: list(item)[0]),
+            [
+                {"Question 0": ["Answer 0.0", "Answer 0.1", "Answer 0.2"]},
+                {"Question 1": ["Answer 1.0", "Answer 1.1", "Answer 1.2"]},
+            ]
+        )
+
+    def test_samples_number_of_questions(self):
+        quiz = create_quiz(10, number_of_questions=4)
+        response = self.client.get(reverse('quizes:quiz_data_view', args=[quiz.pk]))
+
+        self.assertEqual(len(response.json()['data']), 4)
+
+    def test_query_count_does_not_grow_with_questions(self):
+        for questions in (1, 5, 50):
+            quiz = create_quiz(questions)
+            url = reverse('quizes:quiz_data_view', args=[quiz.pk])
+            # Snapshot of the quiz: quiz, questions with their answers, its
+            # storage and the pruning of the superseded ones, then the ids
+            # of the questions sampled
+            with self.assertNumQueries(8):
+                self.client.get(url)
+            # Served from the cached snapshot and questions
+            with self.assertNumQueries(1):
+                self.client.get(url)
+
+    def test_same_attempt_same_payload(self):
+        quiz = create_quiz(10, number_of_questions=4)
+        url = reverse('quizes:quiz_data_view', args=[quiz.pk])
+
+        first = self.client.get(url).json()
+        again = self.client.get(url, {'attempt': first['attempt']}).json()
+
+        self.assertEqual(first, again)
+
+    def test_conditional_get(self):
+        quiz = create_quiz(3)
+        url = reverse('quizes:quiz_data_view', args=[quiz.pk])
+
+        response = self.client.get(url)
+        attempt = response.json()['attempt']
+        etag = response['ETag']
+
+        response = self.client.get(url, {'attempt': attempt}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_forged_attempt_starts_a_new_one(self):
+        quiz = create_quiz(3)
+        url = reverse('quizes:quiz_data_view', args=[quiz.pk])
+
+        attempt = self.client.get(url).json()['attempt']
+        response = self.client.get(url, {'attempt': attempt + "x"})
+
+        # A valid token is issued, possibly equal to the first one when the
+        # same questions were sampled in the same order within a second
+        self.assertEqual(len(read_attempt(response.json()['attempt'], quiz.pk).question_ids), 3)
+
+    def test_new_version_when_an_answer_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz = create_quiz(3)
+        url = reverse('quizes:quiz_data_view', args=[quiz.pk])
+        data = self.client.get(url).json()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Answer.objects.filter(question__quiz=quiz, correct=True).first().save()
+        self.assertEqual(self.client.get(url).json()['version'], data['version'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            answer = Answer.objects.filter(question__quiz=quiz).first()
+            answer.text = "Changed"
+            answer.save()
+
+        self.assertNotEqual(self.client.get(url).json()['version'], data['version'])
+        self.assertEqual(QuizSnapshot.objects.filter(quiz=quiz).count(), 2)
+        # An ongoing attempt keeps the version it was shown
+        again = self.client.get(url, {'attempt': data['attempt']}).json()
+        self.assertEqual(again, data)
+
+
+class SnapshotTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def edit(self, quiz, text):
+        with self.captureOnCommitCallbacks(execute=True):
+            question = quiz.questions.order_by('pk').first()
+            question.text = text
+            question.save()
+        return get_snapshot(quiz.pk)
+
+    def test_superseded_snapshots_are_pruned(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz = create_quiz(2)
+        first = get_snapshot(quiz.pk)
+        second = self.edit(quiz, "Edited")
+        self.assertEqual(QuizSnapshot.objects.filter(quiz=quiz).count(), 2)
+
+        # The first one was superseded when the second one was published
+        long_ago = timezone.now() - timedelta(seconds=SNAPSHOT_RETENTION + 1)
+        QuizSnapshot.objects.filter(pk=second.pk).update(date=long_ago)
+        QuizSnapshot.objects.filter(pk=first.pk).update(date=long_ago - timedelta(seconds=1))
+        third = self.edit(quiz, "Edited again")
+
+        self.assertEqual(
+            set(QuizSnapshot.objects.filter(quiz=quiz).values_list('pk', flat=True)),
+            {second.pk, third.pk}
+        )
+
+    def test_earlier_content_served_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz = create_quiz(2)
+        first = get_snapshot(quiz.pk)
+        second = self.edit(quiz, "Edited")
+        long_ago = timezone.now() - timedelta(seconds=SNAPSHOT_RETENTION + 1)
+        QuizSnapshot.objects.filter(pk=second.pk).update(date=long_ago)
+        QuizSnapshot.objects.filter(pk=first.pk).update(date=long_ago - timedelta(seconds=1))
+
+        self.assertEqual(self.edit(quiz, "Question 0").pk, first.pk)
+        self.edit(quiz, "Edited again")
+
+        # Both served until just now
+        self.assertEqual(QuizSnapshot.objects.filter(quiz=quiz).count(), 3)
+
+    def test_published_once_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz = create_quiz(2)
+        question = quiz.questions.order_by('pk').first()
+
+        with mock.patch('quizes.snapshots.publish_snapshot') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    question.text = "Edited"
+                    question.save()
+                    for answer in question.answers.all():
+                        answer.text += " edited"
+                        answer.save()
+            publish.assert_called_once_with(quiz.pk)
+
+            # Scheduled again when the savepoint holding it is rolled back
+            publish.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        question.save()
+                        raise ValueError
+                except ValueError:
+                    pass
+                question.save()
+            publish.assert_called_once_with(quiz.pk)
+
+    def test_questions_are_cached_apart(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz = create_quiz(3)
+        snapshot = get_snapshot(quiz.pk)
+        self.assertNotIn('questions', snapshot.content)
+        ids = list(quiz.questions.order_by('-pk').values_list('pk', flat=True))
+
+        # Only the questions asked for, in their order
+        with self.assertNumQueries(0):
+            questions = snapshot_questions(snapshot, ids[:2])
+        self.assertEqual([question[0] for question in questions], ids[:2])
+        self.assertEqual(questions[0][2][0][1], "Answer 2.0")
+        # Not a question of the snapshot
+        self.assertEqual(snapshot_questions(snapshot, [0]), [])
+
+        # Read again from the stored content once evicted
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(snapshot_questions(snapshot, ids), snapshot_questions(snapshot, ids))
+
+
+@skipIf(len(shards()) > 1, "Reads the results without selecting a shard, see MultiShardTests")
+class SaveQuizViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz = create_quiz(4)
+        self.url = reverse('quizes:quiz_save_view', args=[self.quiz.pk])
+
+    def attempt(self, quiz=None):
+        """An attempt served every question of the quiz, in order"""
+        quiz = quiz or self.quiz
+        snapshot = get_snapshot(quiz.pk)
+        return issue_attempt(snapshot, list(quiz.questions.order_by('pk').values_list('pk', flat=True)))
+
+    def test_text_keyed_submission(self):
+        response = self.client.post(self.url, {
+            'attempt': self.attempt(),
+            "Question 0": "Answer 0.0",
+            "Question 1": "Answer 1.1",
+            "Question 2": "",
+            "Question 3": "Answer 3.0",
+        })
+
+        data = response.json()
+        self.assertEqual(data['correct_questions'], 2)
+        self.assertEqual(data['score'], 50)
+        self.assertTrue(data['passed'])
+        self.assertEqual(data['results'], [
+            {"Question 0": {'correct_answer': "Answer 0.0", 'answered': "Answer 0.0"}},
+            {"Question 1": {'correct_answer': "Answer 1.0", 'answered': "Answer 1.1"}},
+            {"Question 2": 'not answered'},
+            {"Question 3": {'correct_answer': "Answer 3.0", 'answered': "Answer 3.0"}},
+        ])
+        self.assertEqual(Result.objects.get(user=self.user).score, 50)
+        self.assertEqual(data['rank'], {'attempts': 1, 'percentile': 0})
+
+    def test_id_keyed_submission(self):
+        questions = list(self.quiz.questions.order_by('pk'))
+        correct = {q.pk: q.answers.get(correct=True).pk for q in questions}
+        wrong = {q.pk: q.answers.filter(correct=False).first().pk for q in questions}
+
+        response = self.client.post(self.url, {
+            'attempt': self.attempt(),
+            str(questions[0].pk): str(correct[questions[0].pk]),
+            str(questions[1].pk): str(wrong[questions[1].pk]),
+            str(questions[2].pk): str(correct[questions[2].pk]),
+            str(questions[3].pk): str(correct[questions[3].pk]),
+        })
+
+        data = response.json()
+        self.assertEqual(data['correct_questions'], 3)
+        self.assertEqual(data['score'], 75)
+        self.assertEqual(
+            data['results'][1],
+            {"Question 1": {'correct_answer': "Answer 1.0", 'answered': str(wrong[questions[1].pk])}}
+        )
+
+    def test_ignores_questions_of_other_quizes(self):
+        create_quiz(1).questions.update(text="Foreign question")
+
+        response = self.client.post(self.url, {
+            'attempt': self.attempt(),
+            "Question 0": "Answer 0.0",
+            "Foreign question": "Answer 0.0",
+        })
+
+        data = response.json()
+        self.assertEqual(data['correct_questions'], 1)
+        self.assertEqual(len(data['results']), 4)
+
+    def test_query_count_does_not_grow_with_questions(self):
+        for questions in (1, 20):
+            quiz = create_quiz(questions)
+            url = reverse('quizes:quiz_save_view', args=[quiz.pk])
+            submission = {f"Question {i}": f"Answer {i}.0" for i in range(questions)}
+            submission['attempt'] = self.attempt(quiz)
+            # Session, user, result, statistics and rank, the required
+            # score is the one of the snapshot
+            with self.assertNumQueries(5):
+                self.client.post(url, submission)
+
+    def test_grades_against_the_version_shown(self):
+        data_url = reverse('quizes:quiz_data_view', args=[self.quiz.pk])
+        data = self.client.get(data_url).json()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz.questions.get(text="Question 0").answers.update(correct=False)
+            Answer.objects.filter(text="Answer 0.1").update(correct=True)
+            self.quiz.save()
+
+        response = self.client.post(self.url, {
+            "Question 0": "Answer 0.0", 'attempt': data['attempt'], 'version': data['version'],
+        })
+        self.assertEqual(response.json()['correct_questions'], 1)
+
+        attempt = self.client.get(data_url).json()['attempt']
+        response = self.client.post(self.url, {"Question 0": "Answer 0.0", 'attempt': attempt})
+        self.assertEqual(response.json()['correct_questions'], 0)
+
+    def test_attempt_grades_the_questions_served(self):
+        data_url = reverse('quizes:quiz_data_view', args=[self.quiz.pk])
+        data = self.client.get(data_url).json()
+        served = [list(question)[0] for question in data['data']]
+
+        response = self.client.post(self.url, {
+            served[0]: served[0].replace("Question", "Answer") + ".0",
+            "Question from nowhere": "Answer",
+            'attempt': data['attempt'],
+        })
+
+        data = response.json()
+        self.assertEqual(data['correct_questions'], 1)
+        self.assertEqual(data['score'], 25)
+        self.assertEqual([list(result)[0] for result in data['results']], served)
+        self.assertEqual(data['results'][1], {served[1]: 'not answered'})
+
+    def test_attempt_needs_no_query(self):
+        data_url = reverse('quizes:quiz_data_view', args=[self.quiz.pk])
+        attempt = self.client.get(data_url).json()['attempt']
+        # Session, user, result, statistics and rank
+        with self.assertNumQueries(5):
+            self.client.post(self.url, {"Question 0": "Answer 0.0", 'attempt': attempt})
+
+    def test_no_attempt(self):
+        response = self.client.post(self.url, {"Question 0": "Answer 0.0"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': "The submission has no attempt token"})
+
+        response = self.client.post(self.url, {"Question 0": "Answer 0.0", 'attempt': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Result.objects.exists())
+
+    def test_forged_attempt(self):
+        data_url = reverse('quizes:quiz_data_view', args=[self.quiz.pk])
+        attempt = self.client.get(data_url).json()['attempt']
+
+        response = self.client.post(self.url, {'attempt': attempt[:-1]})
+        self.assertEqual(response.status_code, 400)
+
+        other = create_quiz(1)
+        response = self.client.post(
+            reverse('quizes:quiz_save_view', args=[other.pk]), {'attempt': attempt}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Result.objects.exists())
+
+    def test_expired_attempt(self):
+        snapshot = get_snapshot(self.quiz.pk)
+        attempt = issue_attempt(snapshot, [], now=time.time() - 11 * 60 - GRACE)
+
+        response = self.client.post(self.url, {'attempt': attempt})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Result.objects.exists())
+
+
+# The async test client of Django 4.0 can't send multipart bodies
+FORM = 'application/x-www-form-urlencoded'
+
+
+@skipIf(len(shards()) > 1, "Reads the results without selecting a shard, see MultiShardTests")
+class AsyncQuizViewsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.async_client.force_login(self.user)
+        self.quiz = create_quiz(4, number_of_questions=2)
+        self.data_url = reverse('quizes:quiz_data_async_view', args=[self.quiz.pk])
+        self.save_url = reverse('quizes:quiz_save_async_view', args=[self.quiz.pk])
+
+    async def test_attempt_round_trip(self):
+        response = await self.async_client.get(self.data_url)
+        data = response.json()
+        self.assertEqual(len(data['data']), 2)
+        # The queries run in the thread of sync_to_async are recorded
+        self.assertNotIn('"0 queries"', response['Server-Timing'])
+        self.assertEqual(data['time'], 10)
+
+        again = await self.async_client.get(self.data_url, {'attempt': data['attempt']})
+        self.assertEqual(again.json(), data)
+
+        served = [list(question)[0] for question in data['data']]
+        response = await self.async_client.post(self.save_url, urlencode({
+            served[0]: served[0].replace("Question", "Answer") + ".0",
+            'attempt': data['attempt'],
+        }), content_type=FORM)
+
+        result = response.json()
+        self.assertEqual(result['correct_questions'], 1)
+        self.assertEqual(result['score'], 50)
+        self.assertTrue(result['passed'])
+
+        scores = await sync_to_async(list)(
+            Result.objects.filter(user=self.user).values_list('score', flat=True)
+        )
+        self.assertEqual(scores, [50])
+
+    async def test_forged_attempt(self):
+        response = await self.async_client.post(
+            self.save_url, urlencode({'attempt': "forged"}), content_type=FORM
+        )
+        self.assertEqual(response.status_code, 400)
+
+    async def test_unknown_quiz(self):
+        url = reverse('quizes:quiz_data_async_view', args=[self.quiz.pk + 1])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+
+
+@skipIf(len(shards()) > 1, "Reads the results without selecting a shard, see MultiShardTests")
+class WireFormatTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.client.force_login(self.user)
+        self.quiz = create_quiz(4)
+        self.data_url = reverse('quizes:quiz_data_view', args=[self.quiz.pk])
+        self.save_url = reverse('quizes:quiz_save_view', args=[self.quiz.pk])
+
+    def test_compact_round_trip(self):
+        response = self.client.get(self.data_url, HTTP_ACCEPT=f'{COMPACT_TYPE}; version=1')
+        self.assertEqual(response['Content-Type'], f'{COMPACT_TYPE}; version=1')
+        data = response.json()
+        self.assertEqual(data['v'], 1)
+        questions = data['questions']
+        self.assertEqual(len(questions), 4)
+        question = Question.objects.get(pk=questions[0][0])
+        self.assertEqual(questions[0][1], question.text)
+        self.assertEqual(
+            questions[0][2],
+            [[answer.pk, answer.text] for answer in question.answers.order_by('pk')]
+        )
+
+        # The correct answer of the second question, a wrong one of the first
+        correct = {q[0]: Answer.objects.get(question=q[0], correct=True).pk for q in questions}
+        wrong = questions[0][2][1][0]
+        response = self.client.post(self.save_url + '?format=compact', {
+            'attempt': data['attempt'],
+            'answers': f'{correct[questions[1][0]]},{wrong}',
+        })
+
+        results = response.json()
+        self.assertEqual(results['correct_questions'], 1)
+        self.assertEqual(results['score'], 25)
+        self.assertEqual(results['results'], [
+            [questions[0][0], correct[questions[0][0]], wrong],
+            [questions[1][0], correct[questions[1][0]], correct[questions[1][0]]],
+            [questions[2][0], correct[questions[2][0]], None],
+            [questions[3][0], correct[questions[3][0]], None],
+        ])
+        self.assertEqual(Result.objects.get(user=self.user).score, 25)
+
+    def test_errors(self):
+        response = self.client.get(self.data_url, {'format': 'compact', 'version': '9'})
+        self.assertEqual(response.status_code, 406)
+        data = self.client.get(self.data_url, {'format': 'compact'}).json()
+        attempt = data['attempt']
+        first, second = (answer_id for answer_id, _ in data['questions'][0][2][:2])
+        other = create_quiz(1).questions.get().answers.first().pk
+
+        url = self.save_url + '?format=compact'
+        for answers in (f'{first},{second}', str(other), 'x'):
+            response = self.client.post(url, {'attempt': attempt, 'answers': answers})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post(url, {'answers': str(first)}).status_code, 400)
+        self.assertFalse(Result.objects.exists())
+
+    def test_gzip(self):
+        response = self.client.get(self.data_url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['data']), 4)
+
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        response = self.client.get(
+            self.data_url, {'attempt': json.loads(gzip.decompress(response.content))['attempt']},
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+@skipIf(len(shards()) > 1, "Reads the results without selecting a shard, see MultiShardTests")
+class IndexAdviceTests(TestCase):
+
+    def test_no_missing_index(self):
+        # Fails on a schema change leaving a query of the views without the
+        # index it needs, see the advise_indexes command
+        seed(topics=2, quizes=25, questions=6, answers=3, users=2, number_of_questions=3)
+
+        queries, failures = record(view_scenarios())
+
+        self.assertEqual(failures, {})
+        proposals = propose([explain(query) for query in queries])
+        self.assertEqual([proposal.name for proposal in proposals], [])
+
+
+class BenchmarkTests(SimpleTestCase):
+
+    def test_temporary_database_restores_the_settings(self):
+        test_settings = connection.settings_dict['TEST']
+        creation = connection.creation
+        with mock.patch.object(creation, 'create_test_db', return_value='old'), \
+                mock.patch.object(creation, 'destroy_test_db') as destroy_test_db:
+            with temporary_database():
+                self.assertTrue(connection.settings_dict['TEST']['NAME'].endswith('benchmark.sqlite3'))
+            destroy_test_db.assert_called_once_with('old', verbosity=0)
+        self.assertIs(connection.settings_dict['TEST'], test_settings)
+
+        with mock.patch.object(creation, 'create_test_db', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError), temporary_database():
+                pass
+        self.assertIs(connection.settings_dict['TEST'], test_settings)
+
+    def test_bench_quiz(self):
+        # In a process of its own: the benchmark database replaces the one
+        # of the connection, which would end the in-memory test database
+        command = [
+            sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'bench_quiz',
+            '--topics', '1', '--quizes', '2', '--questions', '3', '--answers', '2',
+            '--users', '2', '--number-of-questions', '2', '--concurrency', '2',
+            '--iterations', '2', '--warmup', '0', '--format', 'json',
+        ]
+        process = subprocess.run(
+            command, capture_output=True, text=True, timeout=120,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings'},
+        )
+        self.assertEqual(process.returncode, 0, process.stderr)
+
+        report = json.loads(process.stdout)
+        self.assertEqual(set(report['endpoints']), {'quiz_list_view', 'quiz_data_view', 'quiz_save_view'})
+        for endpoint in report['endpoints'].values():
+            self.assertEqual((endpoint['requests'], endpoint['errors']), (4, 0))
+
+
+class SQLitePragmasTests(TestCase):
+
+    def test_connection_is_configured(self):
+        pragmas = current_pragmas(connection)
+        self.assertEqual(pragmas['busy_timeout'], 5000)
+        self.assertEqual(pragmas['cache_size'], -64 * 1024)
+
+    def test_statements(self):
+        self.assertEqual(
+            pragma_statements({'synchronous': 'normal', 'journal_mode': 'wal'}),
+            ["PRAGMA journal_mode = wal", "PRAGMA synchronous = normal"]
+        )
+        with self.assertRaisesMessage(ValueError, "Unsupported SQLite pragma 'foreign_keys'"):
+            pragma_statements({'foreign_keys': 'on'})
+        with self.assertRaisesMessage(ValueError, "Invalid value"):
+            pragma_statements({'journal_mode': 'wal; DROP TABLE x'})
+
+    def test_journal_mode_is_persisted_on_demand(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / 'db.sqlite3'
+        wrapper = type(connections[connection.alias])
+        other = wrapper({**connection.settings_dict, 'NAME': path}, alias='other')
+        self.addCleanup(other.close)
+
+        # Connecting leaves the file as it is
+        self.assertEqual(current_pragmas(other)['busy_timeout'], 5000)
+        with sqlite3.connect(path) as db:
+            self.assertEqual(db.execute("PRAGMA journal_mode").fetchone(), ('delete',))
+
+        self.assertEqual(persist_pragmas(other), {'journal_mode': 'wal'})
+        with sqlite3.connect(path) as db:
+            self.assertEqual(db.execute("PRAGMA journal_mode").fetchone(), ('wal',))
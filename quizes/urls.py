@@ -1,17 +1,28 @@
+from django.conf import settings
 from django.urls import path
 
 from .views import (
     QuizListView,
     QuizDetailView,
     quiz_detail_data_view,
-    save_quiz_view
+    quiz_detail_data_async_view,
+    save_quiz_view,
+    save_quiz_async_view
 )
 
 app_name = 'quizes'
 
+# The ASGI serving profile answers the quiz endpoints with the async views
+if settings.QUIZ_ASYNC_VIEWS:
+    data_view, save_view = quiz_detail_data_async_view, save_quiz_async_view
+else:
+    data_view, save_view = quiz_detail_data_view, save_quiz_view
+
 urlpatterns = [
     path('', QuizListView.as_view(), name='quiz_list_view'),
     path('quiz/<pk>', QuizDetailView.as_view(), name='quiz_view'),
-    path('quiz/<pk>/data', quiz_detail_data_view, name='quiz_data_view'),
-    path('quiz/<pk>/save', save_quiz_view, name='quiz_save_view'),
+    path('quiz/<pk>/data', data_view, name='quiz_data_view'),
+    path('quiz/<pk>/save', save_view, name='quiz_save_view'),
+    path('quiz/<pk>/data/async', quiz_detail_data_async_view, name='quiz_data_async_view'),
+    path('quiz/<pk>/save/async', save_quiz_async_view, name='quiz_save_async_view'),
 ]
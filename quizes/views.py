@@ -1,83 +1,259 @@
+import hashlib
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
 from django.views.generic import ListView, DetailView
-from django.http import JsonResponse
-from results.models import Result
-from questions.models import Question, Answer
-from .models import Quiz
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Least
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from questions.models import Question
+from results.statistics import score_rank
+from results.writebehind import save_result, write_behind_enabled
+from .attempts import ExpiredAttempt, InvalidAttempt, issue_attempt, read_attempt
+from .grading import AnswerKey
+from .listing import LIST_TIMEOUT, CachedCountPaginator, list_generation
+from .models import Quiz, Topic
+from .payloads import build_quiz_payload, sample_question_ids
+from .snapshots import get_snapshot, get_snapshot_version, snapshot_questions
+from .wire import (
+    InvalidSubmission, UnsupportedFormat, compact_quiz_payload, content_type,
+    grade_compact, negotiate,
+)
 
 
 # Quiz List view
 class QuizListView(ListView):
     model = Quiz
     template_name = 'quizes/main.html'
+    paginate_by = 20
+
+    def get_topic(self):
+        """The id of the topic the list is filtered by, if any"""
+        topic = self.request.GET.get('topic', '')
+        return int(topic) if topic.isdigit() else None
+
+    def get_queryset(self):
+        question_count = Question.objects.filter(
+            quiz=OuterRef('pk')
+        ).order_by().values('quiz').annotate(count=Count('pk')).values('count')
+
+        queryset = Quiz.objects.select_related('topic').annotate(
+            question_count=Coalesce(Subquery(question_count), 0)
+        ).annotate(
+            questions_served=Least('number_of_questions', 'question_count')
+        ).order_by('name', 'pk')
+
+        topic = self.get_topic()
+        if topic is not None:
+            queryset = queryset.filter(topic=topic)
+        return queryset
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        cache_key = f'quizes:list-count:{list_generation()}:{self.get_topic()}'
+        return CachedCountPaginator(queryset, per_page, cache_key=cache_key, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['topic'] = self.get_topic()
+        context['topics'] = Topic.objects.order_by('name')
+        context['generation'] = list_generation()
+        context['cache_timeout'] = LIST_TIMEOUT
+        return context
 
 class QuizDetailView(DetailView):
     model = Quiz
     template_name = 'quizes/detail.html'
 
+def _start_attempt(pk, token=None):
+    """The snapshot, questions and token of the attempt to serve"""
+    # Serve again the questions of an ongoing attempt
+    if token:
+        try:
+            attempt = read_attempt(token, pk)
+        except InvalidAttempt:
+            pass
+        else:
+            snapshot = get_snapshot_version(pk, attempt.version)
+            if snapshot is not None:
+                return snapshot, snapshot_questions(snapshot, attempt.question_ids), token
+
+    snapshot = get_snapshot(pk)
+    if snapshot is None:
+        raise Http404("No quiz found matching the query")
+    # Questions added since the snapshot are not in it, and left out
+    questions = snapshot_questions(snapshot, sample_question_ids(snapshot))
+    question_ids = [question[0] for question in questions]
+    return snapshot, questions, issue_attempt(snapshot, question_ids)
+
+def _attempt_response(request, snapshot, questions, token):
+    try:
+        wire_version = negotiate(request)
+    except UnsupportedFormat as e:
+        return JsonResponse({'error': str(e)}, status=406)
+
+    # The payload only depends on the attempt and the format
+    etag = '"%s"' % hashlib.blake2b(
+        f'{token}:{wire_version}'.encode(), digest_size=16
+    ).hexdigest()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if wire_version is None:
+            response = JsonResponse({
+                'data': build_quiz_payload(questions),
+                'time': snapshot.content['time'],
+                'version': snapshot.version,
+                'attempt': token
+            })
+        else:
+            response = JsonResponse({
+                'v': wire_version,
+                'version': snapshot.version,
+                'time': snapshot.content['time'],
+                'attempt': token,
+                'questions': compact_quiz_payload(questions)
+            }, content_type=content_type(wire_version))
+        response['ETag'] = etag
+
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Accept',))
+    return response
+
 def quiz_detail_data_view(request, pk):
-    quiz = Quiz.objects.get(pk=pk)
-    questions = []
-    for question in quiz.get_questions:
-        answers = []
-        for answer in question.get_answers:
-            answers.append(answer.text)
-        questions.append({question.text: answers})
-    
-    return JsonResponse({
-        'data': questions,
-        'time': quiz.time
-    })
+    snapshot, questions, token = _start_attempt(pk, request.GET.get('attempt'))
+    return _attempt_response(request, snapshot, questions, token)
+
+async def quiz_detail_data_async_view(request, pk):
+    """quiz_detail_data_view, the database work done in one thread hop"""
+    snapshot, questions, token = await sync_to_async(_start_attempt)(
+        pk, request.GET.get('attempt')
+    )
+    return _attempt_response(request, snapshot, questions, token)
+
+def _read_submission(request, pk):
+    """The answers, quiz version and question ids of a submission
+
+    Raises InvalidAttempt when the attempt token is missing or doesn't
+    verify.
+    """
+    data = request.POST.dict()
+    data.pop('csrfmiddlewaretoken', None)
+    token = data.pop('attempt', None)
+    # Sent along by the client, the token tells the version it was served
+    data.pop('version', None)
+    if not token:
+        raise InvalidAttempt("The submission has no attempt token")
+
+    # Grade the questions the attempt was served, no lookup needed
+    attempt = read_attempt(token, pk)
+    return data, attempt.version, attempt.question_ids
+
+def _invalid_submission_response(error):
+    status = 403 if isinstance(error, ExpiredAttempt) else 400
+    return JsonResponse({'error': str(error)}, status=status)
+
+def _submission_format(request):
+    """The compact format version of a submission, None for the default
+
+    Raises UnsupportedFormat, and InvalidSubmission for requests accepting
+    neither format.
+    """
+    wire_version = negotiate(request)
+    if wire_version is None and not request.accepts("application/json"):
+        raise InvalidSubmission("The results are only served as JSON")
+    return wire_version
+
+def _grading_snapshot(pk, version, question_ids):
+    """The snapshot and the questions served of the attempt to grade"""
+    # Grade against the version of the quiz the student was shown
+    snapshot = get_snapshot_version(pk, version)
+    if snapshot is None:
+        raise Http404("No quiz found matching the query")
+    return snapshot, snapshot_questions(snapshot, question_ids)
+
+def _grade(snapshot, questions, data, question_ids, wire_version=None):
+    """The final score and the response of a graded submission
+
+    Raises InvalidSubmission for compact submissions not matching the
+    questions of their attempt.
+    """
+    if wire_version is None:
+        key = AnswerKey.from_questions(questions)
+        score, graded, results = key.grade(data, question_ids)
+    else:
+        score, graded, results = grade_compact(questions, data.get('answers', ''))
+
+    required_score = Decimal(snapshot.content['required_score'])
+    multiplier = 100 / graded if graded else 0
+
+    final_score = score * multiplier
+
+    json_response = {
+        'score': final_score,
+        'correct_questions': score,
+        'passed': final_score >= required_score,
+        'required_score': required_score,
+        'results': results
+    }
+    if wire_version is not None:
+        json_response = {'v': wire_version, **json_response}
+    return final_score, json_response
+
+def _results_response(json_response, wire_version):
+    if wire_version is None:
+        return JsonResponse(json_response)
+    return JsonResponse(json_response, content_type=content_type(wire_version))
+
+def _save_and_rank(quiz_id, user, score, required_score):
+    """Save the result and tell where it ranks among the attempts of the quiz"""
+    if write_behind_enabled():
+        # Ranked before it is queued, a flush can't count it twice
+        rank = score_rank(quiz_id, score, queued=True)
+        save_result(quiz_id, user, score, required_score)
+        return rank
+    save_result(quiz_id, user, score, required_score)
+    return score_rank(quiz_id, score)
 
 def save_quiz_view(request, pk):
-    if request.accepts("application/json"):
-        data = request.POST
-        data_ = dict(data.lists())
-        data_.pop('csrfmiddlewaretoken')
-
-        questions = []
-
-        for k in data_.keys():
-            question = Question.objects.get(text=k)
-            questions.append(question)
-
-        user = request.user
-        quiz = Quiz.objects.get(pk=pk)
-
-        required_score = quiz.required_score
-        score = 0
-        multiplier = 100 / len(questions) 
-        results = []
-
-        for q in questions:
-            a_selected = data[q.text]
-
-            if a_selected != '':
-                correct_answer = Answer.objects.filter(question=q).get(correct=True)
-                if a_selected == correct_answer.text:
-                    score += 1
-                
-                results.append({q.text: {
-                    'correct_answer': correct_answer.text,
-                    'answered': a_selected
-                }})
-            else:
-                results.append({q.text: 'not answered'})
-
-        final_score = score * multiplier
-
-
-        Result.objects.create(quiz=quiz, user=user, score=final_score)
-
-        json_response = {
-            'score': final_score,
-            'correct_questions': score,
-            'passed': False,
-            'required_score': required_score,
-            'results': results
-        }
-
-        if final_score >= required_score:
-            json_response['passed'] = True
-            return JsonResponse(json_response)    
-
-        return JsonResponse(json_response)
\ No newline at end of file
+    try:
+        wire_version = _submission_format(request)
+        data, version, question_ids = _read_submission(request, pk)
+    except UnsupportedFormat as e:
+        return JsonResponse({'error': str(e)}, status=406)
+    except (InvalidAttempt, InvalidSubmission) as e:
+        return _invalid_submission_response(e)
+
+    snapshot, questions = _grading_snapshot(pk, version, question_ids)
+    try:
+        final_score, json_response = _grade(snapshot, questions, data, question_ids, wire_version)
+    except InvalidSubmission as e:
+        return _invalid_submission_response(e)
+
+    json_response['rank'] = _save_and_rank(
+        snapshot.quiz_id, request.user, final_score, json_response['required_score']
+    )
+
+    return _results_response(json_response, wire_version)
+
+async def save_quiz_async_view(request, pk):
+    """save_quiz_view, the database work done in thread hops"""
+    try:
+        wire_version = _submission_format(request)
+        data, version, question_ids = _read_submission(request, pk)
+    except UnsupportedFormat as e:
+        return JsonResponse({'error': str(e)}, status=406)
+    except (InvalidAttempt, InvalidSubmission) as e:
+        return _invalid_submission_response(e)
+
+    snapshot, questions = await sync_to_async(_grading_snapshot)(pk, version, question_ids)
+    try:
+        final_score, json_response = _grade(snapshot, questions, data, question_ids, wire_version)
+    except InvalidSubmission as e:
+        return _invalid_submission_response(e)
+
+    # request.user is lazy, the session and user are loaded in the thread
+    json_response['rank'] = await sync_to_async(_save_and_rank)(
+        snapshot.quiz_id, request.user, final_score, json_response['required_score']
+    )
+
+    return _results_response(json_response, wire_version)
@@ -0,0 +1,119 @@
+"""
+Versioned wire formats of the quiz data and save endpoints
+
+The default format keys the questions by their text, and the results of a
+submission repeat the text of every question and answer. The compact format
+sends every text once, in arrays, along with the ids of the questions and
+answers, and the submissions and results refer to the answers by their id.
+A client asks for it with
+
+    Accept: application/vnd.quizlit.compact+json; version=1
+
+or with ?format=compact (and &version=1), the latest version when none is
+given. Version 1:
+
+quiz data
+    {"v": 1, "version": <quiz version>, "time": <minutes>, "attempt": <token>,
+     "questions": [[<question id>, <text>, [[<answer id>, <answer text>], ...]], ...]}
+
+submission, with the attempt token of the quiz data
+    attempt=<token>&answers=<answer id>,<answer id>,...
+    the id of the answer selected for every question answered, in any
+    order, the questions served without one are not answered
+
+results
+    {"v": 1, "score": ..., "correct_questions": ..., "passed": ...,
+     "required_score": ..., "rank": ...,
+     "results": [[<question id>, <correct answer id>, <answered id>], ...]}
+    in the order the questions were served, the answered id is null when
+    the question was not answered
+"""
+COMPACT_TYPE = 'application/vnd.quizlit.compact+json'
+
+VERSIONS = (1,)
+
+
+class UnsupportedFormat(ValueError):
+    """The format or version asked for is not served"""
+
+
+class InvalidSubmission(ValueError):
+    """A compact submission that does not match the questions served"""
+
+
+def _accepted_compact(request):
+    """The parameters of the compact type in the Accept header, or None"""
+    for media_range in request.headers.get('Accept', '').split(','):
+        media_type, *parameters = (part.strip() for part in media_range.split(';'))
+        if media_type == COMPACT_TYPE:
+            return dict(
+                parameter.partition('=')[::2] for parameter in parameters
+            )
+    return None
+
+
+def negotiate(request):
+    """The compact format version asked for, None for the default format
+
+    Raises UnsupportedFormat for unknown formats and versions.
+    """
+    parameters = _accepted_compact(request)
+    if parameters is None:
+        fmt = request.GET.get('format')
+        if fmt in (None, '', 'default'):
+            return None
+        if fmt != 'compact':
+            raise UnsupportedFormat(f"Unknown format {fmt!r}")
+        parameters = request.GET
+
+    version = parameters.get('version') or str(VERSIONS[-1])
+    if not version.isdigit() or int(version) not in VERSIONS:
+        raise UnsupportedFormat(f"Unsupported compact format version {version!r}")
+    return int(version)
+
+
+def content_type(version):
+    return f'{COMPACT_TYPE}; version={version}'
+
+
+def compact_quiz_payload(questions):
+    """The questions served for an attempt, as id-indexed arrays"""
+    return [
+        [question_id, text, [[answer_id, answer_text] for answer_id, answer_text, _ in answers]]
+        for question_id, text, answers in questions
+    ]
+
+
+def grade_compact(served, value):
+    """Grade the answer ids of a compact submission
+
+    served are the snapshot questions of the attempt (see
+    snapshot_questions). Every question served is graded, the ones without
+    an answer count as not answered. Returns the number of correct answers,
+    the number of graded questions and the [question id, correct answer id,
+    answered id] of every question. Raises InvalidSubmission when an id is
+    not one of the answers served, or two answer the same question.
+    """
+    question_of = {
+        answer_id: question_id
+        for question_id, _, answers in served
+        for answer_id, _, _ in answers
+    }
+    answered = {}
+    for answer_id in value.split(',') if value else []:
+        if not answer_id.isdigit() or int(answer_id) not in question_of:
+            raise InvalidSubmission(f"Invalid answer id {answer_id!r}")
+        question_id = question_of[int(answer_id)]
+        if question_id in answered:
+            raise InvalidSubmission(f"Several answers to question {question_id}")
+        answered[question_id] = int(answer_id)
+
+    correct = 0
+    results = []
+    for question_id, _, answers in served:
+        answer = next((answer_id for answer_id, _, is_correct in answers if is_correct), None)
+        answer_id = answered.get(question_id)
+        if answer_id is not None and answer_id == answer:
+            correct += 1
+        results.append([question_id, answer, answer_id])
+    return correct, len(results), results
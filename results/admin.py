@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Result
+from .models import QuizStatistics, Result
 # Register your models here.
 
-admin.site.register(Result)
\ No newline at end of file
+admin.site.register(Result)
+admin.site.register(QuizStatistics)
\ No newline at end of file
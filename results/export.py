@@ -0,0 +1,190 @@
+"""
+Streaming export of the results
+
+The results are read shard by shard with a chunked iterator (a server-side
+cursor where the database has them) as plain rows, completed with the
+fields of their quiz and user, and encoded as CSV or NDJSON blocks of rows.
+Nothing but the current chunk and block, and the quizes seen, is held in
+memory, whatever the size of the table.
+
+Results still waiting in the write-behind queue are not exported.
+
+Under WSGI the view streams the rows from this sync iterator, the first
+bytes are sent while the later chunks are read. Django 4.0 iterates a
+streaming response in the event loop of an ASGI server, where queries
+can't run, so under ASGI the export is buffered: the view, which runs in a
+thread, spools all of it to a temporary file before the first byte is
+sent. The spool holds up to SPOOL_SIZE bytes in memory and the rest on the
+disk of the temporary directory, which bounds the size of an ASGI export.
+Large exports are better served by a WSGI worker or the export_results
+command.
+"""
+import csv
+import datetime
+import io
+import json
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from quizes.models import Quiz
+from .models import Result
+from .sharding import shards_for
+
+
+# Rows fetched from the database at a time
+CHUNK_SIZE = getattr(settings, 'RESULTS_EXPORT_CHUNK_SIZE', 2000)
+
+# Rows encoded per block of the stream
+BLOCK_SIZE = 500
+
+# Bytes of a spooled export held in memory before it is moved to a file
+SPOOL_SIZE = 1024 * 1024
+
+# Exported columns
+HEADER = [
+    'id', 'date', 'quiz_id', 'quiz', 'topic', 'user_id', 'username', 'email',
+    'score', 'required_score', 'passed',
+]
+
+
+def parse_bound(value):
+    """A datetime from an ISO date or datetime, midnight for dates
+
+    Raises ValueError when the value is neither.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date {value!r}")
+        moment = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_querysets(quiz=None, since=None, until=None):
+    """The results to export, from since (included) to until (excluded)
+
+    One queryset per shard holding them.
+    """
+    querysets = []
+    for alias in shards_for(quiz_id=quiz):
+        queryset = Result.objects.using(alias)
+        if quiz is not None:
+            queryset = queryset.filter(quiz=quiz)
+        if since is not None:
+            queryset = queryset.filter(date__gte=since)
+        if until is not None:
+            queryset = queryset.filter(date__lt=until)
+        querysets.append(queryset)
+    return querysets
+
+
+def export_rows(querysets, chunk_size=CHUNK_SIZE):
+    """The exported rows of the results, ordered by id within a shard
+
+    The quiz and user fields are read from the default database, which the
+    results may not be on, once per chunk of results.
+    """
+    quizes = {}
+    for queryset in querysets:
+        rows = queryset.order_by('pk').values_list(
+            'pk', 'date', 'quiz_id', 'user_id', 'score'
+        ).iterator(chunk_size=chunk_size)
+
+        for chunk in _blocks(rows, chunk_size):
+            quiz_ids = {row[2] for row in chunk} - quizes.keys()
+            quizes.update(
+                (pk, fields) for pk, *fields in Quiz.objects.filter(pk__in=quiz_ids)
+                .values_list('pk', 'name', 'topic__name', 'required_score')
+            )
+            users = {
+                pk: fields for pk, *fields in User.objects.filter(pk__in={row[3] for row in chunk})
+                .values_list('pk', 'username', 'email')
+            }
+
+            for pk, date, quiz_id, user_id, score in chunk:
+                # Left on a shard by a deleted quiz or user
+                if quiz_id not in quizes or user_id not in users:
+                    continue
+                name, topic, required_score = quizes[quiz_id]
+                username, email = users[user_id]
+                yield (
+                    pk, date, quiz_id, name, topic, user_id, username, email,
+                    score, required_score, score >= required_score,
+                )
+
+
+def _blocks(rows, size):
+    block = []
+    for row in rows:
+        block.append(row)
+        if len(block) == size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def csv_stream(rows, block_size=BLOCK_SIZE):
+    """The CSV encoding of the rows, a header then blocks of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(HEADER)
+    for block in _blocks(rows, block_size):
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime.datetime) else value
+             for value in row]
+            for row in block
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # A header alone when there are no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _json_default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    # Decimals as strings, keeping their exact value
+    return str(value)
+
+
+def ndjson_stream(rows, block_size=BLOCK_SIZE):
+    """The NDJSON encoding of the rows, one object per line"""
+    for block in _blocks(rows, block_size):
+        yield ''.join(
+            json.dumps(dict(zip(HEADER, row)), default=_json_default) + '\n'
+            for row in block
+        )
+
+
+def spool(stream, max_size=None):
+    """The blocks of an encoded stream written to a temporary file, rewound
+
+    In memory up to max_size bytes, SPOOL_SIZE by default, on disk past it.
+    """
+    f = tempfile.SpooledTemporaryFile(max_size=max_size or SPOOL_SIZE)
+    try:
+        for block in stream:
+            f.write(block.encode())
+    except BaseException:
+        f.close()
+        raise
+    f.seek(0)
+    return f
+
+
+FORMATS = {
+    'csv': (csv_stream, 'text/csv'),
+    'ndjson': (ndjson_stream, 'application/x-ndjson'),
+}
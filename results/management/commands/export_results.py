@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from results.export import CHUNK_SIZE, FORMATS, export_querysets, export_rows, parse_bound
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the results as CSV or NDJSON, with their quiz and user "
+        "fields. The table is read in chunks and the file written as it "
+        "goes, so the memory used does not grow with the number of results."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=tuple(FORMATS), default='csv')
+        parser.add_argument('--output', help="File to write, the standard output by default")
+        parser.add_argument('--quiz', type=int, help="Only the results of this quiz id")
+        parser.add_argument('--since', help="Only the results from this ISO date or datetime")
+        parser.add_argument('--until', help="Only the results before this ISO date or datetime")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            bounds = {
+                name: parse_bound(options[name])
+                for name in ('since', 'until') if options[name]
+            }
+        except ValueError as e:
+            raise CommandError(e)
+
+        querysets = export_querysets(quiz=options['quiz'], **bounds)
+        stream, _ = FORMATS[options['format']]
+        blocks = stream(export_rows(querysets, chunk_size=options['chunk_size']))
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as f:
+                f.writelines(blocks)
+        else:
+            for block in blocks:
+                self.stdout.write(block, ending='')
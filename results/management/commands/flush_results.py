@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from results.writebehind import get_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the results waiting in the write-behind queue to the database, "
+        "e.g. after a process was killed before it could flush them."
+    )
+
+    def handle(self, *args, **options):
+        queue = get_queue()
+        flushed = queue.flush()
+        self.stdout.write(f"Flushed {flushed} results")
+        dead = queue.dead()
+        if dead:
+            self.stderr.write(f"{dead} results were refused and moved to the dead_result table of {queue.path}")
@@ -0,0 +1,92 @@
+import uuid
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from results.models import Result
+from results.sharding import shard_of_result, shards
+
+
+class Command(BaseCommand):
+    help = (
+        "Move every result to the shard of RESULT_SHARDS it hashes to, after "
+        "shards were added or removed. The shards and the databases given "
+        "with --from are scanned in chunks; a misplaced result is copied to "
+        "its shard, then deleted. Results are identified by their uid across "
+        "databases, so an interrupted run can simply be run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from', dest='sources', action='append', default=[], metavar='ALIAS',
+            help="A database holding results that is no longer a shard, e.g. "
+                 "default when the results are first sharded. Repeatable.",
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only count the results to move",
+        )
+
+    def handle(self, *args, **options):
+        sources = list(dict.fromkeys(shards() + options['sources']))
+        for alias in sources:
+            if alias not in settings.DATABASES:
+                raise CommandError(f"Unknown database {alias!r}")
+
+        total = 0
+        for source in sources:
+            moved = self.rebalance(source, options['chunk_size'], options['dry_run'])
+            total += sum(moved.values())
+            targets = ', '.join(f"{alias}: {count}" for alias, count in sorted(moved.items()))
+            self.stdout.write(f"{source}: {sum(moved.values())} results to move" + (
+                f" ({targets})" if moved else ""
+            ))
+
+        verb = "to move" if options['dry_run'] else "moved"
+        self.stdout.write(f"{total} results {verb}")
+
+    def rebalance(self, source, chunk_size, dry_run):
+        """Move the misplaced results of a database, returns how many per shard"""
+        moved = Counter()
+        last = 0
+        while True:
+            chunk = list(
+                Result.objects.using(source).filter(pk__gt=last).order_by('pk')[:chunk_size]
+            )
+            if not chunk:
+                return moved
+            last = chunk[-1].pk
+
+            by_shard = defaultdict(list)
+            for result in chunk:
+                alias = shard_of_result(result)
+                if alias != source:
+                    by_shard[alias].append(result)
+
+            for alias, results in by_shard.items():
+                moved[alias] += len(results)
+                if dry_run:
+                    continue
+
+                # The uid identifies the copy of a result if the run stops
+                # between the copy and the delete
+                unidentified = [result for result in results if result.uid is None]
+                for result in unidentified:
+                    result.uid = uuid.uuid4()
+                Result.objects.using(source).bulk_update(unidentified, ['uid'])
+
+                with transaction.atomic(using=alias):
+                    copied = set(Result.objects.using(alias).filter(
+                        uid__in=[result.uid for result in results]
+                    ).values_list('uid', flat=True))
+                    Result.objects.using(alias).bulk_create(
+                        Result(
+                            date=result.date, quiz_id=result.quiz_id, user_id=result.user_id,
+                            score=result.score, uid=result.uid,
+                        )
+                        for result in results if result.uid not in copied
+                    )
+                Result.objects.using(source).filter(pk__in=[result.pk for result in results]).delete()
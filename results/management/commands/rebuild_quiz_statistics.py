@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from results.statistics import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the statistics of every quiz from its results, e.g. after "
+        "results were changed or deleted, or a quiz's required score changed."
+    )
+
+    def handle(self, *args, **options):
+        quizes = rebuild_statistics()
+        self.stdout.write(f"Rebuilt the statistics of {quizes} quizes")
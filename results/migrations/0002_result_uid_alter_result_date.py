@@ -0,0 +1,24 @@
+# Generated by Django 4.0.4 on 2026-10-18 18:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='result',
+            name='uid',
+            field=models.UUIDField(blank=True, editable=False, help_text='Identifies the results written behind the request', null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='result',
+            name='date',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.0.4 on 2026-10-18 18:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_statistics(apps, schema_editor):
+    """The statistics of the results created before the table"""
+    Quiz = apps.get_model('quizes', 'Quiz')
+    Result = apps.get_model('results', 'Result')
+    QuizStatistics = apps.get_model('results', 'QuizStatistics')
+    db_alias = schema_editor.connection.alias
+
+    statistics = {
+        quiz_id: QuizStatistics(quiz_id=quiz_id)
+        for quiz_id in Quiz.objects.using(db_alias).values_list('pk', flat=True)
+    }
+    results = Result.objects.using(db_alias).values_list('quiz_id', 'score', 'quiz__required_score')
+    for quiz_id, score, required_score in results.iterator():
+        row = statistics[quiz_id]
+        row.attempts += 1
+        row.passed += score >= required_score
+        row.score_sum += score
+        bucket = max(0, min(int(score // 5), 19))
+        setattr(row, f'bucket_{bucket}', getattr(row, f'bucket_{bucket}') + 1)
+
+    QuizStatistics.objects.using(db_alias).bulk_create(statistics.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizes', '0003_quizsnapshot'),
+        ('results', '0002_result_uid_alter_result_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizStatistics',
+            fields=[
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='quizes.quiz')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('passed', models.PositiveIntegerField(default=0, help_text='Attempts scoring at least the required score of the quiz')),
+                ('score_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('date', models.DateTimeField(auto_now=True)),
+                ('bucket_0', models.PositiveIntegerField(default=0)),
+                ('bucket_1', models.PositiveIntegerField(default=0)),
+                ('bucket_2', models.PositiveIntegerField(default=0)),
+                ('bucket_3', models.PositiveIntegerField(default=0)),
+                ('bucket_4', models.PositiveIntegerField(default=0)),
+                ('bucket_5', models.PositiveIntegerField(default=0)),
+                ('bucket_6', models.PositiveIntegerField(default=0)),
+                ('bucket_7', models.PositiveIntegerField(default=0)),
+                ('bucket_8', models.PositiveIntegerField(default=0)),
+                ('bucket_9', models.PositiveIntegerField(default=0)),
+                ('bucket_10', models.PositiveIntegerField(default=0)),
+                ('bucket_11', models.PositiveIntegerField(default=0)),
+                ('bucket_12', models.PositiveIntegerField(default=0)),
+                ('bucket_13', models.PositiveIntegerField(default=0)),
+                ('bucket_14', models.PositiveIntegerField(default=0)),
+                ('bucket_15', models.PositiveIntegerField(default=0)),
+                ('bucket_16', models.PositiveIntegerField(default=0)),
+                ('bucket_17', models.PositiveIntegerField(default=0)),
+                ('bucket_18', models.PositiveIntegerField(default=0)),
+                ('bucket_19', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Quiz statistics',
+            },
+        ),
+        migrations.RunPython(build_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.4 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0003_quizstatistics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['user', 'quiz', 'date'], name='results_result_us_9b3302ba_idx'),
+        ),
+    ]
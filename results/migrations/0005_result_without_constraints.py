@@ -0,0 +1,27 @@
+# Generated by Django 4.0.4 on 2026-10-18 18:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quizes', '0004_advised_indexes'),
+        ('results', '0004_advised_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='result',
+            name='quiz',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='quizes.quiz'),
+        ),
+        migrations.AlterField(
+            model_name='result',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
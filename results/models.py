@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 # Quiz model        
 from quizes.models import Quiz
@@ -10,26 +11,46 @@ from django.contrib.auth.models import User
 from validators.validators import PERCENTAGE_VALIDATOR
 
 
+class ResultQuerySet(models.QuerySet):
+
+    def create(self, **kwargs):
+        """
+        Saved on the database the routers give for the new result, its
+        shard (see results.sharding), unless one was chosen with using()
+        """
+        if self._db is not None:
+            return super().create(**kwargs)
+        result = self.model(**kwargs)
+        result.save(force_insert=True)
+        return result
+
+
 # Result model
 class Result(models.Model):
     """
     The results for the quiz answers of a given user
     """ 
     
+    # Not auto_now_add, so results written behind the request keep the
+    # time they were submitted at
     date = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
         blank=True,
         null=True
     )
 
+    # No foreign key constraints: the results can be on another database
+    # than the quizes and users (see results.sharding)
     quiz = models.ForeignKey(
         Quiz,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_constraint=False
     )
 
     user = models.ForeignKey(
         User,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_constraint=False
     )
 
     score = models.DecimalField(
@@ -39,6 +60,79 @@ class Result(models.Model):
         validators=PERCENTAGE_VALIDATOR
     )
 
-    
+    uid = models.UUIDField(
+        help_text="Identifies the results written behind the request",
+        unique=True,
+        blank=True,
+        null=True,
+        editable=False
+    )
+
+    objects = ResultQuerySet.as_manager()
+
+    class Meta:
+        # Advised by advise_indexes: the results of a user in a quiz, by date
+        indexes = [
+            models.Index(fields=['user', 'quiz', 'date'], name='results_result_us_9b3302ba_idx'),
+        ]
+
+    def __str__(self):
+        return str(self.pk)
+
+# Buckets of the score histograms, of 100 / SCORE_BUCKETS points each
+SCORE_BUCKETS = 20
+
+
+class QuizStatistics(models.Model):
+    """
+    Aggregates of the results of a quiz, updated as results are created
+    (see results.statistics) and rebuilt by the rebuild_quiz_statistics
+    command. The histogram is kept in the bucket_<i> columns, the number of
+    scores in [i * 5, (i + 1) * 5), the last one including 100.
+    """
+
+    quiz = models.OneToOneField(
+        Quiz,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="statistics"
+    )
+
+    attempts = models.PositiveIntegerField(default=0)
+
+    passed = models.PositiveIntegerField(
+        help_text="Attempts scoring at least the required score of the quiz",
+        default=0
+    )
+
+    score_sum = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+
+    date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Quiz statistics"
+
+    @property
+    def histogram(self):
+        return [getattr(self, f'bucket_{i}') for i in range(SCORE_BUCKETS)]
+
+    @property
+    def mean_score(self):
+        return self.score_sum / self.attempts if self.attempts else None
+
+    @property
+    def pass_rate(self):
+        return self.passed / self.attempts if self.attempts else None
+
     def __str__(self):
-        return str(self.pk)
\ No newline at end of file
+        return f"{self.quiz_id} - {self.attempts} attempts"
+
+
+# One column per bucket, so a result is counted with a single UPDATE
+for _bucket in range(SCORE_BUCKETS):
+    QuizStatistics.add_to_class(f'bucket_{_bucket}', models.PositiveIntegerField(default=0))
+del _bucket
@@ -0,0 +1,149 @@
+"""
+Sharding of the results over several databases
+
+The results are spread over the database aliases of RESULT_SHARDS by a
+rendezvous hash of their quiz (or of their user, with RESULT_SHARD_KEY =
+'user'): every result of a quiz is on the same shard, so writing a result
+and reading the results of a quiz take one database. Everything else,
+including the statistics of the quizes, stays on the default database.
+
+ResultShardRouter sends the saves of results to their shard. Querysets
+carry no instance the router could read the key from, so the reads select
+their shards themselves: shards_for gives the one shard of a key, or every
+shard, and fan_out runs a function on several shards in parallel. With
+several shards, a queryset of results without using() raises
+ShardNotSelected instead of reading the default database only.
+
+A shard only holds the results table, without foreign key constraints to
+the quizes and users of the default database, and its ids are its own:
+across shards a result is identified by its uid. Deleting a quiz or a user
+cascades to its results on the database it is deleted from only, the
+results on the other shards are deleted by a signal (see results.signals).
+With a single shard, the default database, nothing changes.
+
+After changing RESULT_SHARDS, move the results to their new shard with the
+rebalance_results command; rendezvous hashing only moves the results of
+about one quiz in N + 1 when a shard is added.
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+SHARDED_MODELS = ('results.result',)
+
+
+class ShardNotSelected(Exception):
+    """A query of the results that does not say which shards it is for"""
+
+
+def shards():
+    """The aliases of the result shards"""
+    return list(getattr(settings, 'RESULT_SHARDS', [DEFAULT_DB_ALIAS]))
+
+
+def shard_key():
+    """The field of the results they are sharded by, quiz or user"""
+    return getattr(settings, 'RESULT_SHARD_KEY', 'quiz')
+
+
+def _weight(alias, key):
+    digest = hashlib.blake2b(f'{alias}:{key}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def shard_of(key, aliases=None):
+    """The shard of a quiz (or user) id, the highest rendezvous weight"""
+    aliases = shards() if aliases is None else aliases
+    if len(aliases) == 1:
+        return aliases[0]
+    return max(aliases, key=lambda alias: _weight(alias, key))
+
+
+def shard_of_result(result):
+    """The shard of a result instance"""
+    return shard_of(getattr(result, f'{shard_key()}_id'))
+
+
+def shards_for(quiz_id=None, user_id=None):
+    """The shards holding the results of a quiz or a user
+
+    One shard when the id of the shard key is given, all of them otherwise.
+    """
+    key = quiz_id if shard_key() == 'quiz' else user_id
+    if key is None:
+        return shards()
+    return [shard_of(key)]
+
+
+def fan_out(function, aliases):
+    """function(alias) for every alias, in parallel, in the order of the aliases"""
+    if len(aliases) == 1:
+        return [function(aliases[0])]
+
+    def run(alias):
+        try:
+            return function(alias)
+        finally:
+            # The connections of the worker threads are not reused
+            connections[alias].close()
+
+    with ThreadPoolExecutor(len(aliases)) as executor:
+        return list(executor.map(run, aliases))
+
+
+def _sharded(model):
+    # Models or instances, request.user is a lazy object proxying _meta
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+class ResultShardRouter:
+    """Routes the results to their shard, everything else to default
+
+    A query of the results without an instance to read the shard key from
+    goes to the shard when there is one, and raises ShardNotSelected when
+    there are several: it would only see the results of one of them.
+    """
+
+    def _unselected(self):
+        aliases = shards()
+        if len(aliases) == 1:
+            return aliases[0]
+        raise ShardNotSelected(
+            f"The results are on {len(aliases)} shards, select them with "
+            f"using(), see shards_for and fan_out"
+        )
+
+    def db_for_read(self, model, **hints):
+        if not _sharded(model):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and _sharded(instance):
+            return shard_of_result(instance)
+        return self._unselected()
+
+    def db_for_write(self, model, **hints):
+        if not _sharded(model):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is None:
+            return self._unselected()
+        if _sharded(instance):
+            return shard_of_result(instance)
+        # A quiz or user assigned to a new result, which is routed by its
+        # own key when it is saved
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # A result on a shard relates to its quiz and user on default
+        databases = set(shards()) | {DEFAULT_DB_ALIAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or db not in shards():
+            return None
+        return f'{app_label}.{model_name}' in SHARDED_MODELS
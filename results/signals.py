@@ -0,0 +1,46 @@
+"""
+Signals of the Results app
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from quizes.models import Quiz
+from .models import QuizStatistics, Result
+from .sharding import fan_out, shards_for
+from .statistics import record_results
+
+
+@receiver(post_save, sender=Result)
+def record_result(sender, instance, created, raw=False, **kwargs):
+    """Count a new result in the statistics of its quiz"""
+    if created and not raw:
+        record_results([instance])
+
+
+@receiver(post_save, sender=Quiz)
+def create_quiz_statistics(sender, instance, created, raw=False, **kwargs):
+    """Empty statistics for a new quiz, its first result is then an UPDATE"""
+    if created and not raw:
+        QuizStatistics.objects.get_or_create(quiz=instance)
+
+
+@receiver(post_delete, sender=Quiz)
+@receiver(post_delete, sender=User)
+def delete_sharded_results(sender, instance, using, **kwargs):
+    """
+    Delete the results of a deleted quiz or user on the other shards, the
+    cascade only reaches the database it was deleted from
+    """
+    field = 'quiz_id' if sender is Quiz else 'user_id'
+    aliases = [alias for alias in shards_for(**{field: instance.pk}) if alias != using]
+    if not aliases:
+        return
+    pk = instance.pk
+
+    def delete(alias):
+        return Result.objects.using(alias).filter(**{field: pk}).delete()
+
+    # After the commit, the quiz or user could be kept by a rollback until then
+    transaction.on_commit(lambda: fan_out(delete, aliases), using=using)
@@ -0,0 +1,141 @@
+"""
+Incrementally maintained statistics of the quizes
+
+Every created result is added to the QuizStatistics row of its quiz with a
+single UPDATE of F() expressions, so concurrent submissions never lose a
+count and no statistic needs a scan of the results. The scores are counted
+in a fixed number of histogram buckets: where a score ranks among the
+attempts of a quiz is read from one row, in O(SCORE_BUCKETS).
+
+Results created through the ORM are recorded by a post_save signal, the
+bulk inserts of the write-behind queue call record_results themselves.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from quizes.models import Quiz
+from .models import SCORE_BUCKETS, QuizStatistics, Result
+from .sharding import fan_out, shards
+
+
+BUCKET_WIDTH = Decimal(100) / SCORE_BUCKETS
+
+
+def bucket_of(score):
+    """The histogram bucket of a score"""
+    return max(0, min(int(Decimal(score) // BUCKET_WIDTH), SCORE_BUCKETS - 1))
+
+
+def record_results(results):
+    """Add created results to the statistics of their quizes
+
+    The required scores of the quizes are read from the database, unless
+    the results carry it in a required_score attribute (see save_result).
+    """
+    results = list(results)
+    if not results:
+        return
+
+    required_scores = {
+        result.quiz_id: result.required_score for result in results
+        if getattr(result, 'required_score', None) is not None
+    }
+    missing = {result.quiz_id for result in results} - required_scores.keys()
+    if missing:
+        required_scores.update(
+            Quiz.objects.filter(pk__in=missing).values_list('pk', 'required_score')
+        )
+
+    deltas = defaultdict(Counter)
+    for result in results:
+        if result.quiz_id not in required_scores:
+            continue
+        score = Decimal(result.score)
+        delta = deltas[result.quiz_id]
+        delta['attempts'] += 1
+        delta['passed'] += score >= required_scores[result.quiz_id]
+        delta['score_sum'] += score
+        delta[f'bucket_{bucket_of(score)}'] += 1
+
+    for quiz_id, delta in deltas.items():
+        updates = {field: F(field) + value for field, value in delta.items() if value}
+        statistics = QuizStatistics.objects.filter(quiz_id=quiz_id)
+        if not statistics.update(**updates):
+            # First result of the quiz
+            QuizStatistics.objects.get_or_create(quiz_id=quiz_id)
+            statistics.update(**updates)
+
+
+def score_percentile(statistics, score):
+    """The percentage of the attempts of a quiz scoring below a score
+
+    The attempts in the bucket of the score are assumed spread evenly over
+    it. None when the quiz has no attempts.
+    """
+    if statistics is None or not statistics.attempts:
+        return None
+
+    histogram = statistics.histogram
+    bucket = bucket_of(score)
+    position = (Decimal(score) - bucket * BUCKET_WIDTH) / BUCKET_WIDTH
+    below = sum(histogram[:bucket]) + histogram[bucket] * max(0, min(position, 1))
+    return round(float(100 * below / statistics.attempts), 2)
+
+
+def score_rank(quiz_id, score, queued=False):
+    """Where a score ranks among the attempts of a quiz
+
+    queued: the result of the score is not in the statistics yet, it waits
+    in the write-behind queue, and is counted as one of the attempts.
+    """
+    statistics = QuizStatistics.objects.filter(quiz_id=quiz_id).first()
+    if queued:
+        # Counted on this copy only, the flush records it
+        statistics = statistics or QuizStatistics(quiz_id=quiz_id)
+        statistics.attempts += 1
+        bucket = f'bucket_{bucket_of(score)}'
+        setattr(statistics, bucket, getattr(statistics, bucket) + 1)
+    return {
+        'attempts': statistics.attempts if statistics else 0,
+        'percentile': score_percentile(statistics, score),
+    }
+
+
+def _score_counts(alias):
+    """(quiz id, score, count) of the results of a shard"""
+    return list(
+        Result.objects.using(alias).order_by()
+        .values_list('quiz_id', 'score').annotate(count=Count('pk'))
+    )
+
+
+def rebuild_statistics():
+    """Recompute the statistics of every quiz from its results
+
+    Returns the number of quizes. The results of every shard are counted
+    by quiz and score in parallel, and merged here. The statistics are
+    deleted first in the same transaction, which holds back the results
+    created meanwhile on the default database instead of losing them.
+    """
+    with transaction.atomic():
+        QuizStatistics.objects.all().delete()
+
+        required_scores = dict(Quiz.objects.values_list('pk', 'required_score'))
+        statistics = {quiz_id: QuizStatistics(quiz_id=quiz_id) for quiz_id in required_scores}
+        for counts in fan_out(_score_counts, shards()):
+            for quiz_id, score, count in counts:
+                # The results of deleted quizes left on a shard
+                if quiz_id not in statistics:
+                    continue
+                row = statistics[quiz_id]
+                row.attempts += count
+                row.passed += count if score >= required_scores[quiz_id] else 0
+                row.score_sum += score * count
+                bucket = f'bucket_{bucket_of(score)}'
+                setattr(row, bucket, getattr(row, bucket) + count)
+
+        QuizStatistics.objects.bulk_create(statistics.values(), batch_size=500)
+    return len(statistics)
@@ -1,3 +1,442 @@
-from django.test import TestCase
+import csv
+import datetime
+import json
+import sqlite3
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from quizes.models import Quiz, Topic
+from .export import HEADER
+from .models import QuizStatistics, Result
+from .sharding import ResultShardRouter, ShardNotSelected, fan_out, shard_of, shards, shards_for
+from .statistics import rebuild_statistics, score_percentile, score_rank
+from .writebehind import ResultQueue, save_result, user_results
+from . import writebehind
+
+
+@skipIf(len(shards()) > 1, "Reads the results without selecting a shard, see MultiShardTests")
+class WriteBehindTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.queue = ResultQueue(Path(directory.name) / 'queue.sqlite3', batch_size=2, max_attempts=2)
+
+        self.user = User.objects.create_user(username="student", password="password")
+        self.quiz = Quiz.objects.create(
+            name="Quiz", number_of_questions=1, time=10,
+            required_score=50, difficulty="Easy",
+        )
+
+    def test_flush_in_batches(self):
+        for score in (10, 20, 30):
+            self.queue.put(self.quiz.pk, self.user.pk, score)
+
+        self.assertEqual(Result.objects.count(), 0)
+        self.assertEqual(self.queue.flush(), 3)
+        self.assertEqual(
+            sorted(Result.objects.values_list('score', flat=True)),
+            [10, 20, 30]
+        )
+        self.assertEqual(self.queue.pending(self.user.pk), [])
+        self.assertEqual(QuizStatistics.objects.get(quiz=self.quiz).attempts, 3)
+
+    def test_flushing_twice_stores_once(self):
+        result = self.queue.put(self.quiz.pk, self.user.pk, 10)
+        Result.objects.bulk_create([result])
+
+        self.queue.flush()
+        self.assertEqual(Result.objects.filter(uid=result.uid).count(), 1)
+        # Counted by the flush that stored it, not again
+        self.assertEqual(QuizStatistics.objects.get(quiz=self.quiz).attempts, 0)
+
+    def test_poisoned_result(self):
+        self.queue.put(self.quiz.pk, self.user.pk, 10)
+        with sqlite3.connect(self.queue.path) as db:
+            db.execute(
+                'INSERT INTO result (uid, quiz_id, user_id, score, date) VALUES (?, ?, ?, ?, ?)',
+                ('poisoned', self.quiz.pk, self.user.pk, 'not a score', timezone.now().isoformat())
+            )
+        self.queue.put(self.quiz.pk, self.user.pk, 20)
+
+        with self.assertLogs('results.writebehind', 'ERROR'):
+            self.assertEqual(self.queue.flush(), 2)
+        self.assertEqual(sorted(Result.objects.values_list('score', flat=True)), [10, 20])
+        self.assertEqual(self.queue.dead(), 0)
+
+        # Retried by the next flush, then moved to the dead letters
+        self.queue.put(self.quiz.pk, self.user.pk, 30)
+        with self.assertLogs('results.writebehind', 'ERROR') as logs:
+            self.assertEqual(self.queue.flush(), 1)
+        self.assertIn("refused 2 times, moved to dead_result", logs.output[-1])
+        self.assertEqual(self.queue.dead(), 1)
+        self.assertEqual(self.queue.flush(), 0)
+        self.assertEqual(Result.objects.count(), 3)
+
+    def test_read_your_writes(self):
+        self.patch_queue()
+        with override_settings(RESULTS_WRITE_BEHIND=True):
+            queued = self.queue.put(self.quiz.pk, self.user.pk, 33.333)
+            self.assertEqual(
+                [(r.uid, r.score) for r in user_results(self.user, self.quiz.pk)],
+                [(queued.uid, queued.score)]
+            )
+
+            self.queue.flush()
+            results = user_results(self.user, self.quiz.pk)
+            self.assertEqual(len(results), 1)
+            self.assertIsNotNone(results[0].pk)
+
+    def test_queued_rank(self):
+        Result.objects.create(quiz=self.quiz, user=self.user, score=80)
+        rank = score_rank(self.quiz.pk, 40, queued=True)
+        self.assertEqual(rank['attempts'], 2)
+        # Not saved, counted once the flush stores the result
+        self.assertEqual(QuizStatistics.objects.get(quiz=self.quiz).attempts, 1)
+
+        self.queue.put(self.quiz.pk, self.user.pk, 40)
+        self.queue.flush()
+        self.assertEqual(score_rank(self.quiz.pk, 40), rank)
+
+        quiz = Quiz.objects.create(name="New", number_of_questions=1, time=10,
+                                   required_score=50, difficulty="Easy")
+        QuizStatistics.objects.filter(quiz=quiz).delete()
+        self.assertEqual(score_rank(quiz.pk, 40, queued=True), {'attempts': 1, 'percentile': 0})
+
+    def test_user_results_view(self):
+        self.patch_queue()
+        other = User.objects.create_user(username="other", password="password")
+        Result.objects.create(quiz=self.quiz, user=other, score=90)
+        url = reverse('results:user_results_view')
+
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.user)
+        with override_settings(RESULTS_WRITE_BEHIND=True):
+            self.queue.put(self.quiz.pk, self.user.pk, 40)
+            response = self.client.get(url, {'quiz': self.quiz.pk})
+        self.assertEqual(
+            [(result['quiz'], result['score']) for result in response.json()['results']],
+            [(self.quiz.pk, '40.00')]
+        )
+        self.assertEqual(self.client.get(url, {'quiz': 'x'}).status_code, 400)
+
+    def patch_queue(self):
+        original = writebehind._queue
+        writebehind._queue = self.queue
+        self.addCleanup(setattr, writebehind, '_queue', original)
+
+
+@skipIf(len(shards()) > 1, "Reads the results without selecting a shard, see MultiShardTests")
+class StatisticsTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="student", password="password")
+        self.quiz = Quiz.objects.create(
+            name="Quiz", number_of_questions=1, time=10,
+            required_score=50, difficulty="Easy",
+        )
+        for score in (0, 12.5, 49.99, 50, 80, 100):
+            Result.objects.create(quiz=self.quiz, user=self.user, score=score)
+
+    def test_incremental(self):
+        statistics = QuizStatistics.objects.get(quiz=self.quiz)
+
+        self.assertEqual(statistics.attempts, 6)
+        self.assertEqual(statistics.passed, 3)
+        self.assertEqual(statistics.mean_score, Decimal('292.49') / 6)
+        self.assertEqual(statistics.pass_rate, 0.5)
+        histogram = statistics.histogram
+        self.assertEqual(len(histogram), 20)
+        self.assertEqual(
+            {bucket: count for bucket, count in enumerate(histogram) if count},
+            {0: 1, 2: 1, 9: 1, 10: 1, 16: 1, 19: 1}
+        )
+
+    def test_rebuild_matches_incremental(self):
+        incremental = QuizStatistics.objects.get(quiz=self.quiz)
+        # Results of which the statistics know nothing
+        Result.objects.bulk_create([Result(quiz=self.quiz, user=self.user, score=70)])
+        Quiz.objects.create(name="Empty", number_of_questions=1, time=10,
+                            required_score=50, difficulty="Easy")
+
+        call_command('rebuild_quiz_statistics', stdout=StringIO())
+
+        rebuilt = QuizStatistics.objects.get(quiz=self.quiz)
+        self.assertEqual(rebuilt.attempts, incremental.attempts + 1)
+        self.assertEqual(rebuilt.passed, incremental.passed + 1)
+        self.assertEqual(rebuilt.score_sum, incremental.score_sum + 70)
+        expected = incremental.histogram
+        expected[14] += 1
+        self.assertEqual(rebuilt.histogram, expected)
+        self.assertEqual(QuizStatistics.objects.get(quiz__name="Empty").attempts, 0)
+        self.assertEqual(rebuild_statistics(), 2)
+
+    def test_percentile(self):
+        statistics = QuizStatistics.objects.get(quiz=self.quiz)
+
+        self.assertEqual(score_percentile(statistics, 0), 0)
+        # Below 50: 0, 12.5 and 49.99
+        self.assertEqual(score_percentile(statistics, 50), 50)
+        # Halfway through the bucket of 80
+        self.assertEqual(score_percentile(statistics, 82.5), round(100 * 4.5 / 6, 2))
+        self.assertEqual(score_rank(self.quiz.pk, 50), {'attempts': 6, 'percentile': 50})
+
+    def test_save_path_queries(self):
+        # The result and the statistics, the required score given
+        with self.assertNumQueries(2):
+            save_result(self.quiz.pk, self.user, 60, required_score=Decimal(70))
+        # And the required score of the quiz otherwise
+        with self.assertNumQueries(3):
+            save_result(self.quiz.pk, self.user, 60)
+
+        statistics = QuizStatistics.objects.get(quiz=self.quiz)
+        self.assertEqual((statistics.attempts, statistics.passed), (8, 4))
+
+    def test_no_attempts(self):
+        quiz = Quiz.objects.create(name="New", number_of_questions=1, time=10,
+                                   required_score=50, difficulty="Easy")
+        self.assertEqual(score_rank(quiz.pk, 50), {'attempts': 0, 'percentile': None})
+
+
+@skipIf(len(shards()) > 1, "Reads the results without selecting a shard, see MultiShardTests")
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.topic = Topic.objects.create(name="Python")
+        self.quiz = Quiz.objects.create(
+            name="Quiz, with a comma", topic=self.topic, number_of_questions=1,
+            time=10, required_score=50, difficulty="Easy",
+        )
+        self.other = Quiz.objects.create(
+            name="Other", number_of_questions=1, time=10,
+            required_score=50, difficulty="Easy",
+        )
+        self.user = User.objects.create_user(
+            username="student", email="student@example.com", password="password"
+        )
+        self.results = [
+            Result.objects.create(
+                quiz=self.quiz, user=self.user, score=score,
+                date=timezone.make_aware(datetime.datetime(2022, 5, day)),
+            )
+            for day, score in ((1, 40), (2, 75.5))
+        ]
+        Result.objects.create(quiz=self.other, user=self.user, score=100)
+
+    def test_csv_command(self):
+        stdout = StringIO()
+        call_command('export_results', quiz=self.quiz.pk, chunk_size=1, stdout=stdout)
+
+        rows = list(csv.reader(StringIO(stdout.getvalue())))
+        self.assertEqual(rows[0], HEADER)
+        self.assertEqual(rows[1:], [
+            [str(self.results[0].pk), '2022-05-01T00:00:00+00:00', str(self.quiz.pk),
+             "Quiz, with a comma", "Python", str(self.user.pk), "student",
+             "student@example.com", '40.00', '50.00', 'False'],
+            [str(self.results[1].pk), '2022-05-02T00:00:00+00:00', str(self.quiz.pk),
+             "Quiz, with a comma", "Python", str(self.user.pk), "student",
+             "student@example.com", '75.50', '50.00', 'True'],
+        ])
+
+    def test_ndjson_view(self):
+        staff = User.objects.create_user(username="staff", password="password", is_staff=True)
+        self.client.force_login(staff)
+
+        response = self.client.get(
+            reverse('results:export_results_view'),
+            {'format': 'ndjson', 'since': '2022-05-02', 'until': '2022-05-03'}
+        )
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{
+            'id': self.results[1].pk,
+            'date': '2022-05-02T00:00:00+00:00',
+            'quiz_id': self.quiz.pk,
+            'quiz': "Quiz, with a comma",
+            'topic': "Python",
+            'user_id': self.user.pk,
+            'username': "student",
+            'email': "student@example.com",
+            'score': '75.50',
+            'required_score': '50.00',
+            'passed': True,
+        }])
+
+    async def test_asgi_view(self):
+        staff = await sync_to_async(User.objects.create_user)(
+            username="staff", password="password", is_staff=True
+        )
+        await sync_to_async(self.async_client.force_login)(staff)
+
+        response = await self.async_client.get(reverse('results:export_results_view'))
+
+        # Iterated in the event loop, like an ASGI server does
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(rows[0], HEADER)
+        self.assertEqual(len(rows), 4)
+
+    @mock.patch('results.export.SPOOL_SIZE', 256)
+    async def test_asgi_view_past_the_spool_size(self):
+        await sync_to_async(Result.objects.bulk_create)([
+            Result(quiz=self.other, user=self.user, score=score) for score in range(50)
+        ])
+        staff = await sync_to_async(User.objects.create_user)(
+            username="staff", password="password", is_staff=True
+        )
+        await sync_to_async(self.async_client.force_login)(staff)
+
+        rollover = tempfile.SpooledTemporaryFile.rollover
+        with mock.patch.object(
+            tempfile.SpooledTemporaryFile, 'rollover', autospec=True, side_effect=rollover
+        ) as spooled_to_disk:
+            response = await self.async_client.get(reverse('results:export_results_view'))
+
+        # Moved from memory to a file
+        spooled_to_disk.assert_called_once()
+        content = b''.join(response.streaming_content)
+        self.assertGreater(len(content), 256)
+        self.assertEqual(len(list(csv.reader(StringIO(content.decode())))), 54)
+
+    def test_view_errors(self):
+        url = reverse('results:export_results_view')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'since': 'yesterday'}).status_code, 400)
+
+
+class ShardingTests(TestCase):
+
+    def test_rendezvous_hashing(self):
+        shards = [f'results_{i}' for i in range(4)]
+        before = {key: shard_of(key, shards) for key in range(1000)}
+        self.assertEqual(before, {key: shard_of(key, shards) for key in range(1000)})
+        self.assertEqual(set(before.values()), set(shards))
+
+        # A new shard only takes keys, about one in five
+        after = {key: shard_of(key, shards + ['results_4']) for key in range(1000)}
+        moved = [key for key in before if before[key] != after[key]]
+        self.assertEqual({after[key] for key in moved}, {'results_4'})
+        self.assertLess(len(moved), 300)
+
+    @override_settings(RESULT_SHARDS=['results_0', 'results_1'])
+    def test_router(self):
+        router = ResultShardRouter()
+        result = Result(quiz_id=7, user_id=1)
+        self.assertEqual(router.db_for_write(Result, instance=result), shard_of(7))
+        self.assertEqual(router.db_for_read(Quiz, instance=result), 'default')
+        with self.assertRaises(ShardNotSelected):
+            router.db_for_read(Result)
+        with override_settings(RESULT_SHARDS=['results_0']):
+            self.assertEqual(router.db_for_read(Result), 'results_0')
+
+        self.assertEqual(shards_for(quiz_id=7), [shard_of(7)])
+        self.assertEqual(shards_for(user_id=1), ['results_0', 'results_1'])
+        self.assertTrue(router.allow_migrate('results_0', 'results', 'result'))
+        self.assertFalse(router.allow_migrate('results_0', 'results', 'quizstatistics'))
+        self.assertFalse(router.allow_migrate('results_0', 'quizes', 'quiz'))
+
+    @override_settings(RESULT_SHARDS=[DEFAULT_DB_ALIAS])
+    def test_rebalance_single_shard(self):
+        quiz = Quiz.objects.create(
+            name="Quiz", number_of_questions=1, time=10, required_score=50, difficulty="Easy",
+        )
+        user = User.objects.create_user(username="student", password="password")
+        Result.objects.create(quiz=quiz, user=user, score=50)
+
+        stdout = StringIO()
+        call_command('rebalance_results', stdout=stdout)
+        self.assertIn("0 results moved", stdout.getvalue())
+        self.assertEqual(Result.objects.count(), 1)
+
+
+@skipUnless(len(shards()) > 1, "Run with --settings=config.settings_sharded")
+class MultiShardTests(TransactionTestCase):
+    databases = {DEFAULT_DB_ALIAS, *shards()}
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="student", password="password")
+        self.other = User.objects.create_user(username="other", password="password")
+        self.quizes = [
+            Quiz.objects.create(
+                name=f"Quiz {i}", number_of_questions=1, time=10, required_score=50, difficulty="Easy",
+            )
+            for i in range(8)
+        ]
+        self.assertGreater(len({shard_of(quiz.pk) for quiz in self.quizes}), 1)
+
+    def placement(self):
+        """The shard of every result, by quiz id"""
+        return {
+            quiz_id: alias
+            for alias in self.databases
+            for quiz_id in Result.objects.using(alias).values_list('quiz_id', flat=True)
+        }
+
+    def test_fan_out(self):
+        for quiz in self.quizes:
+            Result.objects.create(quiz=quiz, user=self.user, score=50)
+        Result.objects.create(quiz=self.quizes[0], user=self.other, score=70)
+
+        self.assertEqual(self.placement(), {quiz.pk: shard_of(quiz.pk) for quiz in self.quizes})
+        self.assertEqual(len(user_results(self.user)), 8)
+        self.assertEqual(len(user_results(self.other, self.quizes[0].pk)), 1)
+        self.assertEqual(rebuild_statistics(), 8)
+        self.assertEqual(QuizStatistics.objects.get(quiz=self.quizes[0]).attempts, 2)
+
+        # A read of one database only is refused
+        with self.assertRaises(ShardNotSelected):
+            Result.objects.count()
+        with self.assertRaises(ShardNotSelected):
+            list(self.quizes[0].result_set.all())
+
+    def test_rebalance(self):
+        # Results written before the sharding, on default
+        Result.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+            Result(quiz=quiz, user=self.user, score=50) for quiz in self.quizes
+        )
+        stdout = StringIO()
+        call_command('rebalance_results', '--from', DEFAULT_DB_ALIAS, '--chunk-size', '3', stdout=stdout)
+        self.assertIn("8 results moved", stdout.getvalue())
+        self.assertEqual(self.placement(), {quiz.pk: shard_of(quiz.pk) for quiz in self.quizes})
+
+        # A shard removed, its results go to the remaining ones
+        removed = shard_of(self.quizes[0].pk)
+        remaining = [alias for alias in shards() if alias != removed]
+        with override_settings(RESULT_SHARDS=remaining):
+            call_command('rebalance_results', '--from', removed, stdout=StringIO())
+            self.assertEqual(
+                self.placement(), {quiz.pk: shard_of(quiz.pk) for quiz in self.quizes}
+            )
+        self.assertNotIn(removed, self.placement().values())
+
+    def test_cascade(self):
+        for quiz in self.quizes:
+            Result.objects.create(quiz=quiz, user=self.user, score=50)
+            Result.objects.create(quiz=quiz, user=self.other, score=50)
+
+        self.quizes[0].delete()
+        self.assertEqual(set(self.placement()), {quiz.pk for quiz in self.quizes[1:]})
+
+        self.other.delete()
+        self.assertEqual(len(user_results(self.user)), 7)
+        self.assertEqual(
+            sum(fan_out(lambda alias: Result.objects.using(alias).count(), shards())), 7
+        )
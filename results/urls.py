@@ -0,0 +1,10 @@
+from django.urls import path
+
+from .views import export_results_view, user_results_view
+
+app_name = 'results'
+
+urlpatterns = [
+    path('export', export_results_view, name='export_results_view'),
+    path('mine', user_results_view, name='user_results_view'),
+]
@@ -1,3 +1,62 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 
-# Create your views here.
+from .export import FORMATS, export_querysets, export_rows, parse_bound, spool
+from .writebehind import user_results
+
+
+@staff_member_required
+def export_results_view(request):
+    """Stream the results as CSV or NDJSON
+
+    ?format= csv (default) or ndjson, filtered by ?quiz=<id> and by date
+    with ?since= and ?until=, ISO dates or datetimes. Buffered in a
+    temporary file under ASGI, see results.export.
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        return JsonResponse({'error': f"Unknown format {fmt!r}"}, status=400)
+
+    quiz = request.GET.get('quiz', '')
+    if quiz and not quiz.isdigit():
+        return JsonResponse({'error': f"Invalid quiz {quiz!r}"}, status=400)
+
+    try:
+        bounds = {
+            name: parse_bound(request.GET[name])
+            for name in ('since', 'until') if request.GET.get(name)
+        }
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    querysets = export_querysets(quiz=int(quiz) if quiz else None, **bounds)
+    stream, content_type = FORMATS[fmt]
+    content = stream(export_rows(querysets))
+    if isinstance(request, ASGIRequest):
+        # The response would be iterated in the event loop, read the rows
+        # here in the thread of the view (see results.export)
+        response = FileResponse(spool(content), content_type=content_type)
+    else:
+        response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="results.{fmt}"'
+    return response
+
+
+@login_required
+def user_results_view(request):
+    """The results of the student, of every quiz or of ?quiz=<id>, by date
+
+    Including the results still waiting in the write-behind queue, a
+    submission is listed right after it is answered.
+    """
+    quiz = request.GET.get('quiz', '')
+    if quiz and not quiz.isdigit():
+        return JsonResponse({'error': f"Invalid quiz {quiz!r}"}, status=400)
+
+    results = user_results(request.user, int(quiz) if quiz else None)
+    return JsonResponse({'results': [
+        {'quiz': result.quiz_id, 'score': result.score, 'date': result.date}
+        for result in results
+    ]})
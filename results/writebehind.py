@@ -0,0 +1,320 @@
+"""
+Write-behind persistence of the quiz results
+
+With RESULTS_WRITE_BEHIND enabled, a submitted result is appended to a
+durable local queue (a separate SQLite file) instead of being inserted in
+the main database inside the request. A worker thread drains the queue
+with batched bulk_create calls, so the end of an exam takes the write lock
+of the main database once per batch instead of once per student.
+
+Every queued result carries a unique uid, so a batch flushed twice (e.g.
+after a crash between the insert and the acknowledgement) is only stored
+once. The queue is flushed when the process exits and can be drained by
+hand with ``manage.py flush_results``.
+
+A result the database refuses is retried by the next flushes and, after
+max_attempts, moved to the dead_result table of the queue instead of
+blocking the results queued after it.
+"""
+import atexit
+import logging
+import sqlite3
+import threading
+import uuid
+from collections import defaultdict
+from contextlib import closing
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Result
+from .sharding import fan_out, shard_of_result, shards_for
+from .statistics import record_results
+
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS result (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid TEXT NOT NULL,
+    quiz_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    score TEXT NOT NULL,
+    date TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS result_user_id ON result (user_id);
+CREATE TABLE IF NOT EXISTS dead_result (
+    id INTEGER PRIMARY KEY,
+    uid TEXT NOT NULL,
+    quiz_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    score TEXT NOT NULL,
+    date TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT NOT NULL
+);
+"""
+
+
+class ResultQueue:
+    """A durable queue of results waiting to be written to the database"""
+
+    def __init__(self, path, batch_size=500, flush_interval=1.0, max_attempts=5):
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._worker = None
+
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(QUEUE_SCHEMA)
+            # Queues created before the attempts were counted
+            columns = {row[1] for row in db.execute('PRAGMA table_info(result)')}
+            if 'attempts' not in columns:
+                db.execute('ALTER TABLE result ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute('PRAGMA synchronous=FULL')
+        return closing(db)
+
+    def put(self, quiz_id, user_id, score):
+        """Queue a result, returned unsaved with the values it will have"""
+        result = Result(
+            uid=uuid.uuid4(),
+            quiz_id=quiz_id,
+            user_id=user_id,
+            score=round(Decimal(str(score)), 2),
+            date=timezone.now(),
+        )
+        with self._connect() as db:
+            db.execute(
+                'INSERT INTO result (uid, quiz_id, user_id, score, date) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (str(result.uid), quiz_id, user_id, str(result.score),
+                 result.date.isoformat()),
+            )
+        return result
+
+    def pending(self, user_id, quiz_id=None):
+        """The results of a user that are still waiting in the queue"""
+        query = 'SELECT uid, quiz_id, user_id, score, date FROM result WHERE user_id = ?'
+        params = [user_id]
+        if quiz_id is not None:
+            query += ' AND quiz_id = ?'
+            params.append(quiz_id)
+
+        with self._connect() as db:
+            rows = db.execute(query + ' ORDER BY id', params).fetchall()
+        return [self._to_result(row) for row in rows]
+
+    def flush(self):
+        """Write every queued result to the database, returns how many
+
+        The rows of a batch the database refuses are written one by one, the
+        ones still refused are left for the next flush or moved to the dead
+        letters. An OperationalError (e.g. the database is unavailable)
+        stops the flush without counting an attempt.
+        """
+        flushed = 0
+        last = 0
+        with self._flush_lock:
+            while True:
+                with self._connect() as db:
+                    rows = db.execute(
+                        'SELECT id, uid, quiz_id, user_id, score, date, attempts FROM result '
+                        'WHERE id > ? ORDER BY id LIMIT ?',
+                        (last, self.batch_size),
+                    ).fetchall()
+                    if not rows:
+                        return flushed
+                    first, last = rows[0][0], rows[-1][0]
+
+                    try:
+                        self._write(rows)
+                        refused = []
+                    except OperationalError:
+                        raise
+                    except Exception:
+                        logger.exception("A batch of queued results was refused, writing them one by one")
+                        refused = self._write_one_by_one(rows)
+
+                    # Only acknowledged once the batch is committed
+                    db.execute('BEGIN IMMEDIATE')
+                    for row, error in refused:
+                        self._refused(db, row, error)
+                    db.execute(
+                        'DELETE FROM result WHERE id BETWEEN ? AND ? AND id NOT IN (%s)'
+                        % ', '.join('?' * len(refused)),
+                        [first, last, *(row[0] for row, _ in refused)],
+                    )
+                    db.execute('COMMIT')
+                    flushed += len(rows) - len(refused)
+
+    def _write(self, rows):
+        by_shard = defaultdict(list)
+        for row in rows:
+            result = self._to_result(row[1:6])
+            by_shard[shard_of_result(result)].append(result)
+
+        for alias, results in by_shard.items():
+            # The statistics on default are committed after the
+            # results, a crash in between is fixed by a rebuild
+            with transaction.atomic(), transaction.atomic(using=alias):
+                # Stored by a flush that was not acknowledged
+                stored = set(Result.objects.using(alias).filter(
+                    uid__in=[result.uid for result in results]
+                ).values_list('uid', flat=True))
+                results = [result for result in results if result.uid not in stored]
+
+                Result.objects.using(alias).bulk_create(results, ignore_conflicts=True)
+                # Bulk inserts send no post_save
+                record_results(results)
+
+    def _write_one_by_one(self, rows):
+        """Write the rows of a refused batch, returns the refused rows and errors"""
+        refused = []
+        for row in rows:
+            try:
+                self._write([row])
+            except OperationalError:
+                raise
+            except Exception as e:
+                refused.append((row, repr(e)))
+        return refused
+
+    def _refused(self, db, row, error):
+        attempts = row[6] + 1
+        if attempts < self.max_attempts:
+            db.execute('UPDATE result SET attempts = ? WHERE id = ?', (attempts, row[0]))
+            return
+
+        logger.error("Queued result %s refused %d times, moved to dead_result: %s", row[1], attempts, error)
+        db.execute(
+            'INSERT INTO dead_result (id, uid, quiz_id, user_id, score, date, attempts, error) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (*row[:6], attempts, error),
+        )
+        db.execute('DELETE FROM result WHERE id = ?', (row[0],))
+
+    def dead(self):
+        """The number of results moved to the dead letters"""
+        with self._connect() as db:
+            return db.execute('SELECT COUNT(*) FROM dead_result').fetchone()[0]
+
+    def start(self):
+        """Start the worker thread of this process if it is not running"""
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name='results-write-behind', daemon=True
+                )
+                self._worker.start()
+                atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the worker and flush what is left in the queue"""
+        self._stopped.set()
+        if self._worker is not None:
+            self._worker.join()
+        self.flush()
+
+    def _run(self):
+        try:
+            while not self._stopped.wait(self.flush_interval):
+                try:
+                    self.flush()
+                except Exception:
+                    # Left in the queue, retried on the next round
+                    logger.exception("Could not flush the queued results")
+        finally:
+            # The connections of this thread, to default and the shards
+            connections.close_all()
+
+    @staticmethod
+    def _to_result(row):
+        uid, quiz_id, user_id, score, date = row
+        return Result(
+            uid=uuid.UUID(uid),
+            quiz_id=quiz_id,
+            user_id=user_id,
+            score=Decimal(score),
+            date=parse_datetime(date),
+        )
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def write_behind_enabled():
+    return getattr(settings, 'RESULTS_WRITE_BEHIND', False)
+
+
+def get_queue():
+    """The result queue of this process, created from the settings"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = ResultQueue(
+                    getattr(settings, 'RESULTS_QUEUE_PATH', settings.BASE_DIR / 'results_queue.sqlite3'),
+                    batch_size=getattr(settings, 'RESULTS_BATCH_SIZE', 500),
+                    flush_interval=getattr(settings, 'RESULTS_FLUSH_INTERVAL', 1.0),
+                    max_attempts=getattr(settings, 'RESULTS_MAX_ATTEMPTS', 5),
+                )
+    return _queue
+
+
+def save_result(quiz_id, user, score, required_score=None):
+    """Store the result of a submission, behind the request if enabled
+
+    The required score of the quiz, when the caller knows it, spares the
+    statistics a query.
+    """
+    if write_behind_enabled():
+        queue = get_queue()
+        queue.start()
+        return queue.put(quiz_id, user.pk, score)
+    result = Result(quiz_id=quiz_id, user=user, score=score)
+    # Not a field, read by record_results on post_save
+    result.required_score = required_score
+    result.save(force_insert=True)
+    return result
+
+
+def user_results(user, quiz_id=None):
+    """The results of a user, including the ones not written yet
+
+    The read-your-writes path: a result the user just submitted is part of
+    the list even while it is still waiting in the queue.
+    """
+    def read(alias):
+        results = Result.objects.using(alias).filter(user=user)
+        if quiz_id is not None:
+            results = results.filter(quiz_id=quiz_id)
+        return list(results.order_by('date'))
+
+    results = sorted(
+        (result for shard in fan_out(read, shards_for(quiz_id, user.pk)) for result in shard),
+        key=lambda result: result.date
+    )
+
+    if write_behind_enabled():
+        stored = {result.uid for result in results if result.uid is not None}
+        results += [
+            result for result in get_queue().pending(user.pk, quiz_id)
+            if result.uid not in stored
+        ]
+    return results